@@ -77,6 +77,19 @@ def check_fraud_rules(customer_data):
     
     return score, alerts
 
+def assess_fraud(customer_data, risk_score):
+    """
+    Rule-based fraud checks on top of the risk engine's score, as stored on a
+    pending verification. Returns: final_risk_score, fraud_score, alerts, flagged
+    """
+    fraud_score, alerts = check_fraud_rules({
+        'email': customer_data.get('email') or '',
+        'phone': customer_data.get('phone') or '',
+        'income_range': customer_data.get('income_range'),
+    })
+    final_risk_score = min((risk_score or 0) + fraud_score, 100)
+    return final_risk_score, fraud_score, alerts, fraud_score > 30 or final_risk_score > 70
+
 def simulate_ocr_extraction(file_path=None):
     """
     Simulates extracting details from a CNIC image.
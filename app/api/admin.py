@@ -1,145 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
-from app import db, models
-from app.api.auth import oauth2_scheme, get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import FileResponse, JSONResponse
+from typing import Optional
+from app import db, models, counters
+from app.api.auth import oauth2_scheme, get_current_user, get_current_admin
+import base64
+import json
 import os
 
 router = APIRouter()
 
 @router.get("/stats")
-async def get_dashboard_stats(token: str = Depends(oauth2_scheme)):
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
-    total_customers = cursor.execute("SELECT COUNT(*) FROM Customers").fetchone()[0]
-    pending_verifications = cursor.execute("SELECT COUNT(*) FROM Verifications WHERE status='Pending'").fetchone()[0]
-    approved_loans = cursor.execute("SELECT COUNT(*) FROM LoanEligibility WHERE eligibility_status='Auto-Approved'").fetchone()[0]
-    
-    conn.close()
+@db.offload
+def get_dashboard_stats(token: str = Depends(oauth2_scheme)):
+    # Trigger-maintained counters: a few primary-key lookups, not COUNT(*) scans
+    with db.connection() as conn:
+        kpis = counters.admin_kpis(conn)
     
     return {
-        "total_customers": total_customers,
-        "pending_verifications": pending_verifications,
-        "approved_loans": approved_loans
+        "total_customers": kpis["total_customers"],
+        "pending_verifications": kpis["pending_verifications"],
+        "approved_loans": kpis["approved_loans"]
     }
 
 @router.get("/pending")
-async def get_pending_verifications(token: str = Depends(oauth2_scheme)):
+@db.offload
+def get_pending_verifications(token: str = Depends(oauth2_scheme)):
     return db.get_pending_customers()
 
+def _encode_cursor(sort, row):
+    payload = json.dumps({"s": sort, "k": row['sort_value'], "i": row['sort_id']})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_cursor(sort, cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload["s"] != sort:
+            raise ValueError("cursor belongs to a different sort order")
+        return (payload["k"], int(payload["i"]))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/all-verifications")
-async def get_all_verifications(token: str =Depends(oauth2_scheme)):
+@db.offload
+def get_all_verifications(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sort: str = "newest",
+    status: Optional[str] = None,
+    min_risk: Optional[int] = Query(None, ge=0, le=100),
+    max_risk: Optional[int] = Query(None, ge=0, le=100),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fraud_flagged: Optional[bool] = None,
+    token: str = Depends(oauth2_scheme)
+):
     """
-    Returns ALL verifications (Pending + Verified) with AI risk scores and fraud detection
+    Returns one page of verifications with risk scores and fraud flags.
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
     """
-    from app.services import risk_engine
-    from app import ai_utils, security_utils
-    
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
-    query = """
-        SELECT 
-            c.id,
-            c.full_name,
-            c.cnic,
-            c.email,
-            c.phone,
-            c.address,
-            c.income_range,
-            c.created_at,
-            v.status,
-            v.risk_score,
-            v.trust_score,
-            v.remarks,
-            v.updated_at
-        FROM Customers c
-        LEFT JOIN Verifications v ON c.id = v.customer_id
-        ORDER BY c.created_at DESC
-    """
-    
-    customers = cursor.execute(query).fetchall()
-    all_customers = cursor.execute("SELECT id, full_name, cnic FROM Customers").fetchall()
-    conn.close()
-    
+    from app import security_utils
+
+    if sort not in db.VERIFICATION_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort '{sort}'. Use one of: {', '.join(db.VERIFICATION_SORTS)}")
+
+    statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+    after = _decode_cursor(sort, cursor) if cursor else None
+
+    # Fetch one extra row to know whether another page exists
+    rows = db.get_verifications_page(
+        sort=sort, after=after, limit=limit + 1, statuses=statuses,
+        min_risk=min_risk, max_risk=max_risk, date_from=date_from, date_to=date_to,
+        fraud_flagged=fraud_flagged
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(sort, rows[-1])
+
+    # Only the returned page is decrypted
     result = []
-    for cust in customers:
+    for cust in rows:
         try:
             try:
                 decrypted_cnic = security_utils.decrypt_data(cust['cnic'])
             except:
                 decrypted_cnic = cust['cnic']
-            
-            # Decrypt phone and email if encrypted
+
             try:
                 decrypted_phone = security_utils.decrypt_data(cust['phone'])
             except:
                 decrypted_phone = cust['phone']
-            
-            try:
-                decrypted_email = security_utils.decrypt_data(cust['email'])
-            except:
-                decrypted_email = cust['email']
-            
-            # Recalculate risk if pending or no score yet
-            if not cust['risk_score'] or cust['status'] == 'Pending':
-                try:
-                    cust_dict = {
-                        'full_name': cust['full_name'],
-                        'cnic': decrypted_cnic,
-                        'email': decrypted_email,
-                        'phone': decrypted_phone,
-                        'address': cust['address'],
-                        'income_range': cust['income_range']
-                    }
-                    
-                    risk_profile = risk_engine.calculate_risk_profile(cust_dict, existing_customers=all_customers)
-                    fraud_score, fraud_alerts = ai_utils.check_fraud_rules(cust_dict)
-                    final_risk_score = min(risk_profile['risk_score'] + fraud_score, 100)
-                    is_fraud_flagged = fraud_score > 30 or final_risk_score > 70
-                except Exception as e:
-                    print(f"Error calculating risk for customer {cust['id']}: {e}")
-                    # Use default values if calculation fails
-                    final_risk_score = 50
-                    fraud_alerts = []
-                    is_fraud_flagged = False
-            else:
-                final_risk_score = cust['risk_score']
-                fraud_alerts = []
-                is_fraud_flagged = final_risk_score > 70
-            
+
+            # Email is stored in plaintext
+            email = cust['email'] or ''
+            risk_score = cust['risk_score'] or 0
+            status_value = cust['status'] or 'Pending'
+
+            # Fraud score, flag and alerts are stored at registration / review
+            fraud_alerts = json.loads(cust['fraud_alerts']) if status_value == 'Pending' and cust['fraud_alerts'] else []
+
             result.append({
                 'id': cust['id'],
                 'serial_no': f"SN-{str(cust['id']).zfill(6)}",
                 'full_name': cust['full_name'],
                 'cnic': decrypted_cnic,
-                'email': decrypted_email,
+                'email': email,
                 'phone': decrypted_phone,
-                'status': cust['status'] or 'Pending',
-                'risk_score': final_risk_score,
-                'trust_score': cust['trust_score'] or (100 - final_risk_score),
+                'status': status_value,
+                'risk_score': risk_score,
+                'trust_score': cust['trust_score'] or (100 - risk_score),
                 'remarks': cust['remarks'] or '',
-                'fraud_flagged': is_fraud_flagged,
+                'risk_level': cust['risk_level'] or ("High" if risk_score > 70 else "Medium" if risk_score > 30 else "Low"),
+                'segment': cust['segment'],
+                'fraud_flagged': bool(cust['fraud_flagged']),
                 'fraud_alerts': fraud_alerts,
                 'date': cust['updated_at'] or cust['created_at'],
                 'created_at': cust['created_at'],
                 'customer_id': cust['id']
             })
         except Exception as e:
-            print(f"Error processing customer {cust.get('id', 'unknown')}: {e}")
+            print(f"Error processing customer {cust['id']}: {e}")
             continue  # Skip this customer and continue with the next one
-    
-    
+
     return result
 
 @router.post("/verify/{customer_id}")
-async def verify_customer(customer_id: int, update: models.VerificationUpdate, token: str = Depends(oauth2_scheme)):
+@db.offload
+def verify_customer(customer_id: int, update: models.VerificationUpdate, token: str = Depends(oauth2_scheme)):
     cust = db.get_customer_by_id(customer_id)
     if not cust:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    from app.services import risk_engine
-    risk_profile = risk_engine.calculate_risk_profile(cust)
+    from app.services import risk_engine, risk_cache
+    # Scoring and the duplicate lookup read on a pooled connection; only the
+    # resulting writes go to the writer. The stored profile is reused unless
+    # its inputs or the engine version changed.
+    with db.connection() as conn:
+        risk_profile, pending_profile = risk_cache.check_profile(conn, customer_id, cust)
     
     final_risk_score = risk_profile['risk_score']
     final_trust_score = risk_profile['trust_score']
@@ -147,33 +144,41 @@ async def verify_customer(customer_id: int, update: models.VerificationUpdate, t
     auto_remarks = f" | Auto-Analysis: {', '.join(risk_profile['reasons'])}" if risk_profile['reasons'] else ""
     final_remarks = f"{update.remarks}{auto_remarks}"
 
-    db.update_verification(
-        customer_id, 
-        update.status, 
-        final_risk_score, 
-        final_trust_score, 
-        final_remarks, 
-        "Admin"
-    )
-    
+    loan_eligibility = None
     if update.status == "Verified":
         loan_eligibility = risk_engine.assess_loan_eligibility(final_risk_score, cust['income_range'])
+
+    db.execute_write(
+        _apply_verification, customer_id, update.status, final_risk_score, final_trust_score,
+        final_remarks, cust['income_range'], loan_eligibility, pending_profile
+    )
+    return {"status": "success", "message": "Verification status updated"}
+
+def _apply_verification(customer_id, status, risk_score, trust_score, remarks, income_range,
+                        loan_eligibility, pending_profile, conn=None):
+    """Profile, decision and eligibility commit together on the writer."""
+    from app.services import risk_cache
+    if pending_profile:
+        risk_cache.store(conn, *pending_profile)
+
+    db.update_verification(customer_id, status, risk_score, trust_score, remarks, "Admin", conn=conn)
+    
+    if loan_eligibility:
         db.save_loan_eligibility(
             customer_id, 
-            final_risk_score, 
-            cust['income_range'],
+            risk_score, 
+            income_range,
             loan_eligibility['status'],
-            loan_eligibility['max_limit']
+            loan_eligibility['max_limit'],
+            conn=conn
         )
-        
-    return {"status": "success", "message": "Verification status updated"}
 
 @router.get("/admins")
-async def get_admins(token: str = Depends(oauth2_scheme)):
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    admins = cursor.execute("SELECT id, username, full_name, 'Active' as status, 'Super Admin' as role FROM Admins").fetchall()
-    conn.close()
+@db.offload
+def get_admins(token: str = Depends(oauth2_scheme)):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        admins = cursor.execute("SELECT id, username, full_name, 'Active' as status, 'Super Admin' as role FROM Admins").fetchall()
     return admins
 
 @router.put("/profile")
@@ -184,41 +189,35 @@ async def update_admin_profile(data: dict, token: str = Depends(oauth2_scheme)):
     if not username:
         raise HTTPException(status_code=400, detail="Username required")
         
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
     if password:
         from app import auth
-        hashed_pw = auth.hash_password(password)
-        cursor.execute("UPDATE Admins SET password_hash = ? WHERE username = ?",(hashed_pw, username))
-    
-    conn.commit()
-    conn.close()
+        hashed_pw = await auth.hash_password_async(password)
+        await db.run(db.update_admin_password, username, hashed_pw)
     
     return {"status": "success", "message": "Profile updated successfully"}
 
 @router.get("/loans")
-async def get_loan_applications(token: str = Depends(oauth2_scheme)):
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
+@db.offload
+def get_loan_applications(token: str = Depends(oauth2_scheme)):
+    with db.connection() as conn:
+        cursor = conn.cursor()
     
-    query = """
-        SELECT 
-            le.id, 
-            le.customer_id,
-            c.full_name, 
-            c.cnic,
-            le.risk_score, 
-            le.income_range, 
-            le.eligibility_status, 
-            le.max_limit,
-            le.calculated_at
-        FROM LoanEligibility le
-        JOIN Customers c ON le.customer_id = c.id
-        ORDER BY le.calculated_at DESC
-    """
-    rows = cursor.execute(query).fetchall()
+        query = """
+            SELECT 
+                le.id, 
+                le.customer_id,
+                c.full_name, 
+                c.cnic,
+                le.risk_score, 
+                le.income_range, 
+                le.eligibility_status, 
+                le.max_limit,
+                le.calculated_at
+            FROM LoanEligibility le
+            JOIN Customers c ON le.customer_id = c.id
+            ORDER BY le.calculated_at DESC
+        """
+        rows = cursor.execute(query).fetchall()
     
     result = []
     from app import security_utils
@@ -231,25 +230,23 @@ async def get_loan_applications(token: str = Depends(oauth2_scheme)):
             pass
         result.append(r)
         
-    conn.close()
     return result
 
 @router.get("/loans/{loan_id}/details")
-async def get_loan_details(loan_id: int, token: str = Depends(oauth2_scheme)):
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
+@db.offload
+def get_loan_details(loan_id: int, token: str = Depends(oauth2_scheme)):
+    with db.connection() as conn:
+        cursor = conn.cursor()
     
-    loan = cursor.execute("SELECT * FROM LoanEligibility WHERE id = ?", (loan_id,)).fetchone()
-    if not loan:
-        raise HTTPException(status_code=404, detail="Loan not found")
+        loan = cursor.execute("SELECT * FROM LoanEligibility WHERE id = ?", (loan_id,)).fetchone()
+        if not loan:
+            raise HTTPException(status_code=404, detail="Loan not found")
     
-    customer_id = loan['customer_id']
-    cust = db.get_customer_by_id(customer_id)
-    docs = cursor.execute("SELECT doc_type, file_path FROM Documents WHERE customer_id = ?", (customer_id,)).fetchall()
-    verif = cursor.execute("SELECT * FROM Verifications WHERE customer_id = ?", (customer_id,)).fetchone()
+        customer_id = loan['customer_id']
+        docs = cursor.execute("SELECT doc_type, file_path FROM Documents WHERE customer_id = ?", (customer_id,)).fetchall()
+        verif = cursor.execute("SELECT * FROM Verifications WHERE customer_id = ?", (customer_id,)).fetchone()
     
-    conn.close()
+    cust = db.get_customer_by_id(customer_id)
     
     return {
         "loan": dict(loan),
@@ -259,44 +256,108 @@ async def get_loan_details(loan_id: int, token: str = Depends(oauth2_scheme)):
     }
 
 @router.post("/loan-decision")
-async def make_loan_decision(decision_data: dict, token: str = Depends(oauth2_scheme)):
+@db.offload
+def make_loan_decision(decision_data: dict, token: str = Depends(oauth2_scheme)):
     loan_id = decision_data.get('loan_id')
     decision = decision_data.get('decision')
     reason = decision_data.get('reason')
     
     if not loan_id or decision not in ["Approved", "Rejected"]:
         raise HTTPException(status_code=400, detail="Invalid decision data")
+    if decision == "Rejected" and not reason:
+        raise HTTPException(status_code=400, detail="A reason is required to reject a loan")
+    reason = reason or "Approved by Admin"
         
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
-    
-    loan = cursor.execute("SELECT * FROM LoanEligibility WHERE id = ?", (loan_id,)).fetchone()
+    loan = db.record_loan_decision(loan_id, decision, reason)
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
-        
     customer_id = loan['customer_id']
-    cust = db.get_customer_by_id(customer_id)
     
-    new_status = "Approved" if decision == "Approved" else "Rejected"
-    cursor.execute("UPDATE LoanEligibility SET eligibility_status = ? WHERE id = ?", (new_status, loan_id))
-    
-    v_status = "Verified" if decision == "Approved" else "Rejected"
-    cursor.execute("UPDATE Verifications SET status = ?, remarks = ? WHERE customer_id = ?", (v_status, reason, customer_id))
-    
-    conn.commit()
-    conn.close()
+    cust = db.get_customer_by_id(customer_id)
     
+    # The letter renders in the PDF process pool; the response doesn't wait for it
+    from app.executors import ExecutorSaturated
     from app.services import pdf_service
-    pdf_path = pdf_service.generate_loan_decision_pdf(
-        cust, 
-        decision, 
-        reason, 
-        "Admin User",
-        max_limit=loan['max_limit'] if decision == "Approved" else 0
-    )
+    try:
+        key, ready = pdf_service.render_in_background(
+            cust, 
+            decision, 
+            reason, 
+            max_limit=loan['max_limit'] if decision == "Approved" else 0
+        )
+    except ExecutorSaturated:
+        # The decision is saved; the customer can still download the letter later
+        return {"status": "success", "message": f"Loan {decision}", "pdf_url": None, "pdf_ready": False}
     
-    return {"status": "success", "message": f"Loan {decision}", "pdf_url": pdf_path}
+    return {"status": "success", "message": f"Loan {decision}", "pdf_url": f"/api/admin/loan-pdf/{key}", "pdf_ready": ready}
+
+MAX_BULK_DECISIONS = 1000
+
+@router.post("/loan-decisions")
+@db.offload
+def make_loan_decisions(batch: models.LoanDecisionBatch, token: str = Depends(oauth2_scheme)):
+    """
+    Bulk /loan-decision: every decision is applied in one transaction (all or
+    nothing), notifications go in as one insert, and the letters render in
+    parallel in the background. merge_pdf adds one printable PDF of them all.
+    """
+    decisions = batch.decisions
+    if not decisions or len(decisions) > MAX_BULK_DECISIONS:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {MAX_BULK_DECISIONS} decisions")
+    loan_ids = [d.loan_id for d in decisions]
+    if len(set(loan_ids)) != len(loan_ids):
+        raise HTTPException(status_code=400, detail="Each loan may appear only once")
+    for d in decisions:
+        if d.decision not in ["Approved", "Rejected"]:
+            raise HTTPException(status_code=400, detail=f"Invalid decision for loan {d.loan_id}")
+        if d.decision == "Rejected" and not d.reason:
+            raise HTTPException(status_code=400, detail=f"A reason is required to reject loan {d.loan_id}")
+
+    rows = [(d.loan_id, d.decision, d.reason or "Approved by Admin") for d in decisions]
+    try:
+        loans = db.record_loan_decisions(rows)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    customers = {}
+    letters = []
+    for (loan_id, decision, reason), loan in zip(rows, loans):
+        customer_id = loan['customer_id']
+        if customer_id not in customers:
+            customers[customer_id] = db.get_customer_by_id(customer_id)
+        max_limit = loan['max_limit'] if decision == "Approved" else 0
+        letters.append((customers[customer_id], decision, reason, max_limit))
+
+    from app.services import pdf_service
+    rendered, merged = pdf_service.render_batch_in_background(letters, merge=batch.merge_pdf)
+
+    def pdf_url(result):
+        return f"/api/admin/loan-pdf/{result[0]}" if result else None
+
+    return {
+        "status": "success",
+        "message": f"{len(decisions)} loan decision(s) recorded",
+        "results": [
+            {"loan_id": loan_id, "decision": decision, "pdf_url": pdf_url(result), "pdf_ready": bool(result and result[1])}
+            for (loan_id, decision, _), result in zip(rows, rendered)
+        ],
+        "merged_pdf_url": pdf_url(merged),
+    }
+
+@router.api_route("/loan-pdf/{key}", methods=["GET", "HEAD"])
+def get_loan_pdf(key: str, admin: models.Principal = Depends(get_current_admin)):
+    """
+    A loan decision letter by cache key (from /loan-decision): 202 while it
+    renders, then the PDF. Admins only: the letter carries the customer's
+    CNIC and contact details, and the key is derived from guessable fields.
+    """
+    from app.services import pdf_service
+    status = pdf_service.letter_status(key)
+    if status == "pending":
+        return JSONResponse(status_code=202, content={"status": "rendering"}, headers={"Retry-After": "1"})
+    if status != "ready":
+        raise HTTPException(status_code=404, detail="Letter not found")
+    return FileResponse(pdf_service.letter_path(key), media_type='application/pdf', filename=f"Loan_Letter_{key[:12]}.pdf")
 
 @router.get("/download-pdf")
 async def download_pdf(path: str):
@@ -305,36 +366,46 @@ async def download_pdf(path: str):
     raise HTTPException(status_code=404, detail="File not found")
 
 @router.delete("/verifications/{customer_id}")
-async def delete_verification(customer_id: int, token: str = Depends(oauth2_scheme)):
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
+@db.offload
+def delete_verification(customer_id: int, token: str = Depends(oauth2_scheme)):
     try:
-        cursor.execute("DELETE FROM Verifications WHERE customer_id = ?", (customer_id,))
-        cursor.execute("DELETE FROM LoanEligibility WHERE customer_id = ?", (customer_id,))
-        cursor.execute("DELETE FROM Documents WHERE customer_id = ?", (customer_id,))
-        cursor.execute("DELETE FROM Customers WHERE id = ?", (customer_id,))
-        conn.commit()
+        db.delete_customer(customer_id)
         return {"status": "success", "message": "Customer and verification record deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to delete record")
-    finally:
-        conn.close()
 
 @router.get("/audit-logs")
-async def get_audit_logs(token: str = Depends(oauth2_scheme)):
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM AuditLog ORDER BY timestamp DESC LIMIT 10")
-    logs = cursor.fetchall()
-    conn.close()
+@db.offload
+def get_audit_logs(token: str = Depends(oauth2_scheme)):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM AuditLog ORDER BY timestamp DESC LIMIT 10")
+        logs = cursor.fetchall()
     return logs
 
+@router.get("/db-metrics")
+async def get_db_metrics(token: str = Depends(oauth2_scheme)):
+    """Connection pool metrics plus any connections held past the leak threshold."""
+    from app import auth
+    leaks = db.get_pool().check_leaks()
+    return {
+        "pool": db.pool_metrics(),
+        "executor": db.executor_metrics(),
+        "writer": db.writer_metrics(),
+        "hash_pool": auth.get_hash_pool().metrics(),
+        "suspected_leaks": [
+            {"thread": thread, "held_seconds": round(held, 1), "checked_out_at": stack}
+            for thread, held, stack in leaks
+        ]
+    }
+
 @router.get("/settings")
-async def get_settings(current_user: str = Depends(get_current_user)):
+@db.offload
+def get_settings(current_user: str = Depends(get_current_user)):
     return db.get_admin_settings(current_user)
 
 @router.post("/settings")
-async def update_settings(settings: dict, current_user: str = Depends(get_current_user)):
+@db.offload
+def update_settings(settings: dict, current_user: str = Depends(get_current_user)):
     db.update_admin_settings(current_user, settings)
     return {"status": "success", "message": "Settings updated"}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Form
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request, status, Form
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app import auth, db, models, security_utils
 import jwt
@@ -23,21 +23,30 @@ def create_access_token(data: dict):
 # Simple in-memory store for OTPs
 OTP_STORE = {}
 
+async def rehash_password(table: str, user_id: int, old_hash: str, password: str):
+    """Upgrades a hash made with outdated Argon2 parameters (runs after the login response)."""
+    try:
+        new_hash = await auth.hash_password_async(password)
+    except Exception as e:
+        print(f"Rehash skipped for {table} {user_id}: {e}")  # retried on next login
+        return
+    # Only replace the hash we verified, in case the password changed meanwhile
+    await db.run(db.replace_password_hash, table, user_id, old_hash, new_hash)
+
 @router.post("/token", response_model=models.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
+async def login_for_access_token(background_tasks: BackgroundTasks, form_data: OAuth2PasswordRequestForm = Depends()):
     # 1. Check Admin
     # print(f"DEBUG: Login attempt for username: {form_data.username}")
-    admin_user = cursor.execute("SELECT * FROM Admins WHERE username = ?", (form_data.username,)).fetchone()
+    admin_user = await db.run(db.get_admin_by_username, form_data.username)
     
     if admin_user:
         # print(f"DEBUG: Admin found: {admin_user['username']}")
-        if auth.check_password(admin_user['password_hash'], form_data.password):
+        if await auth.verify_password_async(admin_user['password_hash'], form_data.password):
+            if auth.needs_rehash(admin_user['password_hash']):
+                background_tasks.add_task(rehash_password, "Admins", admin_user['id'], admin_user['password_hash'], form_data.password)
             # 2FA DISABLED BY USER REQUEST
             # Direct login for admin
-            token = create_access_token({"sub": admin_user['username'], "role": "admin", "id": admin_user['id']})
+            token = create_access_token({"sub": admin_user['username'], "role": "admin", "id": admin_user['id'], "name": admin_user['full_name']})
             return {"access_token": token, "token_type": "bearer", "role": "admin", "user_id": admin_user['id'], "full_name": admin_user['full_name']}
         else:
             pass # Password mismatch
@@ -56,29 +65,20 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    all_customers = cursor.execute("SELECT id, cnic, full_name, password_hash, customer_code FROM Customers").fetchall()
-    
+    # Single indexed lookup through the CNIC blind index
+    cust = await db.run(
+        db.get_customer_by_cnic, form_data.username, columns="id, full_name, password_hash, customer_code"
+    )
+
     found_customer = None
-    for cust in all_customers:
-        try:
-            stored_cnic = cust['cnic']
-            decrypted_cnic = security_utils.decrypt_data(stored_cnic)
-            
-            # Check CNIC, Password, AND Customer Code
-            if decrypted_cnic == form_data.username:
-                if auth.check_password(cust['password_hash'], form_data.password):
-                    if cust['customer_code'] == customer_code:
-                        found_customer = cust
-                        break
-        except Exception as e:
-            continue
-            
-    conn.close()
+    if cust and cust['customer_code'] == customer_code:
+        if await auth.verify_password_async(cust['password_hash'], form_data.password):
+            found_customer = cust
 
     if found_customer:
-        token = create_access_token({"sub": form_data.username, "role": "customer", "id": found_customer['id']})
+        if auth.needs_rehash(found_customer['password_hash']):
+            background_tasks.add_task(rehash_password, "Customers", found_customer['id'], found_customer['password_hash'], form_data.password)
+        token = create_access_token({"sub": form_data.username, "role": "customer", "id": found_customer['id'], "name": found_customer['full_name']})
         return {"access_token": token, "token_type": "bearer", "role": "customer", "user_id": found_customer['id'], "full_name": found_customer['full_name']}
     
     raise HTTPException(
@@ -87,7 +87,11 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> models.Principal:
+    """
+    Decodes the bearer token into a Principal. FastAPI caches dependency results
+    per request, so the JWT is verified once no matter how many dependencies use it.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -100,17 +104,56 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-    return username
+    return models.Principal(
+        role=payload.get("role", "customer"),
+        id=payload.get("id"),
+        username=username,
+        full_name=payload.get("name")
+    )
+
+async def get_current_user(principal: models.Principal = Depends(get_current_principal)):
+    return principal.username
+
+async def get_current_admin(principal: models.Principal = Depends(get_current_principal)):
+    """The caller's Principal; 403 unless the token was issued to an admin."""
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return principal
+
+@db.offload
+def get_current_customer(request: Request, principal: models.Principal = Depends(get_current_principal)):
+    """
+    Loads the caller's Customers row (still encrypted) by primary key and caches
+    it on request.state so every dependency and handler in the request shares it.
+    """
+    cached = getattr(request.state, "customer", None)
+    if cached is not None:
+        return cached
+
+    if principal.role != "customer":
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    if principal.id is not None:
+        with db.connection() as conn:
+            customer = conn.execute("SELECT * FROM Customers WHERE id = ?", (principal.id,)).fetchone()
+    else:
+        # Tokens issued before 'id' was reliable: fall back to the CNIC blind index
+        customer = db.get_customer_by_cnic(principal.username)
+
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    request.state.customer = customer
+    return customer
 
 @router.post("/admin/register", response_model=models.Token)
 async def register_admin(user: models.AdminCreate):
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    existing = cursor.execute("SELECT * FROM Admins WHERE username = ?", (user.username,)).fetchone()
+    existing = await db.run(db.get_admin_by_username, user.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    auth.create_admin(user.username, user.password, user.full_name)
+    hashed_pw = await auth.hash_password_async(user.password)
+    await db.run(auth.create_admin, user.username, user.password, user.full_name, password_hash=hashed_pw)
     
     token = create_access_token({"sub": user.username, "role": "admin", "id": 1})
     return {"access_token": token, "token_type": "bearer", "role": "admin", "user_id": 0, "full_name": user.full_name}
@@ -118,10 +161,7 @@ async def register_admin(user: models.AdminCreate):
 @router.post("/send-2fa")
 async def send_2fa_code(username: str = Form(...)):
     # Check if admin exists
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    admin = cursor.execute("SELECT * FROM Admins WHERE username = ?", (username,)).fetchone()
-    conn.close()
+    admin = await db.run(db.get_admin_by_username, username)
 
     if not admin:
         raise HTTPException(status_code=404, detail="Admin not found")
@@ -216,23 +256,16 @@ async def register_admin(data: dict, token: str = Depends(oauth2_scheme)):
     if not username or not password:
         raise HTTPException(status_code=400, detail="Username and password required")
         
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
     # Check existing
-    existing = cursor.execute("SELECT * FROM Admins WHERE username = ?", (username,)).fetchone()
+    existing = await db.run(db.get_admin_by_username, username)
     if existing:
-        conn.close()
         raise HTTPException(status_code=400, detail="Username already exists")
         
     # Hash Password
-    hashed_pw = auth.hash_password(password)
+    hashed_pw = await auth.hash_password_async(password)
     
     # Insert
-    cursor.execute("INSERT INTO Admins (username, password_hash, full_name) VALUES (?, ?, ?)", 
-                   (username, hashed_pw, full_name))
-    conn.commit()
-    conn.close()
+    await db.run(db.insert_admin, username, hashed_pw, full_name)
     
     return {"status": "success", "message": "Admin created successfully"}
 
@@ -1,60 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from app import db, models, security_utils
-from app.api.auth import oauth2_scheme, get_current_user
+from app import db, models, security_utils, counters
+from app.api.auth import oauth2_scheme, get_current_customer
 from app.services import pdf_service
 import os
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 @router.get("/stats")
-async def get_dashboard_stats(current_user: str = Depends(get_current_user)):
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Get all customers and decrypt CNICs to find the matching one
-    all_customers = cursor.execute("SELECT * FROM Customers").fetchall()
-    
-    found_customer = None
-    for cust in all_customers:
-        try:
-            decrypted_cnic = security_utils.decrypt_data(cust['cnic'])
-            if decrypted_cnic == current_user:
-                found_customer = cust
-                break
-        except:
-            continue
-    
-    if not found_customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-    
-    customer_id = found_customer['id']
+@db.offload
+def get_dashboard_stats(customer = Depends(get_current_customer)):
+    customer_id = customer['id']
     
     # Build customer dict with decrypted data
-    cust_dict = dict(found_customer)
+    cust_dict = dict(customer)
+    cust_dict.pop('cnic_bidx', None)
+    cust_dict.pop('phone_bidx', None)
+    cust_dict.pop('email_bidx', None)
     try:
-        cust_dict['cnic'] = security_utils.decrypt_data(found_customer['cnic'])
-        cust_dict['phone'] = security_utils.decrypt_data(found_customer['phone'])
-        cust_dict['address'] = security_utils.decrypt_data(found_customer['address'])
+        cust_dict['cnic'] = security_utils.decrypt_data(customer['cnic'])
+        cust_dict['phone'] = security_utils.decrypt_data(customer['phone'])
+        cust_dict['address'] = security_utils.decrypt_data(customer['address'])
     except:
         pass
         
-    # Get Verification Status
-    verif = cursor.execute("SELECT * FROM Verifications WHERE customer_id = ?", (customer_id,)).fetchone()
+    with db.connection() as conn:
+        cursor = conn.cursor()
     
-    # Get ALL Loan Applications (for loan history)
-    all_loan_apps = cursor.execute("SELECT * FROM LoanApplications WHERE customer_id = ? ORDER BY created_at DESC", (customer_id,)).fetchall()
+        # Get Verification Status
+        verif = cursor.execute("SELECT * FROM Verifications WHERE customer_id = ?", (customer_id,)).fetchone()
     
-    # Get Latest Loan Application (for dashboard banner)
-    loan_app = cursor.execute("SELECT * FROM LoanApplications WHERE customer_id = ? ORDER BY created_at DESC LIMIT 1", (customer_id,)).fetchone()
+        # Get ALL Loan Applications (for loan history)
+        all_loan_apps = cursor.execute("SELECT * FROM LoanApplications WHERE customer_id = ? ORDER BY created_at DESC", (customer_id,)).fetchall()
     
-    # Get Documents
-    docs = cursor.execute("SELECT doc_type, file_path FROM Documents WHERE customer_id = ?", (customer_id,)).fetchall()
+        # Get Latest Loan Application (for dashboard banner)
+        loan_app = cursor.execute("SELECT * FROM LoanApplications WHERE customer_id = ? ORDER BY created_at DESC LIMIT 1", (customer_id,)).fetchone()
     
-    # Get Unread Notifications Count
-    notif_count = cursor.execute("SELECT COUNT(*) FROM Notifications WHERE customer_id = ? AND is_read = 0", (customer_id,)).fetchone()[0]
+        # Get Documents
+        docs = cursor.execute("SELECT doc_type, file_path FROM Documents WHERE customer_id = ?", (customer_id,)).fetchall()
     
-    conn.close()
+        # Get Unread Notifications Count
+        notif_count = counters.unread_notifications(conn, customer_id)
     
     return {
         "customer": cust_dict,
@@ -66,7 +51,8 @@ async def get_dashboard_stats(current_user: str = Depends(get_current_user)):
     }
 
 @router.post("/loan/apply")
-async def apply_for_loan(data: dict, current_user: str = Depends(get_current_user)):
+@db.offload
+def apply_for_loan(data: dict, customer = Depends(get_current_customer)):
     amount = data.get('amount')
     purpose = data.get('purpose')
     monthly_income = data.get('monthly_income')
@@ -74,148 +60,59 @@ async def apply_for_loan(data: dict, current_user: str = Depends(get_current_use
     if not amount or not purpose or not monthly_income:
         raise HTTPException(status_code=400, detail="Missing required fields")
         
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
-    # Find customer by decrypting CNICs
-    all_customers = cursor.execute("SELECT id, cnic FROM Customers").fetchall()
-    customer_id = None
-    for cust in all_customers:
-        try:
-            if security_utils.decrypt_data(cust['cnic']) == current_user:
-                customer_id = cust['id']
-                break
-        except:
-            continue
-    
-    if not customer_id:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Customer not found")
-    
-    # Check if already has pending application
-    existing = cursor.execute("SELECT id FROM LoanApplications WHERE customer_id = ? AND status = 'Pending'", (customer_id,)).fetchone()
-    if existing:
-        conn.close()
-        raise HTTPException(status_code=400, detail="You already have a pending loan application")
-        
-    cursor.execute("""
-        INSERT INTO LoanApplications (customer_id, amount, purpose, monthly_income, status)
-        VALUES (?, ?, ?, ?, 'Pending')
-    """, (customer_id, amount, purpose, monthly_income))
-    
-    # Add Notification
-    cursor.execute("""
-        INSERT INTO Notifications (customer_id, title, message)
-        VALUES (?, 'Loan Application Submitted', 'Your loan application for PKR ' || ? || ' has been submitted successfully.')
-    """, (customer_id, amount))
-    
-    conn.commit()
-    conn.close()
+    # Application + notification go through the single writer as one operation
+    try:
+        db.create_loan_application(customer['id'], amount, purpose, monthly_income)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {"status": "success", "message": "Loan application submitted"}
 
 @router.get("/notifications")
-async def get_notifications(current_user: str = Depends(get_current_user)):
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Find customer by decrypting CNICs
-    all_customers = cursor.execute("SELECT id, cnic FROM Customers").fetchall()
-    customer_id = None
-    for cust in all_customers:
-        try:
-            if security_utils.decrypt_data(cust['cnic']) == current_user:
-                customer_id = cust['id']
-                break
-        except:
-            continue
-    
-    if not customer_id:
-        conn.close()
-        return []
-    
-    notifs = cursor.execute("SELECT * FROM Notifications WHERE customer_id = ? ORDER BY created_at DESC", (customer_id,)).fetchall()
+@db.offload
+def get_notifications(customer = Depends(get_current_customer)):
+    customer_id = customer['id']
+    with db.connection() as conn:
+        notifs = conn.execute("SELECT * FROM Notifications WHERE customer_id = ? ORDER BY created_at DESC", (customer_id,)).fetchall()
     
     # Mark all as read
-    cursor.execute("UPDATE Notifications SET is_read = 1 WHERE customer_id = ?", (customer_id,))
-    conn.commit()
-    conn.close()
+    db.mark_notifications_read(customer_id)
     
     return [dict(n) for n in notifs]
 
 @router.get("/messages")
-async def get_messages(current_user: str = Depends(get_current_user)):
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Find customer by decrypting CNICs
-    all_customers = cursor.execute("SELECT id, cnic FROM Customers").fetchall()
-    customer_id = None
-    for cust in all_customers:
-        try:
-            if security_utils.decrypt_data(cust['cnic']) == current_user:
-                customer_id = cust['id']
-                break
-        except:
-            continue
-    
-    if not customer_id:
-        conn.close()
-        return []
-    
-    msgs = cursor.execute("SELECT * FROM Messages WHERE customer_id = ? ORDER BY created_at DESC", (customer_id,)).fetchall()
-    conn.close()
+@db.offload
+def get_messages(customer = Depends(get_current_customer)):
+    customer_id = customer['id']
+    with db.connection() as conn:
+        cursor = conn.cursor()
+    
+        msgs = cursor.execute("SELECT * FROM Messages WHERE customer_id = ? ORDER BY created_at DESC", (customer_id,)).fetchall()
     
     return [dict(m) for m in msgs]
 
-@router.get("/loan/download-pdf/{loan_id}")
-async def download_loan_pdf(loan_id: int, current_user: str = Depends(get_current_user)):
-    from fastapi.responses import FileResponse
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Find customer
-    all_customers = cursor.execute("SELECT id, cnic, full_name FROM Customers").fetchall()
-    customer_id = None
-    customer_name = None
-    for cust in all_customers:
-        try:
-            if security_utils.decrypt_data(cust['cnic']) == current_user:
-                customer_id = cust['id']
-                customer_name = cust['full_name']
-                break
-        except:
-            continue
-    
-    if not customer_id:
-        raise HTTPException(status_code=404, detail="Customer not found")
-    
-    # Get loan application
-    loan = cursor.execute("SELECT * FROM LoanApplications WHERE id = ? AND customer_id = ?", (loan_id, customer_id)).fetchone()
+@db.offload
+def _loan_letter_inputs(loan_id, customer):
+    customer_id = customer['id']
+    with db.connection() as conn:
+        # Get loan application
+        loan = conn.execute("SELECT * FROM LoanApplications WHERE id = ? AND customer_id = ?", (loan_id, customer_id)).fetchone()
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
     
-    # Get customer details for PDF
-    customer = {
-        'id': customer_id,
-        'full_name': customer_name,
-        'cnic': current_user,
-        'email': 'N/A',
-        'phone': 'N/A'
-    }
-    
+    # Same customer fields as the admin's render of the letter
+    pdf_customer = db.get_customer_by_id(customer_id)
     decision = loan['status']
     reason = loan['rejection_reason'] or 'N/A'
     max_limit = loan['amount'] if decision == 'Approved' else 0
+    return pdf_customer, decision, reason, max_limit
+
+@router.get("/loan/download-pdf/{loan_id}")
+async def download_loan_pdf(loan_id: int, customer = Depends(get_current_customer)):
+    from fastapi.responses import FileResponse
+    pdf_customer, decision, reason, max_limit = await _loan_letter_inputs(loan_id, customer)
     
-    # Generate PDF
-    pdf_path = pdf_service.generate_loan_decision_pdf(
-        customer, decision, reason, "System Admin", max_limit
-    )
-    
-    conn.close()
+    # Served from the letter cache; a miss renders in the PDF process pool
+    pdf_path = await pdf_service.loan_decision_pdf_async(pdf_customer, decision, reason, max_limit)
     
     return FileResponse(pdf_path, filename=f"Loan_{decision}_{loan_id}.pdf", media_type='application/pdf')
@@ -24,6 +24,11 @@ def register_customer(
     # We wrap everything in a try-except to ensure the user is ALWAYS created
     # even if advanced features (Risk Engine, AI, etc.) fail.
     
+    # Hash first, through the bounded hashing pool: it is the expensive step,
+    # and a saturated pool should reject (503) before any other work is done.
+    from app import auth
+    hashed_pw = auth.hash_password_pooled(password)
+
     try:
         print(f"Registering user: {full_name}, {email}")
         
@@ -35,81 +40,62 @@ def register_customer(
             'reasons': ['Initial Registration']
         }
         
+        risk_hash = None
+        face_match_score = None
         try:
-            from app.services import risk_engine
+            from app.services import risk_cache
             import random
             
-            # Fetch existing customers for duplicate check
-            conn = db.get_conn()
-            conn.row_factory = db.sqlite3.Row
-            cursor = conn.cursor()
-            rows = cursor.execute("SELECT id, full_name, cnic, email, phone FROM Customers").fetchall()
-            conn.close()
-            
-            # Decrypt sensitive data (Safe)
-            existing_customers = []
-            for row in rows:
-                try:
-                    cust = dict(row)
-                    cust['cnic'] = security_utils.decrypt_data(cust['cnic'])
-                    cust['phone'] = security_utils.decrypt_data(cust['phone'])
-                    existing_customers.append(cust)
-                except:
-                    pass
-
             cust_data = {
                 "email": email, "address": address, "cnic": cnic,
                 "phone": phone, "income_range": income_range, "full_name": full_name
             }
+
+            # Fetch only plausible duplicates (blind-index + name-trigram blocking)
+            from app.services import duplicate_index
+            with db.connection() as conn:
+                existing_customers = duplicate_index.find_candidates(conn, cust_data)
             
-            risk_profile = risk_engine.calculate_risk_profile(
+            face_match_score = random.randint(60, 99)
+            risk_profile, risk_hash = risk_cache.score(
                 cust_data,
                 existing_customers=existing_customers,
-                face_match_score=random.randint(60, 99)
+                face_match_score=face_match_score
             )
         except Exception as e:
             print(f"⚠️ Risk Engine Failed: {e}. Proceeding with default values.")
 
-        # 2. Hash Password
-        from app import auth
-        hashed_pw = auth.hash_password(password)
+        # Post-registration records are prepared up front so the write
+        # transaction below only holds the lock for the inserts themselves.
+        from app.services import risk_engine
+        loan_eligibility = risk_engine.assess_loan_eligibility(risk_profile['risk_score'], income_range)
+
+        # Rule-based fraud checks go on top of the engine score for the review queue
+        from app import ai_utils
+        verification_risk, fraud_score, fraud_alerts, _ = ai_utils.assess_fraud(
+            {"email": email, "phone": phone, "income_range": income_range}, risk_profile['risk_score']
+        )
+
+        ai_recommendations = []
+        if risk_profile['risk_score'] > 70: ai_recommendations.append("⚠️ HIGH RISK")
+        
+        base_analysis = f"AI Analysis: {', '.join(risk_profile['reasons'])}" if risk_profile['reasons'] else "Initial Registration"
+        auto_remarks = base_analysis + (" | " + " • ".join(ai_recommendations) if ai_recommendations else "")
 
-        # 3. Insert Customer (CRITICAL STEP)
+        # 2. Insert Customer + 3. Post-Registration Tasks in ONE writer operation
         print("Inserting customer into DB...")
-        cust_id, customer_code = db.insert_customer(
+        row = db.encrypt_customer(
             full_name, cnic, email, phone, address, income_range, hashed_pw,
-            trust_score=risk_profile['trust_score'],
-            segment=risk_profile['segment']
+            trust_score=risk_profile['trust_score'], segment=risk_profile['segment']
+        )
+        verification = {
+            "risk_score": verification_risk, "trust_score": risk_profile['trust_score'],
+            "remarks": auto_remarks, "fraud_score": fraud_score, "fraud_alerts": fraud_alerts,
+        }
+        cust_id, customer_code = db.execute_write(
+            _register, row, risk_profile, loan_eligibility, verification, risk_hash, face_match_score
         )
         print(f"✅ Customer inserted: ID {cust_id}, Code {customer_code}")
-        
-        # 4. Post-Registration Tasks (Non-Critical)
-        try:
-            # Loan Eligibility
-            from app.services import risk_engine
-            loan_eligibility = risk_engine.assess_loan_eligibility(risk_profile['risk_score'], income_range)
-            db.save_loan_eligibility(
-                cust_id, risk_profile['risk_score'], income_range,
-                loan_eligibility['status'], loan_eligibility['max_limit']
-            )
-            
-            # Verification Record
-            ai_recommendations = []
-            if risk_profile['risk_score'] > 70: ai_recommendations.append("⚠️ HIGH RISK")
-            
-            base_analysis = f"AI Analysis: {', '.join(risk_profile['reasons'])}" if risk_profile['reasons'] else "Initial Registration"
-            auto_remarks = base_analysis + (" | " + " • ".join(ai_recommendations) if ai_recommendations else "")
-            
-            db.create_verification_record(
-                cust_id, risk_score=risk_profile['risk_score'],
-                trust_score=risk_profile['trust_score'], remarks=auto_remarks
-            )
-            
-            # Mock Financials
-            db.generate_mock_financials(cust_id)
-            
-        except Exception as e:
-            print(f"⚠️ Post-registration tasks failed: {e}. Ignoring.")
 
         return {
             "status": "success",
@@ -118,17 +104,20 @@ def register_customer(
             "message": f"Registration successful! Your code: {customer_code}"
         }
 
+    except ValueError as e:
+        # Duplicate CNIC (unique blind index): retrying cannot succeed
+        raise HTTPException(status_code=400, detail=str(e))
+
     except Exception as e:
         # GLOBAL FALLBACK
-        # If even the basic logic fails, we try one last desperate insert
+        # If even the basic logic fails, we try one last desperate insert.
+        # The writer rolled the operation above back, so nothing was half-written.
         print(f"❌ CRITICAL REGISTRATION ERROR: {e}")
         import traceback
         traceback.print_exc()
         
         try:
             # Emergency Insert
-            from app import auth
-            hashed_pw = auth.hash_password(password)
             cust_id, customer_code = db.insert_customer(
                 full_name, cnic, email, phone, address, income_range, hashed_pw
             )
@@ -141,6 +130,35 @@ def register_customer(
         except Exception as final_e:
             raise HTTPException(status_code=500, detail=f"Registration Failed: {str(e)}")
 
+def _register(row, risk_profile, loan_eligibility, verification, risk_hash, face_match_score, conn=None):
+    """Customer row plus post-registration records, committed together by the writer."""
+    from app.services import risk_cache
+    cust_id, customer_code = db.insert_customer_row(row, conn=conn)
+
+    # Non-critical: a failure here rolls back only this savepoint,
+    # the customer row still commits.
+    try:
+        with db.savepoint(conn, "post_registration"):
+            # Loan Eligibility
+            db.save_loan_eligibility(
+                cust_id, risk_profile['risk_score'], row['income_range'],
+                loan_eligibility['status'], loan_eligibility['max_limit'],
+                conn=conn
+            )
+            
+            # Verification Record
+            db.create_verification_record(cust_id, **verification, conn=conn)
+            
+            # Mock Financials
+            db.generate_mock_financials(cust_id, conn=conn)
+
+            # Persisted Risk Profile (served to admins without rescoring)
+            if risk_hash:
+                risk_cache.store(conn, cust_id, risk_profile, risk_hash, face_match_score)
+    except Exception as e:
+        print(f"⚠️ Post-registration tasks failed: {e}. Ignoring.")
+    return cust_id, customer_code
+
 @router.post("/upload/{customer_id}")
 def upload_document(
     customer_id: int,
@@ -177,19 +195,15 @@ def extract_cnic_data(file: UploadFile = File(...)):
     return data
 
 @router.get("/{customer_id}")
-async def get_customer_status(customer_id: int):
+@db.offload
+def get_customer_status(customer_id: int):
     cust = db.get_customer_by_id(customer_id)
     if not cust:
         raise HTTPException(status_code=404, detail="Customer not found")
         
-    conn = db.get_conn()
-    conn.row_factory = db.sqlite3.Row
-    cursor = conn.cursor()
-    
-    verif = cursor.execute("SELECT * FROM Verifications WHERE customer_id = ?", (customer_id,)).fetchone()
-    loan = cursor.execute("SELECT * FROM LoanEligibility WHERE customer_id = ?", (customer_id,)).fetchone()
-    
-    conn.close()
+    with db.connection() as conn:
+        verif = conn.execute("SELECT * FROM Verifications WHERE customer_id = ?", (customer_id,)).fetchone()
+        loan = conn.execute("SELECT * FROM LoanEligibility WHERE customer_id = ?", (customer_id,)).fetchone()
     
     return {
         "customer": cust,
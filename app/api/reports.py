@@ -1,150 +1,96 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from app import db
-from app.api.auth import oauth2_scheme
-from app import security_utils
-from datetime import datetime, timedelta
-import io
-import csv
+from fastapi.responses import FileResponse, StreamingResponse
+from app import db, models, report_jobs, snapshot
+from app.api.auth import oauth2_scheme, get_current_user
+from app.services import export_service, stats_engine
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
 @router.get("/reports/stats")
-async def get_report_stats(time_range: str = "24 Hours", token: str = Depends(oauth2_scheme)):
+@db.offload
+def get_report_stats(time_range: str = "24 Hours", date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None, bucket: Optional[str] = None,
+                     token: str = Depends(oauth2_scheme)):
     """
-    Get verification statistics for reports page
+    Get verification statistics for reports page.
+    time_range is one of stats_engine.TIME_RANGES; date_from/date_to (UTC)
+    give a custom range instead. bucket (minute/hour/day/week/month) is
+    picked from the span unless given.
     """
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
-    # Get overall status counts
-    total_verified = cursor.execute("SELECT COUNT(*) FROM Verifications WHERE status='Verified'").fetchone()[0]
-    total_rejected = cursor.execute("SELECT COUNT(*) FROM Verifications WHERE status='Rejected'").fetchone()[0]
-    total_pending = cursor.execute("SELECT COUNT(*) FROM Verifications WHERE status='Pending'").fetchone()[0]
-    
-    # Get daily activity for last 7 days (for bar chart)
-    daily_stats = []
-    for i in range(6, -1, -1):
-        date = datetime.now() - timedelta(days=i)
-        date_str = date.strftime('%Y-%m-%d')
-        day_name = date.strftime('%a')
-        
-        verified = cursor.execute(
-            "SELECT COUNT(*) FROM Verifications WHERE status='Verified' AND date(date) = ?",
-            (date_str,)
-        ).fetchone()[0]
-        
-        rejected = cursor.execute(
-            "SELECT COUNT(*) FROM Verifications WHERE status='Rejected' AND date(date) = ?",
-            (date_str,)
-        ).fetchone()[0]
-        
-        daily_stats.append({
-            "name": day_name,
-            "verified": verified,
-            "rejected": rejected
-        })
-    
-    conn.close()
-    
-    return {
-        "overall": {
-            "verified": total_verified,
-            "rejected": total_rejected,
-            "pending": total_pending
-        },
-        "daily_activity": daily_stats
-    }
+    with snapshot.reporting_connection() as conn:
+        try:
+            return stats_engine.verification_stats(conn, time_range, date_from, date_to, bucket)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/reports/export/{status}")
-async def export_customers(status: str, token: str = Depends(oauth2_scheme)):
+def export_customers(status: str, gzip: bool = False, token: str = Depends(oauth2_scheme)):
     """
-    Export customers as CSV based on verification status
+    Export customers as CSV based on verification status.
+    Streams in batches (rows are fetched and decrypted as the client reads);
+    gzip=true sends a .csv.gz instead.
     """
-    conn = db.get_conn()
-    cursor = conn.cursor()
-    
-    # Map status to database value
-    status_map = {
-        "verified": "Verified",
-        "rejected": "Rejected",
-        "pending": "Pending"
-    }
-    
-    db_status = status_map.get(status.lower())
+    db_status = export_service.EXPORT_STATUSES.get(status.lower())
     if not db_status:
         raise HTTPException(status_code=400, detail="Invalid status")
-    
-    # Get customers with verification data
-    query = """
-        SELECT 
-            c.id,
-            c.full_name,
-            c.cnic,
-            c.email,
-            c.phone,
-            c.address,
-            v.status,
-            v.risk_score,
-            v.trust_score,
-            v.date,
-            v.remarks
-        FROM Customers c
-        JOIN Verifications v ON c.id = v.customer_id
-        WHERE v.status = ?
-        ORDER BY v.date DESC
-    """
-    
-    customers = cursor.execute(query, (db_status,)).fetchall()
-    conn.close()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'ID', 'Full Name', 'CNIC', 'Email', 'Phone', 'Address',
-        'Status', 'Risk Score', 'Trust Score', 'Date', 'Remarks'
-    ])
-    
-    # Write data
-    for cust in customers:
-        try:
-            decrypted_cnic = security_utils.decrypt_data(cust['cnic'])
-        except:
-            decrypted_cnic = cust['cnic']
-        
-        try:
-            decrypted_email = security_utils.decrypt_data(cust['email'])
-        except:
-            decrypted_email = cust['email']
-        
-        try:
-            decrypted_phone = security_utils.decrypt_data(cust['phone'])
-        except:
-            decrypted_phone = cust['phone']
-        
-        writer.writerow([
-            cust['id'],
-            cust['full_name'],
-            decrypted_cnic,
-            decrypted_email,
-            decrypted_phone,
-            cust['address'],
-            cust['status'],
-            cust['risk_score'],
-            cust['trust_score'],
-            cust['date'],
-            cust['remarks']
-        ])
-    
-    # Create response
-    output.seek(0)
+
+    filename = f"{status}_customers_{datetime.now().strftime('%Y%m%d')}.csv"
+    if gzip:
+        filename += ".gz"
+
+    # Starlette runs the sync generator in its thread pool, chunk by chunk
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
+        export_service.stream_customers_csv(db_status, compress=gzip),
+        media_type="application/gzip" if gzip else "text/csv",
         headers={
-            "Content-Disposition": f"attachment; filename={status}_customers_{datetime.now().strftime('%Y%m%d')}.csv"
+            "Content-Disposition": f"attachment; filename={filename}"
         }
     )
+
+# --- Report jobs ---
+# Long exports run in the background (app/report_jobs.py): submit, poll, download.
+
+@router.post("/reports/jobs", status_code=202)
+@db.offload
+def submit_report_job(report: models.ReportJobCreate, current_user: str = Depends(get_current_user)):
+    """
+    Queue a report (kind: customers_csv, verification_xlsx, verification_parquet,
+    verification_arrow). An identical request already in progress returns that job.
+    """
+    try:
+        job, created = report_jobs.submit(report.kind, report.params, requested_by=current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**job, "created": created}
+
+@router.get("/reports/jobs")
+@db.offload
+def list_report_jobs(limit: int = 50, token: str = Depends(oauth2_scheme)):
+    return report_jobs.list_jobs(min(max(limit, 1), 200))
+
+@router.get("/reports/jobs/{job_id}")
+@db.offload
+def get_report_job(job_id: str, token: str = Depends(oauth2_scheme)):
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/reports/jobs/{job_id}/download")
+@db.offload
+def download_report_job(job_id: str, token: str = Depends(oauth2_scheme)):
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in report_jobs.ACTIVE:
+        raise HTTPException(status_code=409, detail="Report is not ready yet")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=409, detail=f"Report failed: {job['error']}")
+    path = report_jobs.artifact_path(job_id)
+    if not path:
+        raise HTTPException(status_code=410, detail="Report has expired")
+    return FileResponse(path, filename=report_jobs.download_name(job))
@@ -0,0 +1,108 @@
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from app import config
+
+# Argon2id parameters tuned to the host.
+#
+# The library defaults (64 MiB, t=3, p=4) are sized for a workstation; on a
+# small PaaS instance every concurrent verify needs 64 MiB and a burst of
+# logins can OOM the dyno. `python -m app.argon2_params calibrate` benchmarks
+# the machine and stores parameters that fit the latency target and memory
+# budget; app.auth builds its PasswordHasher from the stored file.
+
+DEFAULT_PARAMS = {"time_cost": 3, "memory_cost": 65536, "parallelism": 4}
+
+# OWASP minimum for Argon2id: 19 MiB with t=2
+MIN_MEMORY_KIB = 19456
+MIN_TIME_COST = 2
+MAX_TIME_COST = 10
+
+def load_params():
+    """Stored (calibrated) parameters, or the library defaults when uncalibrated."""
+    try:
+        with open(config.ARGON2_PARAMS_PATH) as f:
+            stored = json.load(f)
+        return {key: int(stored[key]) for key in DEFAULT_PARAMS}
+    except FileNotFoundError:
+        return dict(DEFAULT_PARAMS)
+    except Exception as e:
+        print(f"Ignoring unreadable Argon2 parameters ({config.ARGON2_PARAMS_PATH}): {e}")
+        return dict(DEFAULT_PARAMS)
+
+def save_params(params, measured_ms):
+    os.makedirs(os.path.dirname(config.ARGON2_PARAMS_PATH) or ".", exist_ok=True)
+    data = dict(params, measured_ms=round(measured_ms, 1), calibrated_at=datetime.now().isoformat(timespec="seconds"))
+    tmp_path = config.ARGON2_PARAMS_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, config.ARGON2_PARAMS_PATH)
+
+def measure_ms(time_cost, memory_cost, parallelism, rounds=3):
+    """Median wall time of one hash with the given parameters."""
+    from argon2 import PasswordHasher
+
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def calibrate(target_ms=None, memory_budget_kib=None, workers=None, verbose=True):
+    """
+    Picks parameters for this host:
+      * memory: the budget split across the hashing pool's workers (each
+        concurrent hash needs its own), capped at 64 MiB, floored at 19 MiB
+      * parallelism: the CPU count, at most 4
+      * time cost: the largest value whose median latency stays within target
+    Returns (params, measured_ms).
+    """
+    target_ms = target_ms or config.ARGON2_TARGET_MS
+    memory_budget_kib = memory_budget_kib or config.ARGON2_MEMORY_BUDGET_KIB
+    workers = workers or config.HASH_POOL_WORKERS
+
+    memory_cost = max(MIN_MEMORY_KIB, min(DEFAULT_PARAMS["memory_cost"], memory_budget_kib // max(1, workers)))
+    parallelism = max(1, min(4, os.cpu_count() or 1))
+
+    # Too slow even at the minimum time cost: trade memory for speed first
+    elapsed = measure_ms(MIN_TIME_COST, memory_cost, parallelism)
+    while elapsed > target_ms and memory_cost > MIN_MEMORY_KIB:
+        memory_cost = max(MIN_MEMORY_KIB, memory_cost // 2)
+        elapsed = measure_ms(MIN_TIME_COST, memory_cost, parallelism)
+
+    time_cost = MIN_TIME_COST
+    while time_cost < MAX_TIME_COST:
+        candidate_ms = measure_ms(time_cost + 1, memory_cost, parallelism)
+        if candidate_ms > target_ms:
+            break
+        time_cost, elapsed = time_cost + 1, candidate_ms
+
+    params = {"time_cost": time_cost, "memory_cost": memory_cost, "parallelism": parallelism}
+    if verbose:
+        print(f"Argon2id: t={time_cost}, m={memory_cost} KiB, p={parallelism} -> {elapsed:.0f} ms "
+              f"(target {target_ms} ms, budget {memory_budget_kib} KiB over {workers} workers)")
+    return params, elapsed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark this host and store Argon2id parameters.")
+    parser.add_argument("command", choices=["calibrate", "show"])
+    parser.add_argument("--target-ms", type=int, help="target latency per hash")
+    parser.add_argument("--memory-kib", type=int, help="total memory budget for concurrent hashes")
+    parser.add_argument("--if-missing", action="store_true", help="keep existing parameters if already calibrated")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        print(json.dumps(load_params(), indent=2))
+    elif args.if_missing and os.path.exists(config.ARGON2_PARAMS_PATH):
+        print(f"Argon2 parameters already calibrated ({config.ARGON2_PARAMS_PATH})")
+    else:
+        params, elapsed = calibrate(args.target_ms, args.memory_kib)
+        save_params(params, elapsed)
+        print(f"Saved to {config.ARGON2_PARAMS_PATH}")
@@ -1,11 +1,15 @@
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 import sqlite3
-from app.db import get_conn
+import threading
+from app.db import connection
+from app.executors import BoundedProcessPool
+from app import argon2_params
 
 # Initialize Argon2id Hasher
-# Default parameters are secure: time_cost=3, memory_cost=65536, parallelism=4
-ph = PasswordHasher()
+# Uses the host-calibrated parameters (python -m app.argon2_params calibrate),
+# falling back to the library defaults: time_cost=3, memory_cost=65536, parallelism=4
+ph = PasswordHasher(**argon2_params.load_params())
 
 def hash_password(password: str) -> str:
     """Hashes a password using Argon2id."""
@@ -20,23 +24,57 @@ def check_password(hashed_password: str, user_password: str) -> bool:
     except Exception:
         return False
 
-def create_admin(username, password, full_name="Admin User"):
-    """Creates a new admin user with Argon2id hashing."""
-    conn = get_conn()
-    cursor = conn.cursor()
-    
-    hashed = hash_password(password)
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with parameters other than the current ones."""
+    try:
+        return ph.check_needs_rehash(hashed_password)
+    except Exception:
+        return False
+
+# --- Hashing Pool ---
+# Argon2id takes hundreds of milliseconds of CPU per call, so API handlers
+# hash and verify through a bounded process pool instead of inline.
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            from app import config
+            _hash_pool = BoundedProcessPool("hashing", config.HASH_POOL_WORKERS, config.HASH_POOL_MAX_PENDING)
+        return _hash_pool
+
+def shutdown_hash_pool():
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown()
+
+async def hash_password_async(password: str) -> str:
+    """hash_password in the hashing pool. Raises ExecutorSaturated when full."""
+    return await get_hash_pool().run_async(hash_password, password)
+
+async def verify_password_async(hashed_password: str, user_password: str) -> bool:
+    """check_password in the hashing pool. Raises ExecutorSaturated when full."""
+    return await get_hash_pool().run_async(check_password, hashed_password, user_password)
+
+def hash_password_pooled(password: str) -> str:
+    """Blocking hash through the pool, for sync handlers (already off the event loop)."""
+    return get_hash_pool().run(hash_password, password)
+
+def create_admin(username, password, full_name="Admin User", password_hash=None):
+    """Creates a new admin user with Argon2id hashing (pass `password_hash` if already hashed)."""
+    hashed = password_hash or hash_password(password)
     
     try:
-        cursor.execute(
-            "INSERT INTO Admins (username, password_hash, full_name) VALUES (?, ?, ?)",
-            (username, hashed, full_name)
-        )
-        conn.commit()
+        with connection() as conn:
+            conn.execute(
+                "INSERT INTO Admins (username, password_hash, full_name) VALUES (?, ?, ?)",
+                (username, hashed, full_name)
+            )
         print(f"Admin user '{username}' created successfully.")
     except sqlite3.IntegrityError:
         print(f"Error: Admin username '{username}' already exists.")
     except Exception as e:
         print(f"Error creating admin: {e}")
-    finally:
-        conn.close()
@@ -0,0 +1,76 @@
+# Change data capture for the Power BI export.
+#
+# Triggers on the exported tables append one ChangeLog row per insert, update
+# or delete: (seq, table, row id, 'U' for upserts / 'D' for deletes). `seq`
+# only ever grows, so an exporter can remember the last seq it shipped per
+# table (its high-water mark) and later fetch just what changed after it.
+# Several changes to the same row collapse to the latest one.
+#
+# See export_powerbi.py for the consumer; it prunes entries it has shipped.
+
+TABLES = ["Customers", "Verifications", "LoanEligibility", "Transactions", "FinancialHealth"]
+
+TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS ChangeLog (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL, -- 'U' (insert / update), 'D' (delete)
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_changelog_table_seq ON ChangeLog(table_name, seq)"
+
+def trigger_statements(tables=TABLES):
+    statements = []
+    for table in tables:
+        prefix = f"trg_cdc_{table.lower()}"
+        for event, row, op in (("INSERT", "NEW", "U"), ("UPDATE", "NEW", "U"), ("DELETE", "OLD", "D")):
+            statements.append(
+                f"CREATE TRIGGER {prefix}_{event.lower()} AFTER {event} ON {table} BEGIN\n"
+                f"    INSERT INTO ChangeLog (table_name, row_id, op) VALUES ('{table}', {row}.rowid, '{op}');\n"
+                f"END"
+            )
+    return statements
+
+def install(conn):
+    """Creates ChangeLog and (re)creates the triggers. Runs in the caller's transaction."""
+    conn.execute(TABLE_SQL)
+    conn.execute(INDEX_SQL)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_cdc_%'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    for statement in trigger_statements():
+        conn.execute(statement)
+
+def current_seq(conn):
+    """Highest seq ever handed out (pruned entries included), 0 if none."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'").fetchone()
+    return row[0] if row else 0
+
+def has_changes(conn, table, after_seq, upto_seq):
+    return conn.execute(
+        "SELECT 1 FROM ChangeLog WHERE table_name = ? AND seq > ? AND seq <= ? LIMIT 1",
+        (table, after_seq, upto_seq)
+    ).fetchone() is not None
+
+def changed_rows(conn, table, after_seq, upto_seq):
+    """
+    Latest state of every row changed in (after_seq, upto_seq], ordered by
+    seq: _seq, _op, _row_id, then the table's columns (all NULL for a
+    deleted row). Call inside the read transaction that produced `upto_seq`.
+    """
+    return conn.execute(f"""
+        SELECT ch.seq AS _seq, CASE WHEN t.rowid IS NULL THEN 'D' ELSE 'U' END AS _op, ch.row_id AS _row_id, t.*
+        FROM (
+            SELECT row_id, MAX(seq) AS seq FROM ChangeLog
+            WHERE table_name = ? AND seq > ? AND seq <= ?
+            GROUP BY row_id
+        ) ch
+        LEFT JOIN {table} t ON t.rowid = ch.row_id
+        ORDER BY ch.seq
+    """, (table, after_seq, upto_seq))
+
+def prune(conn, table, upto_seq):
+    """Drops ChangeLog entries a consumer has shipped."""
+    return conn.execute("DELETE FROM ChangeLog WHERE table_name = ? AND seq <= ?", (table, upto_seq)).rowcount
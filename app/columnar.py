@@ -0,0 +1,140 @@
+import os
+
+# Columnar (Parquet / Arrow IPC) output for the analytics exports.
+#
+# pyarrow (in requirements.txt) is imported on first use, so only these
+# exports need it installed. Rows are converted and written one batch at a time (one Parquet
+# row group / IPC record batch each), so memory stays at a single batch.
+# Column types come from the declared SQLite types, so every batch has the
+# same schema even when a batch happens to be all NULL in some column.
+#
+# Parquet files use dictionary encoding (good for status / segment style
+# columns) and zstd compression; Arrow IPC files use zstd buffer compression.
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet / Arrow exports need pyarrow: pip install pyarrow")
+    return pyarrow
+
+def arrow_type(declared):
+    """Arrow type for a declared SQLite column type (SQLite affinity rules)."""
+    pa = require_pyarrow()
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB", "NUMERIC", "DECIMAL")):
+        return pa.float64()
+    if "BOOL" in declared:
+        return pa.bool_()
+    if "BLOB" in declared:
+        return pa.binary()
+    # TEXT, TIMESTAMP (stored as 'YYYY-MM-DD HH:MM:SS' text) and untyped columns
+    return pa.string()
+
+def table_schema(conn, table, columns=None):
+    """Arrow schema for a table (or the given subset of its columns, in that order)."""
+    pa = require_pyarrow()
+    declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+    return pa.schema([pa.field(name, arrow_type(declared[name])) for name in (columns or declared)])
+
+_warned = set()
+
+def _to_array(pa, values, field):
+    try:
+        return pa.array(values, type=field.type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+        pass
+    # SQLite doesn't enforce column types; coerce stray values instead of failing the export
+    if pa.types.is_string(field.type):
+        return pa.array([None if v is None else str(v) for v in values], type=field.type)
+    coerced = []
+    for v in values:
+        try:
+            coerced.append(None if v is None else field.type.to_pandas_dtype()(v))
+        except (TypeError, ValueError, OverflowError):
+            coerced.append(None)
+    if field.name not in _warned:
+        _warned.add(field.name)
+        print(f"Warning: non-{field.type} values in column '{field.name}' exported as nulls")
+    return pa.array(coerced, type=field.type)
+
+def record_batch(schema, rows):
+    """Builds a RecordBatch from row tuples in schema order."""
+    pa = require_pyarrow()
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [_to_array(pa, list(values), field) for values, field in zip(columns, schema)],
+        schema=schema
+    )
+
+def write_batches(path, schema, row_batches, fmt="parquet"):
+    """
+    Writes an iterable of row lists to `path` (atomically) as Parquet or
+    Arrow IPC, one row group / record batch per list. Returns the row count.
+    """
+    pa = require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+
+    tmp = path + ".tmp"
+    count = 0
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(tmp, schema, compression="zstd", use_dictionary=True)
+    else:
+        import pyarrow.ipc as ipc
+        writer = ipc.new_file(tmp, schema, options=ipc.IpcWriteOptions(compression="zstd"))
+    try:
+        for rows in row_batches:
+            if rows:
+                writer.write_batch(record_batch(schema, rows))
+                count += len(rows)
+    except BaseException:
+        writer.close()
+        os.remove(tmp)
+        raise
+    writer.close()
+    os.replace(tmp, path)
+    return count
+
+def write_table(path, table, fmt="parquet"):
+    """Writes a whole pyarrow Table (atomically)."""
+    require_pyarrow()
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp, compression="zstd", use_dictionary=True)
+    else:
+        import pyarrow.ipc as ipc
+        with ipc.new_file(tmp, table.schema, options=ipc.IpcWriteOptions(compression="zstd")) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return table.num_rows
+
+def read_table(path):
+    """Reads a .parquet or .arrow file written by this module."""
+    require_pyarrow()
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    import pyarrow.ipc as ipc
+    with ipc.open_file(path) as reader:
+        return reader.read_all()
+
+def latest_rows(tables, key="id", seq="_seq", op="_op"):
+    """
+    Merges change partitions (pyarrow Tables with seq / op columns) into the
+    current rows: the highest seq per key wins and 'D' tombstones are dropped.
+    """
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    merged = pa.concat_tables(tables, promote_options="default")
+    latest = merged.group_by(key).aggregate([(seq, "max")]).rename_columns([key, seq])
+    current = merged.join(latest, keys=[key, seq], join_type="inner")
+    current = current.filter(pc.not_equal(current[op], "D")).sort_by([(key, "ascending")])
+    return current.select(merged.column_names)
@@ -19,3 +19,58 @@ ADMIN_WHATSAPP_NUMBER = os.getenv("ADMIN_WHATSAPP_NUMBER", "whatsapp:+92XXXXXXXX
 # --- DEV CONFIGURATION ---
 USE_FIXED_2FA = False
 FIXED_2FA_CODE = "123456"
+
+# --- DATABASE CONFIGURATION ---
+# Connection pool and SQLite tuning (see app/db_pool.py)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KIB = int(os.getenv("DB_CACHE_SIZE_KIB", "16384"))  # page cache per connection
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
+DB_LEAK_THRESHOLD_SECONDS = float(os.getenv("DB_LEAK_THRESHOLD_SECONDS", "30"))
+# Thread pool behind the async routes (see db.run / db.offload)
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+DB_EXECUTOR_MAX_QUEUE = int(os.getenv("DB_EXECUTOR_MAX_QUEUE", "200"))  # waiting calls before 503
+# Single-writer queue (see app/db_writer.py): group commit + BEGIN IMMEDIATE retries
+DB_WRITER_MAX_BATCH = int(os.getenv("DB_WRITER_MAX_BATCH", "64"))
+DB_WRITER_MAX_DELAY_MS = float(os.getenv("DB_WRITER_MAX_DELAY_MS", "2"))  # wait for more writes to group
+DB_WRITER_RETRIES = int(os.getenv("DB_WRITER_RETRIES", "5"))
+DB_WRITER_BACKOFF_MS = float(os.getenv("DB_WRITER_BACKOFF_MS", "50"))
+DB_WRITER_BUSY_TIMEOUT_MS = int(os.getenv("DB_WRITER_BUSY_TIMEOUT_MS", "1000"))
+# Read-only reporting snapshot (see app/snapshot.py)
+REPORTS_FROM_SNAPSHOT = os.getenv("REPORTS_FROM_SNAPSHOT", "0") == "1"  # route reports / exports to the snapshot
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join("data", "kyc_snapshot.sqlite3"))
+SNAPSHOT_REFRESH_SECONDS = int(os.getenv("SNAPSHOT_REFRESH_SECONDS", "300"))  # 0 = only via python -m app.snapshot
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "3600"))  # older snapshots fall back to live
+SNAPSHOT_PAGES_PER_STEP = int(os.getenv("SNAPSHOT_PAGES_PER_STEP", "256"))
+SNAPSHOT_STEP_SLEEP_MS = float(os.getenv("SNAPSHOT_STEP_SLEEP_MS", "5"))
+
+# --- WORKER POOLS ---
+# Argon2 hashing runs in a process pool so it never blocks the event loop.
+# Requests beyond workers + pending are rejected with 503 instead of queueing.
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 2)))
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", "32"))
+# Loan letter rendering (ReportLab) runs in its own pool, same rules
+PDF_POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+PDF_POOL_MAX_PENDING = int(os.getenv("PDF_POOL_MAX_PENDING", "64"))
+# Threads decrypting export batches (0 = decrypt in the streaming thread)
+EXPORT_DECRYPT_WORKERS = int(os.getenv("EXPORT_DECRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))  # rows fetched, decrypted and flushed at a time
+
+# Background report jobs (app/report_jobs.py)
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+REPORT_JOB_RETENTION_HOURS = float(os.getenv("REPORT_JOB_RETENTION_HOURS", "24"))  # finished jobs and artifacts
+REPORT_JOB_MAX_ARTIFACTS = int(os.getenv("REPORT_JOB_MAX_ARTIFACTS", "50"))
+REPORT_JOB_MAX_STORE_MB = int(os.getenv("REPORT_JOB_MAX_STORE_MB", "1024"))
+REPORT_JOB_SHUTDOWN_GRACE = float(os.getenv("REPORT_JOB_SHUTDOWN_GRACE", "30"))  # seconds running jobs get to finish on shutdown
+
+# Loan decision letter cache (generated_pdfs/), evicted least recently used first
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "256"))
+PDF_CACHE_MAX_AGE_DAYS = float(os.getenv("PDF_CACHE_MAX_AGE_DAYS", "30"))
+
+# --- PASSWORD HASHING ---
+# `python -m app.argon2_params calibrate` picks Argon2id parameters for the host
+# within these limits; hashes made with older parameters are upgraded on login.
+ARGON2_PARAMS_PATH = os.getenv("ARGON2_PARAMS_PATH", os.path.join("data", "argon2_params.json"))
+ARGON2_TARGET_MS = int(os.getenv("ARGON2_TARGET_MS", "250"))
+ARGON2_MEMORY_BUDGET_KIB = int(os.getenv("ARGON2_MEMORY_BUDGET_KIB", str(128 * 1024)))  # across all hashing workers
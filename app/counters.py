@@ -0,0 +1,157 @@
+import sys
+
+# Trigger-maintained counters for the admin KPIs.
+#
+# Counters(name, value) is kept current by AFTER INSERT / UPDATE / DELETE
+# triggers, so KPI reads are a primary-key lookup instead of a COUNT(*) over
+# the whole table. Each source below says which table feeds a counter, how
+# a row maps to a counter name and what it weighs (0 or 1). The triggers and
+# the repair query are both generated from these sources, so they can't drift
+# apart. Missing counters read as 0.
+#
+#   python -m app.counters show      # current values
+#   python -m app.counters check     # compare with a recount, exit 1 on drift
+#   python -m app.counters repair    # recompute everything from scratch
+
+# (table, name expression, weight expression, columns that can move a row between counters)
+# Expressions use `{r}` for the row: NEW / OLD in triggers, an alias in the recount.
+SOURCES = [
+    ("Customers", "'customers.total'", "1", ()),
+    ("Verifications", "'verifications.status.' || IFNULL({r}.status, '')", "1", ("status",)),
+    ("Verifications", "'verifications.flagged'",
+     "CASE WHEN {r}.risk_score > 80 OR {r}.status = 'Rejected' THEN 1 ELSE 0 END", ("status", "risk_score")),
+    ("LoanEligibility", "'loans.status.' || IFNULL({r}.eligibility_status, '')", "1", ("eligibility_status",)),
+    ("Notifications", "'notifications.unread.' || {r}.customer_id",
+     "CASE WHEN {r}.is_read = 0 THEN 1 ELSE 0 END", ("customer_id", "is_read")),
+]
+
+TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS Counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+"""
+
+# --- Triggers ---
+
+def _bump(name_expr, weight_expr, row, sign):
+    name_expr = name_expr.format(r=row)
+    weight_expr = weight_expr.format(r=row)
+    # The WHERE is required before ON CONFLICT in INSERT ... SELECT, and skips no-op rows
+    return f"""
+        INSERT INTO Counters (name, value) SELECT {name_expr}, {sign}({weight_expr}) WHERE ({weight_expr}) <> 0
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;"""
+
+def trigger_statements():
+    """CREATE TRIGGER statements for every source table (one trigger per table and event)."""
+    tables = {}
+    for table, name_expr, weight_expr, columns in SOURCES:
+        tables.setdefault(table, []).append((name_expr, weight_expr, columns))
+
+    statements = []
+    for table, sources in tables.items():
+        prefix = f"trg_counters_{table.lower()}"
+        inserts = "".join(_bump(n, w, "NEW", "+") for n, w, _ in sources)
+        deletes = "".join(_bump(n, w, "OLD", "-") for n, w, _ in sources)
+        statements.append(f"CREATE TRIGGER {prefix}_insert AFTER INSERT ON {table} BEGIN{inserts}\nEND")
+        statements.append(f"CREATE TRIGGER {prefix}_delete AFTER DELETE ON {table} BEGIN{deletes}\nEND")
+
+        moving = [(n, w, c) for n, w, c in sources if c]
+        if moving:
+            columns = sorted({column for _, _, cols in moving for column in cols})
+            changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)
+            updates = "".join(_bump(n, w, "OLD", "-") + _bump(n, w, "NEW", "+") for n, w, _ in moving)
+            statements.append(
+                f"CREATE TRIGGER {prefix}_update AFTER UPDATE OF {', '.join(columns)} ON {table}\n"
+                f"WHEN {changed} BEGIN{updates}\nEND"
+            )
+    return statements
+
+def install(conn):
+    """Creates the table and (re)creates the triggers, then recounts. Runs in the caller's transaction."""
+    conn.execute(TABLE_SQL)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_counters_%'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    for statement in trigger_statements():
+        conn.execute(statement)
+    repair(conn)
+
+# --- Recount ---
+
+def _recount_sql():
+    return " UNION ALL ".join(
+        f"SELECT {name_expr.format(r='r')} AS name, SUM({weight_expr.format(r='r')}) AS value FROM {table} AS r GROUP BY 1"
+        for table, name_expr, weight_expr, _ in SOURCES
+    )
+
+def recount(conn):
+    """{name: value} computed from the source tables (zero counters omitted)."""
+    return {name: value for name, value in conn.execute(_recount_sql()) if value}
+
+def repair(conn):
+    """Replaces every counter with a fresh recount. Returns the number of counters written."""
+    conn.execute("DELETE FROM Counters")
+    conn.execute(f"INSERT INTO Counters (name, value) SELECT name, value FROM ({_recount_sql()}) WHERE value <> 0")
+    return conn.execute("SELECT COUNT(*) FROM Counters").fetchone()[0]
+
+def drift(conn):
+    """[(name, stored, actual)] for counters that disagree with a recount."""
+    stored = {name: value for name, value in conn.execute("SELECT name, value FROM Counters") if value}
+    actual = recount(conn)
+    return [(name, stored.get(name, 0), actual.get(name, 0))
+            for name in sorted(set(stored) | set(actual)) if stored.get(name, 0) != actual.get(name, 0)]
+
+# --- Reads ---
+
+def get(conn, *names):
+    """{name: value} for the given counters; missing ones are 0."""
+    values = dict.fromkeys(names, 0)
+    if names:
+        placeholders = ", ".join("?" for _ in names)
+        for row in conn.execute(f"SELECT name, value FROM Counters WHERE name IN ({placeholders})", names):
+            values[row[0]] = row[1]
+    return values
+
+def verification_counts(conn):
+    """{'Verified': n, 'Rejected': n, 'Pending': n}"""
+    statuses = ("Verified", "Rejected", "Pending")
+    values = get(conn, *(f"verifications.status.{s}" for s in statuses))
+    return {s: values[f"verifications.status.{s}"] for s in statuses}
+
+def admin_kpis(conn):
+    values = get(conn, "customers.total", "verifications.status.Pending", "verifications.status.Verified",
+                 "verifications.flagged", "loans.status.Auto-Approved")
+    return {
+        "total_customers": values["customers.total"],
+        "pending_verifications": values["verifications.status.Pending"],
+        "verified": values["verifications.status.Verified"],
+        "flagged": values["verifications.flagged"],
+        "approved_loans": values["loans.status.Auto-Approved"],
+    }
+
+def unread_notifications(conn, customer_id):
+    return get(conn, f"notifications.unread.{customer_id}")[f"notifications.unread.{customer_id}"]
+
+if __name__ == "__main__":
+    from app import db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "show"
+    if command not in ("show", "check", "repair"):
+        print("Usage: python -m app.counters [show|check|repair]")
+        sys.exit(2)
+
+    db.init_db()
+    with db.connection() as conn:
+        if command == "repair":
+            conn.execute("BEGIN IMMEDIATE")
+            print(f"Recounted {repair(conn)} counter(s)")
+        elif command == "check":
+            mismatches = drift(conn)
+            for name, stored, actual in mismatches:
+                print(f"DRIFT  {name}: stored {stored}, actual {actual}")
+            print(f"{len(mismatches)} counter(s) out of sync" if mismatches else "All counters match")
+            if mismatches:
+                sys.exit(1)
+        else:
+            for name, value in conn.execute("SELECT name, value FROM Counters ORDER BY name"):
+                print(f"{name:<40} {value}")
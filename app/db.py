@@ -1,243 +1,514 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
+from app import config
+from app.db_pool import ConnectionPool, configure_connection
+from app import db_executor
+from app.db_writer import DBWriter
 
 DB_PATH = os.path.join('data', 'kyc.sqlite3')
 SCHEMA_PATH = os.path.join('app', 'schema.sql')
 
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_writer = None
+_writer_pid = None
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use (and after fork)."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(
+                    DB_PATH,
+                    size=config.DB_POOL_SIZE,
+                    timeout=config.DB_POOL_TIMEOUT,
+                    leak_threshold=config.DB_LEAK_THRESHOLD_SECONDS,
+                    busy_timeout_ms=config.DB_BUSY_TIMEOUT_MS,
+                    cache_size_kib=config.DB_CACHE_SIZE_KIB,
+                    mmap_size=config.DB_MMAP_SIZE
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+def connection():
+    """
+    Context manager yielding a pooled connection:
+
+        with db.connection() as conn:
+            conn.execute(...)
+
+    Commits on success, rolls back on error, and always returns the connection.
+    """
+    return get_pool().connection()
+
+def pool_metrics():
+    return get_pool().metrics()
+
+# --- Async Facade ---
+# Async routes must not call sqlite3 on the event loop. They either await
+# db.run(fn, ...) or are plain functions decorated with @db.offload; both
+# execute on a dedicated DB thread pool (DB_EXECUTOR_WORKERS threads).
+
+def get_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _pool_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = db_executor.DBExecutor(config.DB_EXECUTOR_WORKERS, config.DB_EXECUTOR_MAX_QUEUE)
+                _executor_pid = os.getpid()
+    return _executor
+
+async def run(fn, *args, **kwargs):
+    """Awaits fn(*args, **kwargs) on the DB thread pool."""
+    return await get_executor().run(fn, *args, **kwargs)
+
+offload = db_executor.offload(get_executor)
+
+def executor_metrics():
+    return get_executor().metrics()
+
+# --- Single Writer ---
+# Independent commits from many threads/workers fight over SQLite's write
+# lock. Write helpers called without a `conn` go through one writer thread
+# that group-commits whatever is queued; helpers called with a `conn` join
+# the caller's transaction as before.
+
+def get_writer():
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _pool_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer = DBWriter(
+                    DB_PATH,
+                    max_batch=config.DB_WRITER_MAX_BATCH,
+                    max_delay=config.DB_WRITER_MAX_DELAY_MS / 1000,
+                    retries=config.DB_WRITER_RETRIES,
+                    backoff=config.DB_WRITER_BACKOFF_MS / 1000,
+                    busy_timeout_ms=config.DB_WRITER_BUSY_TIMEOUT_MS,
+                    cache_size_kib=config.DB_CACHE_SIZE_KIB,
+                    mmap_size=config.DB_MMAP_SIZE
+                )
+                _writer_pid = os.getpid()
+    return _writer
+
+def write(fn, *args, **kwargs):
+    """Queues fn(*args, conn=<writer conn>, **kwargs) on the writer. Returns a Future."""
+    return get_writer().submit(fn, *args, **kwargs)
+
+def execute_write(fn, *args, **kwargs):
+    """Blocking write(): waits for the group commit and returns fn's result (e.g. lastrowid)."""
+    return write(fn, *args, **kwargs).result()
+
+def writer_metrics():
+    return get_writer().metrics()
+
+def close_writer():
+    """Flushes and stops this process's writer, if one was started."""
+    if _writer is not None and _writer_pid == os.getpid():
+        _writer.close()
+
+@contextmanager
+def unit_of_work():
+    """
+    Runs several CRUD helpers as ONE transaction on one connection:
+
+        with db.unit_of_work() as conn:
+            cust_id, code = db.insert_customer(..., conn=conn)
+            db.save_loan_eligibility(cust_id, ..., conn=conn)
+
+    BEGIN IMMEDIATE takes the write lock up front (no mid-transaction upgrade
+    deadlocks); everything commits once on exit or rolls back on error.
+    For scripts: request handlers pass such a function to execute_write()
+    instead, so their writes don't compete with the writer for the lock.
+    """
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+@contextmanager
+def savepoint(conn, name="sp"):
+    """Nested, independently rollback-able section inside a unit of work."""
+    conn.execute(f"SAVEPOINT {name}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute(f"ROLLBACK TO {name}")
+        conn.execute(f"RELEASE {name}")
+        raise
+    conn.execute(f"RELEASE {name}")
+
+@contextmanager
+def _connection_scope(conn=None):
+    """
+    Yields the caller's connection (so work joins their transaction) or, when
+    none is given, a pooled connection that commits on exit.
+    """
+    if conn is not None:
+        yield conn
+    else:
+        with connection() as own:
+            yield own
+
 def get_conn():
-    """Returns a connection to the SQLite database."""
+    """
+    Returns a standalone connection to the SQLite database (caller must close it).
+    Used by scripts and the desktop GUI; request handlers should use connection().
+    """
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return configure_connection(
+        conn,
+        busy_timeout_ms=config.DB_BUSY_TIMEOUT_MS,
+        cache_size_kib=config.DB_CACHE_SIZE_KIB,
+        mmap_size=config.DB_MMAP_SIZE
+    )
 
 def init_db():
-    """Initializes the database and performs schema migrations."""
-    if not os.path.exists(SCHEMA_PATH):
-        print(f"Error: Schema file not found at {SCHEMA_PATH}")
-        return
-
-    with open(SCHEMA_PATH, 'r') as f:
-        schema_sql = f.read()
-
-    conn = get_conn()
-    cursor = conn.cursor()
+    """
+    Brings the database schema up to date by applying pending migrations
+    (app/migrations). A no-op single read when already current.
+    """
+    from app import migrations
     try:
-        # 1. Run base schema (creates tables IF NOT EXISTS)
-        cursor.executescript(schema_sql)
-        
-        # 2. Add LoanEligibility Table (if not in schema.sql yet)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS LoanEligibility (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_id INTEGER,
-            risk_score INTEGER,
-            income_range TEXT,
-            eligibility_status TEXT,
-            max_limit INTEGER,
-            calculated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(customer_id) REFERENCES Customers(id)
-        )
-        ''')
-
-        # 3. Add AuditLog Table (if not in schema.sql yet)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS AuditLog (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            action TEXT,
-            admin_user TEXT,
-            details TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # 4. Add LoanApplications Table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS LoanApplications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_id INTEGER,
-            amount INTEGER,
-            purpose TEXT,
-            monthly_income INTEGER,
-            status TEXT DEFAULT 'Pending',
-            rejection_reason TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(customer_id) REFERENCES Customers(id)
-        )
-        ''')
-
-        # 5. Add Notifications Table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Notifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_id INTEGER,
-            title TEXT,
-            message TEXT,
-            is_read BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(customer_id) REFERENCES Customers(id)
-        )
-        ''')
-
-        # 6. Add Messages Table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_id INTEGER,
-            sender TEXT,
-            message TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(customer_id) REFERENCES Customers(id)
-        )
-        ''')
-
-        # 7. Add new columns to Customers (Migration)
-        try:
-            cursor.execute("ALTER TABLE Customers ADD COLUMN trust_score INTEGER DEFAULT 0")
-        except Exception:
-            pass 
-
-        try:
-            cursor.execute("ALTER TABLE Customers ADD COLUMN segment TEXT DEFAULT 'Standard'")
-        except Exception:
-            pass 
-
-        try:
-            cursor.execute("ALTER TABLE Admins ADD COLUMN settings TEXT DEFAULT '{}'")
-        except Exception:
-            pass 
-
-        try:
-            cursor.execute("ALTER TABLE LoanEligibility ADD COLUMN income_range TEXT")
-        except Exception:
-            pass 
-
-        try:
-            cursor.execute("ALTER TABLE Customers ADD COLUMN customer_code TEXT UNIQUE")
-        except Exception:
-            pass 
-
-        # Add date column to Verifications table for tracking verification dates
-        try:
-            cursor.execute("ALTER TABLE Verifications ADD COLUMN date TIMESTAMP")
-            # Populate existing records with updated_at value
-            cursor.execute("UPDATE Verifications SET date = updated_at WHERE date IS NULL")
-        except Exception:
-            pass 
-
-        conn.commit()
-        print(f"Database initialized and migrated successfully at {DB_PATH}")
+        applied = migrations.migrate()
+        if applied:
+            print(f"Database initialized and migrated successfully at {DB_PATH}")
     except sqlite3.Error as e:
         print(f"Database initialization failed: {e}")
-    finally:
-        conn.close()
 
 # --- CRUD Operations ---
 
 from app import security_utils
 
-# ... (imports)
+def backfill_blind_indexes(cursor):
+    """Fills cnic_bidx / phone_bidx for rows created before blind indexing existed."""
+    rows = cursor.execute(
+        "SELECT id, cnic, phone FROM Customers WHERE cnic_bidx IS NULL OR phone_bidx IS NULL"
+    ).fetchall()
+    if not rows:
+        return
+
+    updates = []
+    for row in rows:
+        cnic = security_utils.decrypt_data(row['cnic'])
+        phone = security_utils.decrypt_data(row['phone'])
+        if cnic in ("[ENCRYPTED]", "[INVALID DATA]"):
+            continue
+        updates.append((
+            security_utils.blind_index(cnic),
+            security_utils.blind_index(phone) if phone not in ("[ENCRYPTED]", "[INVALID DATA]") else None,
+            row['id']
+        ))
+
+    cursor.executemany("UPDATE Customers SET cnic_bidx = ?, phone_bidx = ? WHERE id = ?", updates)
+    print(f"Backfilled blind indexes for {len(updates)} customers")
+
+def get_customer_by_cnic(cnic, columns="*", conn=None):
+    """
+    Looks up a customer row by plaintext CNIC through the blind index.
+    Returns the raw (still encrypted) sqlite3.Row or None.
+    """
+    bidx = security_utils.blind_index(cnic)
+    if not bidx:
+        return None
+
+    with _connection_scope(conn) as conn:
+        return conn.execute(f"SELECT {columns} FROM Customers WHERE cnic_bidx = ?", (bidx,)).fetchone()
+
+def encrypt_customer(full_name, cnic, email, phone, address, income_range, password_hash, trust_score=50, segment="Standard"):
+    """
+    Customers column values for insert_customer_row(): encrypted and blind
+    indexed up front, so the write itself holds the lock only for the INSERT.
+    """
+    from app.services import duplicate_index
+    return {
+        "full_name": full_name,
+        "cnic": security_utils.encrypt_data(cnic),
+        "email": email,
+        "phone": security_utils.encrypt_data(phone),
+        "address": security_utils.encrypt_data(address),
+        "income_range": income_range,
+        "password_hash": password_hash,
+        "trust_score": trust_score,
+        "segment": segment,
+        "cnic_bidx": security_utils.blind_index(cnic),
+        "phone_bidx": security_utils.blind_index(phone),
+        "email_bidx": duplicate_index.email_key(email) if email else None,
+    }
+
+def insert_customer(full_name, cnic, email, phone, address, income_range, password_hash, trust_score=50, segment="Standard", conn=None):
+    row = encrypt_customer(full_name, cnic, email, phone, address, income_range, password_hash, trust_score, segment)
+    return insert_customer_row(row, conn=conn)
+
+def insert_customer_row(row, conn=None):
+    """Inserts encrypt_customer() values under a new unique customer code. Returns (id, code)."""
+    if conn is None:
+        return execute_write(insert_customer_row, row)
+    from app.services import duplicate_index
 
-def insert_customer(full_name, cnic, email, phone, address, income_range, password_hash, trust_score=50, segment="Standard"):
-    conn = get_conn()
-    cursor = conn.cursor()
-    
-    # Encrypt Sensitive Data
-    enc_cnic = security_utils.encrypt_data(cnic)
-    enc_phone = security_utils.encrypt_data(phone)
-    enc_address = security_utils.encrypt_data(address)
-    
     # Generate Unique Customer Code (8-character alphanumeric)
     import random
     import string
-    customer_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    
-    # Ensure uniqueness
-    while cursor.execute("SELECT id FROM Customers WHERE customer_code = ?", (customer_code,)).fetchone():
-        customer_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    
+    def new_code():
+        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    customer_code = new_code()
+    while conn.execute("SELECT id FROM Customers WHERE customer_code = ?", (customer_code,)).fetchone():
+        customer_code = new_code()
+
+    columns = ", ".join([*row, "customer_code"])
+    placeholders = ", ".join("?" * (len(row) + 1))
     try:
-        cursor.execute(
-            "INSERT INTO Customers (full_name, cnic, email, phone, address, income_range, password_hash, trust_score, segment, customer_code) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (full_name, enc_cnic, email, enc_phone, enc_address, income_range, password_hash, trust_score, segment, customer_code)
-        )
-        conn.commit()
-        customer_id = cursor.lastrowid
-        conn.close()
-        return customer_id, customer_code  # Return both ID and code
+        cursor = conn.execute(f"INSERT INTO Customers ({columns}) VALUES ({placeholders})", (*row.values(), customer_code))
     except sqlite3.IntegrityError:
-        # Note: Since CNIC is encrypted, uniqueness check might fail if we don't handle it carefully.
-        # For this demo, we assume the encrypted string is unique enough (deterministic encryption would be needed for strict unique index, but Fernet is non-deterministic).
-        # To keep it simple for the demo, we catch the error.
+        # The ciphertext is non-deterministic, so uniqueness is enforced by the
+        # unique index on cnic_bidx instead.
         raise ValueError("Customer with this CNIC already exists.")
-    finally:
-        conn.close()
-
-def insert_document(customer_id, doc_type, file_path):
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
+    customer_id = cursor.lastrowid
+    duplicate_index.index_customer(conn, customer_id, row["full_name"])
+    return customer_id, customer_code  # Return both ID and code
+
+def insert_document(customer_id, doc_type, file_path, conn=None):
+    if conn is None:
+        return execute_write(insert_document, customer_id, doc_type, file_path)
+    cursor = conn.execute(
         "INSERT INTO Documents (customer_id, doc_type, file_path) VALUES (?, ?, ?)",
         (customer_id, doc_type, file_path)
     )
-    conn.commit()
-    conn.close()
+    return cursor.lastrowid
 
-def update_verification_status(customer_id, status, risk_score, trust_score, remarks, verified_by):
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
+def update_verification_status(customer_id, status, risk_score, trust_score, remarks, verified_by, conn=None):
+    if conn is None:
+        return execute_write(update_verification_status, customer_id, status, risk_score, trust_score, remarks, verified_by)
+    conn.execute(
         """
         UPDATE Verifications 
-        SET status = ?, risk_score = ?, trust_score = ?, remarks = ?, verified_by = ?, updated_at = CURRENT_TIMESTAMP, date = CURRENT_TIMESTAMP
+        SET status = ?, risk_score = ?, trust_score = ?, remarks = ?, verified_by = ?, updated_at = CURRENT_TIMESTAMP, date = CURRENT_TIMESTAMP,
+            -- Decided verifications are flagged on the reviewed risk score alone
+            fraud_flagged = CASE WHEN ? = 'Pending' THEN (fraud_score > 30 OR ? > 70) ELSE ? > 70 END
         WHERE customer_id = ?
         """,
-        (status, risk_score, trust_score, remarks, verified_by, customer_id)
+        (status, risk_score, trust_score, remarks, verified_by, status, risk_score, risk_score, customer_id)
     )
-    conn.commit()
-    conn.close()
 
 def get_pending_customers():
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT c.id, c.full_name, c.cnic, v.status, v.risk_score, v.trust_score, v.remarks, v.updated_at 
-        FROM Customers c
-        JOIN Verifications v ON c.id = v.customer_id
-        WHERE v.status = 'Pending'
-    """)
-    return cursor.fetchall()
+    with connection() as conn:
+        return conn.execute("""
+            SELECT c.id, c.full_name, c.cnic, v.status, v.risk_score, v.trust_score, v.remarks, v.updated_at 
+            FROM Customers c
+            JOIN Verifications v ON c.id = v.customer_id
+            WHERE v.status = 'Pending'
+        """).fetchall()
+
+# Sort key -> (column, direction). Sorts on Verifications columns are driven
+# from Verifications (so its indexes give the order) and only list customers
+# that have a verification record.
+VERIFICATION_SORTS = {
+    "newest": ("c.created_at", "DESC"),
+    "oldest": ("c.created_at", "ASC"),
+    "updated": ("v.updated_at", "DESC"),
+    "risk_high": ("v.risk_score", "DESC"),
+    "risk_low": ("v.risk_score", "ASC"),
+}
+
+def verifications_page_query(sort="newest", after=None, limit=50, statuses=None, min_risk=None,
+                             max_risk=None, date_from=None, date_to=None, fraud_flagged=None):
+    """Builds (sql, params) for get_verifications_page; app/query_plans.py checks its plans."""
+    column, direction = VERIFICATION_SORTS[sort]
+    where, params = [], []
+
+    if column.startswith("v."):
+        tiebreak = "v.id"
+        source = "Verifications v JOIN Customers c ON c.id = v.customer_id"
+        where.append(f"{column} IS NOT NULL")
+    else:
+        tiebreak = "c.id"
+        source = "Customers c LEFT JOIN Verifications v ON c.id = v.customer_id"
+
+    # Pages are read in sort-index order and stop at LIMIT. Only the sort
+    # column (behind a single status, for Verifications sorts) may pick the
+    # index; the unary "+" keeps every other filter out of index selection,
+    # where it would win and leave the whole match set to a temp B-tree sort.
+    def filter_col(name):
+        return name if name == column else f"+{name}"
+
+    if statuses:
+        marks = ", ".join("?" * len(statuses))
+        status_col = "v.status" if tiebreak == "v.id" and len(statuses) == 1 else "+v.status"
+        clause = f"{status_col} IN ({marks})"
+        if "Pending" in statuses and tiebreak == "c.id":
+            clause = f"({clause} OR v.id IS NULL)"
+        where.append(clause)
+        params.extend(statuses)
+    if min_risk is not None:
+        where.append(f"{filter_col('v.risk_score')} >= ?")
+        params.append(min_risk)
+    if max_risk is not None:
+        where.append(f"{filter_col('v.risk_score')} <= ?")
+        params.append(max_risk)
+    if fraud_flagged is True:
+        where.append("+v.fraud_flagged = 1")
+    elif fraud_flagged is False:
+        where.append("COALESCE(v.fraud_flagged, 0) = 0")
+    if date_from:
+        where.append(f"{filter_col('c.created_at')} >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append(f"{filter_col('c.created_at')} < date(?, '+1 day')")
+        params.append(date_to)
+    if after is not None:
+        op = "<" if direction == "DESC" else ">"
+        where.append(f"({column}, {tiebreak}) {op} (?, ?)")
+        params.extend(after)
+
+    query = f"""
+        SELECT
+            c.id, c.full_name, c.cnic, c.email, c.phone, c.address, c.income_range, c.created_at,
+            v.status, v.risk_score, v.trust_score, v.remarks, v.updated_at, v.fraud_flagged, v.fraud_alerts,
+            rp.risk_level, rp.segment,
+            {column} AS sort_value, {tiebreak} AS sort_id
+        FROM {source}
+        LEFT JOIN RiskProfiles rp ON rp.customer_id = c.id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {column} {direction}, {tiebreak} {direction}
+        LIMIT ?
+    """
+    params.append(limit)
+    return query, params
+
+def get_verifications_page(sort="newest", after=None, limit=50, statuses=None, min_risk=None,
+                           max_risk=None, date_from=None, date_to=None, fraud_flagged=None, conn=None):
+    """Keyset-paginated Customers/Verifications listing. `after` is the (sort_value, sort_id) of the last row seen."""
+    query, params = verifications_page_query(sort, after, limit, statuses, min_risk, max_risk,
+                                             date_from, date_to, fraud_flagged)
+    with _connection_scope(conn) as conn:
+        return conn.execute(query, params).fetchall()
 
 def get_customer_by_id(customer_id):
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Customers WHERE id = ?", (customer_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute("SELECT * FROM Customers WHERE id = ?", (customer_id,)).fetchone()
     
     if row:
         # Convert Row to dict to modify it
         cust = dict(row)
+        cust.pop('cnic_bidx', None)
+        cust.pop('phone_bidx', None)
+        cust.pop('email_bidx', None)
         cust['cnic'] = security_utils.decrypt_data(cust['cnic'])
         cust['phone'] = security_utils.decrypt_data(cust['phone'])
         cust['address'] = security_utils.decrypt_data(cust['address'])
         return cust
     return None
 
-def log_action(action, admin_user, details):
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
+def mark_notifications_read(customer_id, conn=None):
+    if conn is None:
+        return execute_write(mark_notifications_read, customer_id)
+    conn.execute("UPDATE Notifications SET is_read = 1 WHERE customer_id = ? AND is_read = 0", (customer_id,))
+
+def delete_customer(customer_id, conn=None):
+    """Deletes a customer with their verification, loan eligibility, documents, risk profile and name trigrams."""
+    if conn is None:
+        return execute_write(delete_customer, customer_id)
+    from app.services import duplicate_index
+    conn.execute("DELETE FROM Verifications WHERE customer_id = ?", (customer_id,))
+    conn.execute("DELETE FROM LoanEligibility WHERE customer_id = ?", (customer_id,))
+    conn.execute("DELETE FROM Documents WHERE customer_id = ?", (customer_id,))
+    conn.execute("DELETE FROM Customers WHERE id = ?", (customer_id,))
+    duplicate_index.remove_customer(conn, customer_id)
+    conn.execute("DELETE FROM RiskProfiles WHERE customer_id = ?", (customer_id,))
+
+def log_action(action, admin_user, details, conn=None):
+    if conn is None:
+        return execute_write(log_action, action, admin_user, details)
+    cursor = conn.execute(
         "INSERT INTO AuditLog (action, admin_user, details) VALUES (?, ?, ?)",
         (action, admin_user, details)
     )
-    conn.commit()
-    conn.close()
+    return cursor.lastrowid
 
 # --- Loan Logic ---
 
-def init_financials(customer_id, is_demo=False):
-    conn = get_conn()
+def create_loan_application(customer_id, amount, purpose, monthly_income, conn=None):
+    """
+    Inserts a Pending application plus its notification. Raises ValueError if one
+    is already pending (checked inside the write, so two requests can't both pass).
+    """
+    if conn is None:
+        return execute_write(create_loan_application, customer_id, amount, purpose, monthly_income)
+
+    existing = conn.execute("SELECT id FROM LoanApplications WHERE customer_id = ? AND status = 'Pending'", (customer_id,)).fetchone()
+    if existing:
+        raise ValueError("You already have a pending loan application")
+
+    cursor = conn.execute("""
+        INSERT INTO LoanApplications (customer_id, amount, purpose, monthly_income, status)
+        VALUES (?, ?, ?, ?, 'Pending')
+    """, (customer_id, amount, purpose, monthly_income))
+    application_id = cursor.lastrowid
+
+    conn.execute("""
+        INSERT INTO Notifications (customer_id, title, message)
+        VALUES (?, 'Loan Application Submitted', 'Your loan application for PKR ' || ? || ' has been submitted successfully.')
+    """, (customer_id, amount))
+    return application_id
+
+def record_loan_decision(loan_id, decision, reason, conn=None):
+    """record_loan_decisions() for one loan. Returns the loan row, or None if missing."""
+    try:
+        return record_loan_decisions([(loan_id, decision, reason)], conn=conn)[0]
+    except ValueError:
+        return None
+
+def record_loan_decisions(decisions, conn=None):
+    """
+    Applies admin decisions, [(loan_id, decision, reason)], to LoanEligibility
+    and Verifications in one transaction, with one customer notification per
+    loan inserted together. Raises
+    ValueError (and applies nothing) if any loan is missing. Returns the loan
+    rows in input order.
+    """
+    if conn is None:
+        return execute_write(record_loan_decisions, decisions)
+
+    loan_ids = [loan_id for loan_id, _, _ in decisions]
+    loans = {}
+    # Stay under SQLite's bound-parameter limit
+    for i in range(0, len(loan_ids), 500):
+        chunk = loan_ids[i:i + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        for row in conn.execute(f"SELECT * FROM LoanEligibility WHERE id IN ({placeholders})", chunk):
+            loans[row['id']] = row
+    missing = [loan_id for loan_id in loan_ids if loan_id not in loans]
+    if missing:
+        raise ValueError(f"Loans not found: {', '.join(map(str, missing))}")
+
+    approved = [decision == "Approved" for _, decision, _ in decisions]
+    conn.executemany(
+        "UPDATE LoanEligibility SET eligibility_status = ? WHERE id = ?",
+        [("Approved" if ok else "Rejected", loan_id) for ok, loan_id in zip(approved, loan_ids)]
+    )
+    conn.executemany(
+        "UPDATE Verifications SET status = ?, remarks = ? WHERE customer_id = ?",
+        [("Verified" if ok else "Rejected", reason, loans[loan_id]['customer_id'])
+         for ok, (loan_id, _, reason) in zip(approved, decisions)]
+    )
+    conn.executemany(
+        "INSERT INTO Notifications (customer_id, title, message) VALUES (?, ?, ?)",
+        [(loans[loan_id]['customer_id'], "Loan Approved", "Your loan has been approved. Download your approval letter from the dashboard.")
+         if ok else
+         (loans[loan_id]['customer_id'], "Loan Rejected", f"Your loan application was not approved: {reason}")
+         for ok, (loan_id, _, reason) in zip(approved, decisions)]
+    )
+    return [loans[loan_id] for loan_id in loan_ids]
+
+def init_financials(customer_id, is_demo=False, conn=None):
+    if conn is None:
+        return execute_write(init_financials, customer_id, is_demo)
     cursor = conn.cursor()
 
     if is_demo:
@@ -246,7 +517,7 @@ def init_financials(customer_id, is_demo=False):
             "INSERT INTO FinancialHealth (customer_id, spending_score, savings_rate, predicted_balance) VALUES (?, ?, ?, ?)",
             (customer_id, 72, 15.5, 183385.0)
         )
-        
+    
         # 2. Transactions
         txs = [
             (customer_id, 761, "Debit", "Transport", "2025-11-18"),
@@ -256,7 +527,7 @@ def init_financials(customer_id, is_demo=False):
             (customer_id, 64435, "Credit", "Salary", "2025-11-10")
         ]
         cursor.executemany("INSERT INTO Transactions (customer_id, amount, type, category, date) VALUES (?, ?, ?, ?, ?)", txs)
-        
+    
     else:
         # Real User: Start with 0
         cursor.execute(
@@ -264,27 +535,41 @@ def init_financials(customer_id, is_demo=False):
             (customer_id, 0, 0.0, 0.0)
         )
         # No transactions for real users
-        
-    conn.commit()
-    conn.close()
 
 def get_customer_financials(customer_id):
-    conn = get_conn()
-    cursor = conn.cursor()
+    with connection() as conn:
+        health = conn.execute("SELECT * FROM FinancialHealth WHERE customer_id=?", (customer_id,)).fetchone()
+        transactions = conn.execute("SELECT * FROM Transactions WHERE customer_id=? ORDER BY date DESC LIMIT 5", (customer_id,)).fetchall()
     
-    health = cursor.execute("SELECT * FROM FinancialHealth WHERE customer_id=?", (customer_id,)).fetchone()
-    transactions = cursor.execute("SELECT * FROM Transactions WHERE customer_id=? ORDER BY date DESC LIMIT 5", (customer_id,)).fetchall()
-    
-    conn.close()
     return health, transactions
 
 import json
 
+def get_admin_by_username(username):
+    with connection() as conn:
+        return conn.execute("SELECT * FROM Admins WHERE username = ?", (username,)).fetchone()
+
+def insert_admin(username, password_hash, full_name, conn=None):
+    if conn is None:
+        return execute_write(insert_admin, username, password_hash, full_name)
+    conn.execute("INSERT INTO Admins (username, password_hash, full_name) VALUES (?, ?, ?)",
+                 (username, password_hash, full_name))
+
+def update_admin_password(username, password_hash, conn=None):
+    if conn is None:
+        return execute_write(update_admin_password, username, password_hash)
+    conn.execute("UPDATE Admins SET password_hash = ? WHERE username = ?", (password_hash, username))
+
+def replace_password_hash(table, user_id, old_hash, new_hash, conn=None):
+    """Swaps in a new hash only if the stored one is still `old_hash`."""
+    if conn is None:
+        return execute_write(replace_password_hash, table, user_id, old_hash, new_hash)
+    conn.execute(f"UPDATE {table} SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                 (new_hash, user_id, old_hash))
+
 def get_admin_settings(username):
-    conn = get_conn()
-    cursor = conn.cursor()
-    row = cursor.execute("SELECT settings FROM Admins WHERE username = ?", (username,)).fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute("SELECT settings FROM Admins WHERE username = ?", (username,)).fetchone()
     if row and row[0]:
         try:
             return json.loads(row[0])
@@ -292,36 +577,34 @@ def get_admin_settings(username):
             return {}
     return {}
 
-def update_admin_settings(username, settings):
-    conn = get_conn()
-    cursor = conn.cursor()
-    settings_json = json.dumps(settings)
-    cursor.execute("UPDATE Admins SET settings = ? WHERE username = ?", (settings_json, username))
-    conn.commit()
-    conn.close()
+def update_admin_settings(username, settings, conn=None):
+    if conn is None:
+        return execute_write(update_admin_settings, username, settings)
+    conn.execute("UPDATE Admins SET settings = ? WHERE username = ?", (json.dumps(settings), username))
 
 # --- Aliases & Missing Functions for KYC API ---
 
-def save_loan_eligibility(customer_id, risk_score, income_range, status, max_limit):
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
+def save_loan_eligibility(customer_id, risk_score, income_range, status, max_limit, conn=None):
+    if conn is None:
+        return execute_write(save_loan_eligibility, customer_id, risk_score, income_range, status, max_limit)
+    conn.execute(
         "INSERT INTO LoanEligibility (customer_id, risk_score, income_range, eligibility_status, max_limit) VALUES (?, ?, ?, ?, ?)",
         (customer_id, risk_score, income_range, status, max_limit)
     )
-    conn.commit()
-    conn.close()
 
-def create_verification_record(customer_id, risk_score, trust_score, remarks):
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO Verifications (customer_id, risk_score, trust_score, remarks, status) VALUES (?, ?, ?, ?, 'Pending')",
-        (customer_id, risk_score, trust_score, remarks)
+def create_verification_record(customer_id, risk_score, trust_score, remarks, fraud_score=0, fraud_alerts=None, conn=None):
+    """`risk_score` already includes `fraud_score` (see ai_utils.assess_fraud)."""
+    if conn is None:
+        return execute_write(create_verification_record, customer_id, risk_score, trust_score, remarks, fraud_score, fraud_alerts)
+    fraud_flagged = fraud_score > 30 or (risk_score or 0) > 70
+    conn.execute(
+        """
+        INSERT INTO Verifications (customer_id, risk_score, trust_score, remarks, status, fraud_score, fraud_flagged, fraud_alerts)
+        VALUES (?, ?, ?, ?, 'Pending', ?, ?, ?)
+        """,
+        (customer_id, risk_score, trust_score, remarks, fraud_score, int(fraud_flagged), json.dumps(fraud_alerts) if fraud_alerts else None)
     )
-    conn.commit()
-    conn.close()
 
 # Aliases
-generate_mock_financials = lambda cust_id: init_financials(cust_id, is_demo=True)
+generate_mock_financials = lambda cust_id, conn=None: init_financials(cust_id, is_demo=True, conn=conn)
 update_verification = update_verification_status
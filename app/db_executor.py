@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.executors import ExecutorSaturated
+
+class DBExecutor:
+    """
+    Dedicated thread pool that async routes hand their blocking sqlite3 /
+    decryption work to, so the event loop keeps serving other requests.
+
+    At most `max_queue` calls may wait for a thread; beyond that calls are
+    rejected with ExecutorSaturated (503) instead of piling up.
+    """
+
+    def __init__(self, workers, max_queue):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _call(self, fn, args, kwargs, queued_at):
+        started = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._total_wait += started - queued_at
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._total_run += time.monotonic() - started
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._queued + self._running >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated("Database is busy, try again shortly")
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+        return self._executor.submit(self._call, fn, args, kwargs, time.monotonic())
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def metrics(self):
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queue_depth,
+                "running": self._running,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / completed * 1000, 2) if completed else 0.0,
+                "avg_run_ms": round(self._total_run / completed * 1000, 2) if completed else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+def offload(get_executor):
+    """
+    Decorator factory: turns a sync function into an async one that runs on
+    the executor. functools.wraps keeps the signature for FastAPI's injection.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await get_executor().run(fn, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,201 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+def configure_connection(conn, busy_timeout_ms=5000, cache_size_kib=16384, mmap_size=0):
+    """
+    Applies the per-connection pragmas we rely on.
+    WAL lets readers run alongside the single writer, and synchronous=NORMAL
+    skips the fsync on every commit (WAL is still durable across app crashes).
+    """
+    conn.row_factory = sqlite3.Row
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        f"PRAGMA cache_size=-{int(cache_size_kib)}",
+        f"PRAGMA mmap_size={int(mmap_size)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    for pragma in pragmas:
+        try:
+            conn.execute(pragma)
+        except sqlite3.Error as e:
+            # e.g. WAL on a read-only filesystem; keep the connection usable
+            print(f"Warning: {pragma} failed: {e}")
+    return conn
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pre-configured SQLite connections.
+
+    Usage:
+        with pool.connection() as conn:
+            conn.execute(...)
+
+    The block commits on success and rolls back on error before the connection
+    goes back to the pool. Connections held longer than `leak_threshold` seconds
+    are reported by `check_leaks()` and logged when they are finally returned.
+    """
+
+    def __init__(self, db_path, size=8, timeout=10.0, leak_threshold=30.0,
+                 busy_timeout_ms=5000, cache_size_kib=16384, mmap_size=0):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.leak_threshold = leak_threshold
+        self._pragmas = dict(busy_timeout_ms=busy_timeout_ms, cache_size_kib=cache_size_kib, mmap_size=mmap_size)
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._checked_out = {}  # id(conn) -> (thread name, checkout time, stack)
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._leaks = 0
+        self._discarded = 0
+
+    def _create(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return configure_connection(conn, **self._pragmas)
+
+    def acquire(self, timeout=None):
+        """Checks out a connection. Prefer `connection()` which always returns it."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                wait = self.timeout if timeout is None else timeout
+                started = time.monotonic()
+                try:
+                    conn = self._idle.get(timeout=wait)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {wait}s (pool size {self.size})")
+                finally:
+                    with self._lock:
+                        self._waits += 1
+                        self._wait_time += time.monotonic() - started
+
+        with self._lock:
+            self._checkouts += 1
+            self._checked_out[id(conn)] = (
+                threading.current_thread().name,
+                time.monotonic(),
+                "".join(traceback.format_stack(limit=6)[:-2])
+            )
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back anything left open."""
+        with self._lock:
+            info = self._checked_out.pop(id(conn), None)
+        if info:
+            held = time.monotonic() - info[1]
+            if held > self.leak_threshold:
+                with self._lock:
+                    self._leaks += 1
+                print(f"Warning: DB connection held for {held:.1f}s by {info[0]}. Checked out at:\n{info[2]}")
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._discarded += 1
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            self.release(conn)
+
+    def check_leaks(self):
+        """Returns (thread, seconds held, checkout stack) for suspiciously long checkouts."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (thread, now - started, stack)
+                for thread, started, stack in self._checked_out.values()
+                if now - started > self.leak_threshold
+            ]
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": len(self._checked_out),
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "avg_wait_ms": round(self._wait_time / self._waits * 1000, 2) if self._waits else 0.0,
+                "timeouts": self._timeouts,
+                "leaks": self._leaks,
+                "discarded": self._discarded,
+            }
+
+    def close_all(self):
+        """Closes idle connections; checked-out ones are closed when released."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,169 @@
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from app.db_pool import configure_connection
+
+# Single-writer queue.
+#
+# All queued writes in a process go through one thread and one connection.
+# The thread drains whatever is waiting (up to max_batch, or for max_delay
+# after the first item) into one BEGIN IMMEDIATE ... COMMIT, so N concurrent
+# writers cost one fsync instead of N lock handoffs. Each operation runs in
+# its own savepoint: a failing operation only rolls back itself and its
+# caller gets the exception, the rest of the batch still commits.
+# BEGIN IMMEDIATE is retried with exponential backoff when another process
+# (another uvicorn worker) holds the write lock.
+
+_STOP = object()
+
+class _WriteOp:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+def _is_busy(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+class DBWriter:
+    def __init__(self, db_path, max_batch=64, max_delay=0.002, retries=5, backoff=0.05,
+                 busy_timeout_ms=1000, cache_size_kib=16384, mmap_size=0):
+        self.db_path = db_path
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self._connect_args = (busy_timeout_ms, cache_size_kib, mmap_size)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"ops": 0, "failed_ops": 0, "batches": 0, "retries": 0, "failed_batches": 0, "max_batch_seen": 0}
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, conn=<writer conn>, **kwargs). Returns a Future with its result."""
+        op = _WriteOp(fn, args, kwargs)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DB writer is closed")
+            self._queue.put(op)
+        return op.future
+
+    # --- Writer Thread ---
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        configure_connection(conn, *self._connect_args)
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._commit_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _begin(self, conn):
+        for attempt in range(self.retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == self.retries:
+                    raise
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    def _commit_batch(self, conn, batch):
+        batch = [op for op in batch if op.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            self._begin(conn)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        outcomes = []
+        for op in batch:
+            conn.execute("SAVEPOINT write_op")
+            try:
+                result = op.fn(*op.args, conn=conn, **op.kwargs)
+                conn.execute("RELEASE write_op")
+                outcomes.append((op, result, None))
+            except Exception as e:
+                conn.execute("ROLLBACK TO write_op")
+                conn.execute("RELEASE write_op")
+                outcomes.append((op, None, e))
+
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            self._fail(batch, e)
+            return
+
+        failed = 0
+        for op, result, error in outcomes:
+            if error is not None:
+                failed += 1
+                op.future.set_exception(error)
+            else:
+                op.future.set_result(result)
+        with self._lock:
+            self._stats["ops"] += len(batch)
+            self._stats["failed_ops"] += failed
+            self._stats["batches"] += 1
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+
+    def _fail(self, batch, error):
+        print(f"DB writer batch of {len(batch)} failed: {error}")
+        with self._lock:
+            self._stats["failed_batches"] += 1
+            self._stats["failed_ops"] += len(batch)
+        for op in batch:
+            op.future.set_exception(error)
+
+    # --- Monitoring / Shutdown ---
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch"] = round(stats["ops"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def close(self, timeout=5):
+        """Commits what is already queued, then stops the thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Bounded process pools for CPU-heavy work (Argon2 hashing, PDF rendering).
+#
+# A ProcessPoolExecutor queues without limit, so under a burst every request
+# would wait behind the whole backlog. These pools admit at most
+# `max_workers + max_pending` tasks at a time and reject the rest immediately
+# with ExecutorSaturated, which the API turns into a 503.
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a bounded pool has no free slot."""
+
+class BoundedProcessPool:
+    def __init__(self, name, max_workers, max_pending):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._in_flight = 0
+        self._submitted = 0
+        self._rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            # Forked children must not reuse the parent's executor
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset_executor(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args):
+        """Submits fn(*args) to the pool or raises ExecutorSaturated. Returns a concurrent Future."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(f"{self.name} pool is saturated, try again shortly")
+
+        with self._lock:
+            self._in_flight += 1
+            self._submitted += 1
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM); start a fresh pool once
+                self._reset_executor(executor)
+                future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args):
+        """Blocking submit-and-wait, for sync handlers running in a worker thread."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """Awaitable submit; the event loop stays free while the worker runs."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,7 +1,7 @@
 import customtkinter as ctk
 from tkinter import messagebox, ttk
 import tkinter as tk
-from app import db, auth, reports, ai_utils, config
+from app import db, auth, ai_utils, config, counters, report_jobs
 import random
 
 ctk.set_appearance_mode("Dark")
@@ -146,13 +146,13 @@ class AdminApp(ctk.CTk):
         kpi_frame = ctk.CTkFrame(self.main_area, fg_color="transparent")
         kpi_frame.pack(fill="x", pady=10)
         
-        conn = db.get_conn()
-        total = conn.execute("SELECT COUNT(*) FROM Customers").fetchone()[0]
-        verified = conn.execute("SELECT COUNT(*) FROM Verifications WHERE status='Verified'").fetchone()[0]
-        pending = conn.execute("SELECT COUNT(*) FROM Verifications WHERE status='Pending'").fetchone()[0]
+        with db.connection() as conn:
+            kpis = counters.admin_kpis(conn)
+        total = kpis["total_customers"]
+        verified = kpis["verified"]
+        pending = kpis["pending_verifications"]
         # Real Fraud Count: High Risk (>80) or Rejected
-        fraud_count = conn.execute("SELECT COUNT(*) FROM Verifications WHERE risk_score > 80 OR status='Rejected'").fetchone()[0]
-        conn.close()
+        fraud_count = kpis["flagged"]
         
         self.create_kpi_card(kpi_frame, "Total Customers", total, "#2980b9").pack(side="left", expand=True, fill="x", padx=5)
         self.create_kpi_card(kpi_frame, "Verified", verified, "#27ae60").pack(side="left", expand=True, fill="x", padx=5)
@@ -272,6 +272,8 @@ class AdminApp(ctk.CTk):
         ctk.CTkLabel(self.main_area, text="Reports & Analytics", font=("Roboto", 28, "bold")).pack(anchor="w", pady=(0, 20))
         
         ctk.CTkButton(self.main_area, text="Export Full Verification Report (Excel)", command=self.export_data, height=50, font=("Roboto", 16)).pack(fill="x", pady=10)
+        self.export_status = ctk.CTkLabel(self.main_area, text="", text_color="gray")
+        self.export_status.pack(anchor="w")
         ctk.CTkLabel(self.main_area, text="More report types coming soon...", text_color="gray").pack(pady=20)
 
     # --- HELPERS ---
@@ -291,11 +293,32 @@ class AdminApp(ctk.CTk):
             widget.destroy()
 
     def export_data(self):
+        # Runs as a background report job; poll it so the window stays responsive
         try:
-            path = reports.export_verification_report()
-            messagebox.showinfo("Success", f"Report exported to:\n{path}")
+            job, _ = report_jobs.submit("verification_xlsx", {"mask": "partial"}, requested_by=self.current_admin)
         except Exception as e:
             messagebox.showerror("Error", str(e))
+            return
+        self.poll_export(job["id"])
+
+    def poll_export(self, job_id):
+        job = report_jobs.get(job_id)
+        if job and job["status"] in report_jobs.ACTIVE:
+            progress = f" {job['progress']:.0%}" if job["progress"] is not None else ""
+            self.set_export_status(f"Exporting...{progress} ({job['rows_done']} rows)")
+            self.after(500, self.poll_export, job_id)
+            return
+        self.set_export_status("")
+        if job and job["status"] == "done":
+            messagebox.showinfo("Success", f"Report exported to:\n{report_jobs.artifact_path(job_id)}")
+        else:
+            messagebox.showerror("Error", job["error"] if job and job["error"] else "Report export did not finish")
+
+    def set_export_status(self, text):
+        # The label is gone once the admin leaves the Reports view
+        label = getattr(self, "export_status", None)
+        if label is not None and label.winfo_exists():
+            label.configure(text=text)
 
     def create_new_admin(self):
         u = self.new_admin_user.get()
@@ -63,26 +63,9 @@ class FintechApp(ctk.CTk):
             messagebox.showwarning("Required", "Please enter your CNIC.")
             return
             
-        # Check DB
-        conn = db.get_conn()
-        # Note: In real app, we decrypt CNIC to match, or hash it. 
-        # For this demo, we will fetch all and match decrypted (slow but works for demo)
-        # OR simpler: just check if ID exists for now since we encrypted everything
-        # Let's use a simpler approach: If user exists, we let them in.
-        
-        # Fetch all customers
-        customers = conn.execute("SELECT id, cnic FROM Customers").fetchall()
-        conn.close()
-        
-        found_id = None
-        for cust in customers:
-            try:
-                dec_cnic = security_utils.decrypt_data(cust['cnic'])
-                if dec_cnic == cnic:
-                    found_id = cust['id']
-                    break
-            except:
-                continue
+        # Check DB (single indexed lookup through the CNIC blind index)
+        cust = db.get_customer_by_cnic(cnic, columns="id")
+        found_id = cust['id'] if cust else None
                 
         if found_id:
             self.current_customer_id = found_id
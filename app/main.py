@@ -1,7 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.db import init_db
+from app.executors import ExecutorSaturated
 from app.api import auth, kyc, admin, dashboard, reports
 import os
 
@@ -26,8 +28,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Worker pools reject instead of queueing when full
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 # Mount Static Files for Uploads
 os.makedirs("uploads", exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
@@ -43,54 +51,38 @@ app.include_router(reports.router, prefix="/api/admin", tags=["reports"])
 @app.on_event("startup")
 def on_startup():
     try:
+        # Versioned migrations (python -m app.migrations); fast no-op when current
         init_db()
-        
-        # Run Migrations Safely
-        from app.db import get_conn
-        import sqlite3
-        conn = get_conn()
-        cursor = conn.cursor()
-        
-        # Helper function to add column if missing
-        def add_column_safe(table, column, type_def):
-            try:
-                cursor.execute(f"SELECT {column} FROM {table} LIMIT 1")
-            except sqlite3.OperationalError:
-                print(f"Migrating: Adding '{column}' to {table}...")
-                try:
-                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {type_def}")
-                    conn.commit()
-                except Exception as e:
-                    print(f"Migration Error ({column}): {e}")
-
-        # Customers Table Migrations
-        add_column_safe("Customers", "customer_code", "TEXT")
-        add_column_safe("Customers", "trust_score", "INTEGER DEFAULT 50")
-        add_column_safe("Customers", "segment", "TEXT DEFAULT 'Standard'")
-
-        # Admins Table Migrations
-        add_column_safe("Admins", "email", "TEXT")
-        add_column_safe("Admins", "role", "TEXT DEFAULT 'admin'")
-        add_column_safe("Admins", "totp_secret", "TEXT")
-            
-        # Ensure Admin Exists
-        try:
-            admin = cursor.execute("SELECT * FROM Admins WHERE username = 'Asharib'").fetchone()
-            if not admin:
-                from app import auth
-                hashed_pw = auth.hash_password("mywordislaw")
-                cursor.execute("INSERT INTO Admins (username, password_hash, full_name, email, role) VALUES (?, ?, ?, ?, ?)", 
-                              ("Asharib", hashed_pw, "Asharib Khan", "admin@neobank.com", "admin"))
-                conn.commit()
-                print("Admin user 'Asharib' created.")
-        except Exception as e:
-            print(f"Admin Creation Error: {e}")
-        
-        conn.close()
+        # Reporting snapshot refresh thread (only with REPORTS_FROM_SNAPSHOT=1)
+        from app import snapshot
+        snapshot.start_refresher()
+        # Expire old report jobs, fail ones left behind by a previous run
+        from app import report_jobs
+        report_jobs.cleanup(verbose=False)
+        # Trim the loan letter cache (generated_pdfs/)
+        from app.services import pdf_service
+        pdf_service.evict()
     except Exception as e:
         print(f"Startup Error: {e}")
         # Don't raise, allow app to start even if migration fails partially
 
+@app.on_event("shutdown")
+def on_shutdown():
+    from app.db import get_pool, get_executor, close_writer
+    from app import auth as auth_utils
+    from app.services import export_service
+    from app import snapshot, report_jobs
+    snapshot.stop_refresher()
+    # Drains (or fails) report jobs while the writer can still record it
+    report_jobs.shutdown_pool()
+    close_writer()
+    get_pool().close_all()
+    get_executor().shutdown(wait=False)
+    auth_utils.shutdown_hash_pool()
+    export_service.shutdown_decrypt_pool()
+    from app.services import pdf_service
+    pdf_service.shutdown_render_pool()
+
 @app.get("/")
 def root():
     return {"message": "NeoBank KYC API is running securely."}
@@ -0,0 +1,60 @@
+"""Baseline: app/schema.sql plus everything init_db and on_startup used to patch in on every boot."""
+from app.migrations import run_script, add_column
+
+def upgrade(conn):
+    from app import db
+
+    # Base schema (tables / indexes IF NOT EXISTS)
+    with open(db.SCHEMA_PATH) as f:
+        run_script(conn, f.read())
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS LoanApplications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        amount INTEGER,
+        purpose TEXT,
+        monthly_income INTEGER,
+        status TEXT DEFAULT 'Pending',
+        rejection_reason TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(customer_id) REFERENCES Customers(id)
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        title TEXT,
+        message TEXT,
+        is_read BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(customer_id) REFERENCES Customers(id)
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        sender TEXT,
+        message TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(customer_id) REFERENCES Customers(id)
+    )
+    ''')
+
+    # Columns older databases may be missing
+    add_column(conn, "Customers", "trust_score", "INTEGER DEFAULT 0")
+    add_column(conn, "Customers", "segment", "TEXT DEFAULT 'Standard'")
+    add_column(conn, "Customers", "customer_code", "TEXT")
+    add_column(conn, "Admins", "settings", "TEXT DEFAULT '{}'")
+    add_column(conn, "Admins", "email", "TEXT")
+    add_column(conn, "Admins", "role", "TEXT DEFAULT 'admin'")
+    add_column(conn, "Admins", "totp_secret", "TEXT")
+    add_column(conn, "LoanEligibility", "income_range", "TEXT")
+
+    if add_column(conn, "Verifications", "date", "TIMESTAMP"):
+        # Populate existing records with updated_at value
+        conn.execute("UPDATE Verifications SET date = updated_at WHERE date IS NULL")
@@ -0,0 +1,18 @@
+"""HMAC blind indexes for CNIC / phone lookups (values stay encrypted)."""
+import sqlite3
+from app.migrations import add_column
+
+def upgrade(conn):
+    from app import db
+
+    add_column(conn, "Customers", "cnic_bidx", "TEXT")
+    add_column(conn, "Customers", "phone_bidx", "TEXT")
+    db.backfill_blind_indexes(conn)
+
+    try:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_cnic_bidx ON Customers(cnic_bidx)")
+    except sqlite3.IntegrityError:
+        # Legacy data may hold the same CNIC twice; keep lookups fast anyway.
+        print("Warning: duplicate CNICs found, creating non-unique CNIC blind index")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_cnic_bidx_nonunique ON Customers(cnic_bidx)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone_bidx ON Customers(phone_bidx)")
@@ -0,0 +1,9 @@
+"""Duplicate-candidate blocking: email blind index + name trigrams."""
+from app.migrations import add_column
+
+def upgrade(conn):
+    from app.services import duplicate_index
+
+    add_column(conn, "Customers", "email_bidx", "TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_email_bidx ON Customers(email_bidx)")
+    duplicate_index.backfill(conn)
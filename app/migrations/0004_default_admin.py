@@ -0,0 +1,11 @@
+"""Seeds the default admin account (previously re-checked and hashed on every boot)."""
+
+def upgrade(conn):
+    from app import auth
+
+    admin = conn.execute("SELECT id FROM Admins WHERE username = 'Asharib'").fetchone()
+    if not admin:
+        hashed_pw = auth.hash_password("mywordislaw")
+        conn.execute("INSERT INTO Admins (username, password_hash, full_name, email, role) VALUES (?, ?, ?, ?, ?)",
+                     ("Asharib", hashed_pw, "Asharib Khan", "admin@neobank.com", "admin"))
+        print("Admin user 'Asharib' created.")
@@ -0,0 +1,20 @@
+-- Secondary indexes for foreign keys and hot filters.
+-- Checked by `python -m app.query_plans`, which fails if a hot query scans a table.
+
+-- Customer dashboard
+CREATE INDEX IF NOT EXISTS idx_notifications_customer_read ON Notifications(customer_id, is_read);
+CREATE INDEX IF NOT EXISTS idx_notifications_customer_created ON Notifications(customer_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_loanapplications_customer_created ON LoanApplications(customer_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_loanapplications_customer_status ON LoanApplications(customer_id, status);
+CREATE INDEX IF NOT EXISTS idx_messages_customer_created ON Messages(customer_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_customer ON Documents(customer_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_customer_date ON Transactions(customer_id, date);
+CREATE INDEX IF NOT EXISTS idx_financialhealth_customer ON FinancialHealth(customer_id);
+CREATE INDEX IF NOT EXISTS idx_locations_customer ON Locations(customer_id);
+CREATE INDEX IF NOT EXISTS idx_loaneligibility_customer ON LoanEligibility(customer_id);
+
+-- Admin views and reports
+CREATE INDEX IF NOT EXISTS idx_verifications_status_date ON Verifications(status, date);
+CREATE INDEX IF NOT EXISTS idx_loaneligibility_status ON LoanEligibility(eligibility_status);
+CREATE INDEX IF NOT EXISTS idx_loaneligibility_calculated ON LoanEligibility(calculated_at);
+CREATE INDEX IF NOT EXISTS idx_auditlog_timestamp ON AuditLog(timestamp);
@@ -0,0 +1,6 @@
+"""Counters table kept current by triggers (see app/counters.py), seeded with a full recount."""
+
+def upgrade(conn):
+    from app import counters
+
+    counters.install(conn)
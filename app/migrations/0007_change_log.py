@@ -0,0 +1,6 @@
+"""ChangeLog table and capture triggers for the incremental Power BI export (see app/cdc.py)."""
+
+def upgrade(conn):
+    from app import cdc
+
+    cdc.install(conn)
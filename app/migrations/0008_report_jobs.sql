@@ -0,0 +1,24 @@
+-- Background report jobs (app/report_jobs.py).
+-- Kept in the database so any API worker can answer a status poll or a download.
+
+CREATE TABLE IF NOT EXISTS ReportJobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,              -- canonical JSON
+    dedupe_key TEXT NOT NULL,          -- sha256 of kind + params
+    status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done, failed, expired
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    rows_total INTEGER,                -- estimate from Counters, NULL if unknown
+    artifact_path TEXT,
+    size_bytes INTEGER,
+    error TEXT,
+    owner_pid INTEGER,                 -- process running the job
+    requested_by TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_reportjobs_dedupe_status ON ReportJobs(dedupe_key, status);
+CREATE INDEX IF NOT EXISTS idx_reportjobs_status_finished ON ReportJobs(status, finished_at);
+CREATE INDEX IF NOT EXISTS idx_reportjobs_created ON ReportJobs(created_at);
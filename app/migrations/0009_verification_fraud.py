@@ -0,0 +1,37 @@
+"""Stored rule-based fraud score / flag on Verifications, backfilled for existing rows."""
+import json
+from app.migrations import add_column
+
+def upgrade(conn):
+    from app import ai_utils, security_utils
+
+    add_column(conn, "Verifications", "fraud_score", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "Verifications", "fraud_flagged", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "Verifications", "fraud_alerts", "TEXT")
+
+    rows = conn.execute("""
+        SELECT v.id, v.status, v.risk_score, c.email, c.phone, c.income_range
+        FROM Verifications v JOIN Customers c ON c.id = v.customer_id
+    """).fetchall()
+
+    updates = []
+    for row in rows:
+        phone = security_utils.decrypt_data(row['phone']) if row['phone'] else ''
+        if phone in ("[ENCRYPTED]", "[INVALID DATA]"):
+            phone = ''
+        customer = {'email': row['email'] or '', 'phone': phone, 'income_range': row['income_range']}
+        risk_score = row['risk_score'] or 0
+        if row['status'] == 'Pending':
+            risk_score, fraud_score, alerts, flagged = ai_utils.assess_fraud(customer, risk_score)
+        else:
+            # Decided rows keep the reviewer's score
+            fraud_score, alerts = ai_utils.check_fraud_rules(customer)
+            flagged = risk_score > 70
+        updates.append((risk_score, fraud_score, int(flagged), json.dumps(alerts) if alerts else None, row['id']))
+
+    conn.executemany(
+        "UPDATE Verifications SET risk_score = ?, fraud_score = ?, fraud_flagged = ?, fraud_alerts = ? WHERE id = ?",
+        updates
+    )
+    if updates:
+        print(f"Backfilled fraud scores for {len(updates)} verifications")
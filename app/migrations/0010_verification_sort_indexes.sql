@@ -0,0 +1,11 @@
+-- Keyset sort indexes for the paginated verification listing (db.verifications_page_query).
+-- Every index ends in the rowid, i.e. v.id, the listing's tiebreak, so
+-- (status, risk_score) gives ORDER BY risk_score, id for one status.
+-- Databases created before these were added to app/schema.sql get them here.
+
+CREATE INDEX IF NOT EXISTS idx_customers_created_at ON Customers(created_at);
+CREATE INDEX IF NOT EXISTS idx_verifications_status_updated ON Verifications(status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_verifications_customer ON Verifications(customer_id);
+CREATE INDEX IF NOT EXISTS idx_verifications_risk ON Verifications(risk_score);
+CREATE INDEX IF NOT EXISTS idx_verifications_status_risk ON Verifications(status, risk_score);
+CREATE INDEX IF NOT EXISTS idx_verifications_updated ON Verifications(updated_at);
@@ -0,0 +1,153 @@
+import importlib.util
+import os
+import re
+import sqlite3
+import time
+
+# Versioned schema migrations.
+#
+# Migrations live next to this file as NNNN_name.sql or NNNN_name.py (the
+# latter defining `upgrade(conn)`), are applied in order, each in its own
+# BEGIN IMMEDIATE transaction, and recorded in `schema_version` so they run
+# exactly once. When the database is already current, `migrate()` costs a
+# single SELECT. The write lock serializes workers booting at the same time:
+# whoever gets it second re-reads the applied versions and skips them.
+#
+# app/schema.sql stays the full current schema (CREATE ... IF NOT EXISTS) and
+# is applied by the baseline migration, so later migrations must tolerate
+# objects that already exist: use add_column() and IF NOT EXISTS.
+#
+# Run out-of-band with:  python -m app.migrations [migrate|status]
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+_FILE_PATTERN = re.compile(r"^(\d{4})_([a-z0-9_]+)\.(sql|py)$")
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def apply(self, conn):
+        if self.path.endswith(".sql"):
+            with open(self.path) as f:
+                run_script(conn, f.read())
+        else:
+            spec = importlib.util.spec_from_file_location(f"app.migrations.m{self.version:04d}", self.path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.upgrade(conn)
+
+def discover():
+    """All migrations shipped with the app, ordered by version."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _FILE_PATTERN.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+# --- Helpers for migration files ---
+
+def run_script(conn, sql):
+    """
+    Executes a multi-statement script inside the current transaction
+    (sqlite3's executescript would COMMIT first).
+    """
+    statement = ""
+    for line in sql.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip().strip(";").strip():
+                conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+def column_exists(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+def add_column(conn, table, column, type_def):
+    """ALTER TABLE ADD COLUMN unless the column is already there (databases created from schema.sql)."""
+    if not column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {type_def}")
+        return True
+    return False
+
+# --- Runner ---
+
+def _connect(db_path):
+    from app import config
+    from app.db_pool import configure_connection
+
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    configure_connection(conn, config.DB_BUSY_TIMEOUT_MS, config.DB_CACHE_SIZE_KIB, config.DB_MMAP_SIZE)
+    # Concurrent boots may wait for each other's migrations
+    conn.execute("PRAGMA busy_timeout = 60000")
+    return conn
+
+def applied_versions(conn):
+    try:
+        return {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+    except sqlite3.OperationalError:
+        return set()
+
+def migrate(db_path=None, verbose=True):
+    """Applies pending migrations. Returns the number applied (0 on the fast path)."""
+    from app import db
+
+    db_path = db_path or db.DB_PATH
+    migrations = discover()
+
+    conn = _connect(db_path)
+    try:
+        # Fast path: one read of schema_version when nothing is pending
+        if applied_versions(conn) >= {m.version for m in migrations}:
+            return 0
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        applied = 0
+        for migration in migrations:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock: another worker may have applied it
+                if migration.version in applied_versions(conn):
+                    conn.execute("COMMIT")
+                    continue
+                started = time.perf_counter()
+                migration.apply(conn)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (migration.version, migration.name))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                print(f"Migration {migration.version:04d}_{migration.name} failed")
+                raise
+            applied += 1
+            if verbose:
+                print(f"Applied migration {migration.version:04d}_{migration.name} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return applied
+    finally:
+        conn.close()
+
+def status(db_path=None):
+    """[(version, name, applied?)] for every known migration."""
+    from app import db
+
+    conn = _connect(db_path or db.DB_PATH)
+    try:
+        done = applied_versions(conn)
+    finally:
+        conn.close()
+    return [(m.version, m.name, m.version in done) for m in discover()]
@@ -0,0 +1,16 @@
+import sys
+
+from app import migrations
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+
+    if command == "status":
+        for version, name, applied in migrations.status():
+            print(f"{version:04d}_{name:<30} {'applied' if applied else 'pending'}")
+    elif command == "migrate":
+        count = migrations.migrate()
+        print(f"Applied {count} migration(s)" if count else "Database schema is up to date")
+    else:
+        print("Usage: python -m app.migrations [migrate|status]")
+        sys.exit(2)
@@ -13,6 +13,13 @@ class Token(BaseModel):
     user_id: int
     full_name: str
 
+class Principal(BaseModel):
+    """Authenticated caller, decoded once per request from the JWT."""
+    role: str  # 'admin' or 'customer'
+    id: Optional[int] = None  # Admins.id or Customers.id depending on role
+    username: str  # JWT 'sub': admin username or customer CNIC
+    full_name: Optional[str] = None
+
 # --- KYC Models ---
 class CustomerCreate(BaseModel):
     full_name: str
@@ -37,3 +44,16 @@ class VerificationUpdate(BaseModel):
     remarks: Optional[str] = None
     risk_score: int
     trust_score: int
+
+class ReportJobCreate(BaseModel):
+    kind: str
+    params: dict = {}
+
+class LoanDecision(BaseModel):
+    loan_id: int
+    decision: str
+    reason: Optional[str] = None
+
+class LoanDecisionBatch(BaseModel):
+    decisions: List[LoanDecision]
+    merge_pdf: bool = False  # also one printable PDF with every letter
@@ -0,0 +1,131 @@
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+
+from app import db, reports
+from app.services import export_service, stats_engine
+
+# EXPLAIN QUERY PLAN regression check for the hot queries.
+#
+# Builds a scratch database through the real migrations and fails (exit 1)
+# if any query below is planned as a bare table scan ("SCAN t" without an
+# index) or needs a temp B-tree to sort. Walking an index in ORDER BY order
+# ("SCAN t USING INDEX ...", for ORDER BY ... LIMIT) is fine. An optional
+# fourth element lists plan lines that are expected for that query. Queries
+# come from the modules that run them wherever those expose their SQL. Add a
+# query here when you add a hot path; if it fails, add an index as a new
+# migration. tests/test_query_plans.py runs the same check under pytest.
+#
+#   python -m app.query_plans           # scratch database
+#   python -m app.query_plans --live    # the configured database
+
+HOT_QUERIES = [
+    # Customer dashboard / auth
+    ("customer by id", "SELECT * FROM Customers WHERE id = ?", (1,)),
+    ("customer by cnic blind index", "SELECT id FROM Customers WHERE cnic_bidx = ?", ("x",)),
+    ("customer by code", "SELECT id FROM Customers WHERE customer_code = ?", ("x",)),
+    ("verification of customer", "SELECT * FROM Verifications WHERE customer_id = ?", (1,)),
+    ("loan applications of customer", "SELECT * FROM LoanApplications WHERE customer_id = ? ORDER BY created_at DESC", (1,)),
+    ("pending application check", "SELECT id FROM LoanApplications WHERE customer_id = ? AND status = 'Pending'", (1,)),
+    ("documents of customer", "SELECT doc_type, file_path FROM Documents WHERE customer_id = ?", (1,)),
+    ("unread notifications", "SELECT COUNT(*) FROM Notifications WHERE customer_id = ? AND is_read = 0", (1,)),
+    ("notifications of customer", "SELECT * FROM Notifications WHERE customer_id = ? ORDER BY created_at DESC", (1,)),
+    ("mark notifications read", "UPDATE Notifications SET is_read = 1 WHERE customer_id = ? AND is_read = 0", (1,)),
+    ("messages of customer", "SELECT * FROM Messages WHERE customer_id = ? ORDER BY created_at DESC", (1,)),
+    ("financial health", "SELECT * FROM FinancialHealth WHERE customer_id = ?", (1,)),
+    ("recent transactions", "SELECT * FROM Transactions WHERE customer_id = ? ORDER BY date DESC LIMIT 5", (1,)),
+    ("loan eligibility of customer", "SELECT * FROM LoanEligibility WHERE customer_id = ?", (1,)),
+    ("risk profile", "SELECT * FROM RiskProfiles WHERE customer_id = ?", (1,)),
+
+    # Admin views / reports
+    ("pending verification count", "SELECT COUNT(*) FROM Verifications WHERE status = 'Pending'", ()),
+    ("auto-approved loan count", "SELECT COUNT(*) FROM LoanEligibility WHERE eligibility_status = 'Auto-Approved'", ()),
+    ("daily decisions", "SELECT COUNT(*) FROM Verifications WHERE status = 'Verified' AND date >= ? AND date < date(?, '+1 day')", ("2024-01-01", "2024-01-01")),
+    # Grouping by a computed time bucket always sorts, but only the rows the
+    # (status, date) range seek returned
+    ("report stats", stats_engine._stats_sql("hour"), (*stats_engine.DECISION_STATUSES, "2024-01-01 00:00:00", "2024-01-02 00:00:00"),
+     ("USE TEMP B-TREE FOR GROUP BY",)),
+    ("export by status", export_service.CUSTOMER_EXPORT_SQL, ("Verified",)),
+    # Full report: reads every customer once, joins must still seek
+    ("verification report", reports.REPORT_QUERY, (), ("SCAN c",)),
+    ("pending verifications", """
+        SELECT c.id, c.full_name, v.status FROM Customers c
+        JOIN Verifications v ON c.id = v.customer_id
+        WHERE v.status = 'Pending'
+    """, ()),
+    ("loan applications list", """
+        SELECT le.id, c.full_name FROM LoanEligibility le
+        JOIN Customers c ON le.customer_id = c.id
+        ORDER BY le.calculated_at DESC LIMIT 50
+    """, ()),
+    ("recent audit log", "SELECT * FROM AuditLog ORDER BY timestamp DESC LIMIT 10", ()),
+    ("change log since high-water mark", "SELECT row_id, MAX(seq) FROM ChangeLog WHERE table_name = ? AND seq > ? AND seq <= ? GROUP BY row_id", ("Customers", 0, 10),
+     ("USE TEMP B-TREE FOR GROUP BY",)),
+    ("delete customer trigrams", "DELETE FROM NameTrigrams WHERE customer_id = ?", (1,)),
+]
+
+def listing_queries():
+    """db.verifications_page_query for every sort / filter combination the admin listing accepts."""
+    queries = []
+    combos = itertools.product(
+        db.VERIFICATION_SORTS,
+        (None, ["Pending"], ["Verified"], ["Pending", "Rejected"]),
+        (None, True, False),
+        (False, True),
+    )
+    for sort, statuses, fraud_flagged, ranged in combos:
+        filters = dict(min_risk=10, max_risk=90, date_from="2024-01-01", date_to="2024-01-31") if ranged else {}
+        for after in (None, ("2024-01-01", 1)):
+            sql, params = db.verifications_page_query(
+                sort, after=after, statuses=statuses, fraud_flagged=fraud_flagged, **filters
+            )
+            name = f"verification listing sort={sort} status={statuses} fraud={fraud_flagged} ranged={ranged} page={'next' if after else 'first'}"
+            queries.append((name, sql, params))
+    return queries
+
+HOT_QUERIES += listing_queries()
+
+def bad_steps(conn, sql, params):
+    """Plan lines that read a whole table without an index or sort in a temp B-tree."""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [
+        row[3] for row in plan
+        if (row[3].startswith("SCAN ") and " USING " not in row[3]) or "TEMP B-TREE" in row[3]
+    ]
+
+def check(conn, queries=HOT_QUERIES):
+    """Returns [(name, plan lines)] for every hot query with a bad plan step."""
+    failures = []
+    for name, sql, params, *allowed in queries:
+        allowed = allowed[0] if allowed else ()
+        steps = [step for step in bad_steps(conn, sql, params) if step not in allowed]
+        if steps:
+            failures.append((name, steps))
+    return failures
+
+def _scratch_check():
+    from app import migrations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plans.sqlite3")
+        migrations.migrate(db_path=path, verbose=False)
+        conn = sqlite3.connect(path)
+        try:
+            return check(conn)
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    if "--live" in sys.argv:
+        from app import db
+        with db.connection() as conn:
+            failures = check(conn)
+    else:
+        failures = _scratch_check()
+
+    for name, steps in failures:
+        print(f"BAD PLAN  {name}: {'; '.join(steps)}")
+    print(f"{len(HOT_QUERIES) - len(failures)}/{len(HOT_QUERIES)} hot queries use an index")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,363 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from app import config, counters, db, reports
+
+# Background report jobs.
+#
+# submit() records a job in ReportJobs and runs it on this process's job
+# threads, so a long export no longer holds an API worker or the Tk event
+# loop. Callers poll get() for status and progress, then fetch the artifact
+# from reports/jobs/. Job state lives in the database, so any API worker
+# can answer a poll or a download.
+#
+# A request identical to a queued or running job (same kind and parameters)
+# joins that job instead of starting another. A job whose process has exited
+# is marked failed the next time it is looked at.
+#
+# Finished jobs and their artifacts are kept for REPORT_JOB_RETENTION_HOURS.
+# Past REPORT_JOB_MAX_ARTIFACTS or REPORT_JOB_MAX_STORE_MB, the oldest
+# artifacts are deleted early and their jobs marked 'expired'.
+#
+#   python -m app.report_jobs list
+#   python -m app.report_jobs run verification_xlsx mask=none
+#   python -m app.report_jobs cleanup
+
+JOBS_DIR = os.path.join(reports.REPORTS_DIR, "jobs")
+ACTIVE = ("queued", "running")
+PROGRESS_INTERVAL = 1.0  # seconds between progress writes
+ORPHAN_GRACE_SECONDS = 600
+
+def _flag(value):
+    return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+
+# --- Kinds ---
+# name: (canonical params from raw ones, artifact extension, row estimate, run)
+# run(params, path, progress) writes the artifact to `path`.
+
+def _csv_params(raw):
+    from app.services import export_service
+    status = str(raw.get("status", "")).lower()
+    if status not in export_service.EXPORT_STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(export_service.EXPORT_STATUSES)}")
+    return {"status": status, "gzip": _flag(raw.get("gzip", False))}
+
+def _csv_estimate(conn, params):
+    from app.services import export_service
+    name = f"verifications.status.{export_service.EXPORT_STATUSES[params['status']]}"
+    return counters.get(conn, name)[name]
+
+def _run_customers_csv(params, path, progress):
+    from app.services import export_service
+    db_status = export_service.EXPORT_STATUSES[params["status"]]
+    with open(path + ".tmp", "wb") as f:
+        for chunk in export_service.stream_customers_csv(db_status, params["gzip"], progress):
+            f.write(chunk)
+    os.replace(path + ".tmp", path)
+
+def _mask_param(raw):
+    mask = raw.get("mask", "partial")
+    if mask not in reports.CNIC_MASKS:
+        raise ValueError(f"mask must be one of: {', '.join(reports.CNIC_MASKS)}")
+    return mask
+
+def _xlsx_params(raw):
+    return {"mask": _mask_param(raw)}
+
+def _report_estimate(conn, params):
+    return counters.get(conn, "customers.total")["customers.total"]
+
+def _run_verification_xlsx(params, path, progress):
+    reports.export_verification_report(os.path.relpath(path, reports.REPORTS_DIR), params["mask"], progress=progress)
+
+def _columnar_params(raw):
+    from app import columnar
+    columnar.require_pyarrow()
+    return {"mask": _mask_param(raw)}
+
+def _run_columnar(fmt):
+    def run(params, path, progress):
+        reports.export_verification_data(fmt, os.path.relpath(path, reports.REPORTS_DIR), params["mask"], progress=progress)
+    return run
+
+KINDS = {
+    "customers_csv": (_csv_params, lambda p: ".csv.gz" if p["gzip"] else ".csv", _csv_estimate, _run_customers_csv),
+    "verification_xlsx": (_xlsx_params, lambda p: ".xlsx", _report_estimate, _run_verification_xlsx),
+    "verification_parquet": (_columnar_params, lambda p: ".parquet", _report_estimate, _run_columnar("parquet")),
+    "verification_arrow": (_columnar_params, lambda p: ".arrow", _report_estimate, _run_columnar("arrow")),
+}
+
+# --- Job threads ---
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = set()  # ids of jobs queued or running in this process
+_futures = set()  # their futures, for shutdown_pool() to wait on
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, config.REPORT_JOB_WORKERS), thread_name_prefix="report-job")
+        return _pool
+
+def shutdown_pool(timeout=None):
+    """
+    Stops the job threads. Queued jobs are cancelled; running ones get
+    `timeout` seconds (REPORT_JOB_SHUTDOWN_GRACE) to finish. Jobs still
+    unfinished are then marked failed through the writer, so call this
+    before db.close_writer().
+    """
+    global _pool
+    timeout = config.REPORT_JOB_SHUTDOWN_GRACE if timeout is None else timeout
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    pool.shutdown(wait=False, cancel_futures=True)
+    wait(list(_futures), timeout=timeout)
+    if _local:
+        db.execute_write(_fail_unfinished)
+
+def _fail_unfinished(conn=None):
+    """Marks this process's queued and running jobs failed. Runs in the writer."""
+    job_ids = list(_local)
+    conn.executemany(
+        "UPDATE ReportJobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+        [("Server shut down before the job finished", _now(), job_id) for job_id in job_ids]
+    )
+
+def _alive(job_id, owner_pid):
+    """True if the process that owns the job is still there to run it."""
+    if owner_pid == os.getpid():
+        return job_id in _local
+    try:
+        os.kill(owner_pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError, OSError):
+        return owner_pid is not None
+    return True
+
+def _now():
+    # Same format as CURRENT_TIMESTAMP
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+def _update(job_id, conn=None, **fields):
+    if conn is None:
+        return db.execute_write(_update, job_id, **fields)
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn.execute(f"UPDATE ReportJobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+def _fail_orphans(conn):
+    """Marks active jobs whose process has exited as failed. Runs in the writer."""
+    for row in conn.execute("SELECT id, owner_pid FROM ReportJobs WHERE status IN ('queued', 'running')").fetchall():
+        if not _alive(row[0], row[1]):
+            _update(row[0], status="failed", error="Report worker exited before the job finished",
+                    finished_at=_now(), conn=conn)
+
+def _run(job_id, kind, params):
+    _, extension, _, run = KINDS[kind]
+    path = os.path.join(JOBS_DIR, job_id + extension(params))
+    rows = 0
+    last_write = 0.0
+
+    def progress(done):
+        nonlocal rows, last_write
+        rows = done
+        now = time.monotonic()
+        if now - last_write >= PROGRESS_INTERVAL:
+            last_write = now
+            db.write(_update, job_id, rows_done=done)
+
+    try:
+        _update(job_id, status="running", started_at=_now())
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        run(params, path, progress)
+        _update(job_id, status="done", rows_done=rows, artifact_path=path,
+                size_bytes=os.path.getsize(path), finished_at=_now())
+    except Exception as e:
+        print(f"Report job {job_id} ({kind}) failed: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        _update(job_id, status="failed", rows_done=rows, error=str(e), finished_at=_now())
+    finally:
+        _local.discard(job_id)
+
+# --- Submit / poll ---
+
+def _insert_or_join(kind, params, total, requested_by, conn=None):
+    """Returns (job id, created). Runs in the writer, so concurrent submits are serialised."""
+    if conn is None:
+        return db.execute_write(_insert_or_join, kind, params, total, requested_by)
+    params_json = json.dumps(params, sort_keys=True)
+    dedupe_key = hashlib.sha256(f"{kind}:{params_json}".encode()).hexdigest()
+
+    _fail_orphans(conn)
+    row = conn.execute(
+        "SELECT id FROM ReportJobs WHERE dedupe_key = ? AND status IN ('queued', 'running') ORDER BY created_at DESC LIMIT 1",
+        (dedupe_key,)
+    ).fetchone()
+    if row:
+        return row[0], False
+
+    job_id = uuid.uuid4().hex
+    conn.execute(
+        "INSERT INTO ReportJobs (id, kind, params, dedupe_key, rows_total, owner_pid, requested_by) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (job_id, kind, params_json, dedupe_key, total, os.getpid(), requested_by)
+    )
+    _local.add(job_id)
+    return job_id, True
+
+def submit(kind, params=None, requested_by=None):
+    """
+    Queues a report job, or joins the identical one already in progress.
+    Returns (job, created). Raises ValueError for an unknown kind or bad params.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown report kind: {kind}. Expected one of: {', '.join(KINDS)}")
+    normalize, _, estimate, _ = KINDS[kind]
+    params = normalize(params or {})
+    cleanup(verbose=False)
+
+    with db.connection() as conn:
+        total = estimate(conn, params)
+    job_id, created = _insert_or_join(kind, params, total, requested_by)
+    if created:
+        try:
+            future = get_pool().submit(_run, job_id, kind, params)
+            _futures.add(future)
+            future.add_done_callback(_futures.discard)
+        except RuntimeError as e:
+            _local.discard(job_id)
+            _update(job_id, status="failed", error=str(e), finished_at=_now())
+    return get(job_id), created
+
+def _job(row):
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    for private in ("dedupe_key", "owner_pid", "artifact_path"):
+        job.pop(private)
+    if job["status"] == "done":
+        job["progress"] = 1.0
+    elif job["rows_total"]:
+        job["progress"] = round(min(1.0, job["rows_done"] / job["rows_total"]), 3)
+    else:
+        job["progress"] = None
+    return job
+
+def _fetch(job_id):
+    with db.connection() as conn:
+        return conn.execute("SELECT * FROM ReportJobs WHERE id = ?", (job_id,)).fetchone()
+
+def get(job_id):
+    """The job's status and progress as a dict, None if unknown."""
+    row = _fetch(job_id)
+    if row and row["status"] in ACTIVE and not _alive(row["id"], row["owner_pid"]):
+        db.execute_write(_fail_orphans)
+        row = _fetch(job_id)
+    return _job(row) if row else None
+
+def list_jobs(limit=50):
+    with db.connection() as conn:
+        rows = conn.execute("SELECT * FROM ReportJobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    return [_job(row) for row in rows]
+
+def artifact_path(job_id):
+    """Path of a finished job's artifact, None if it isn't done or is gone."""
+    row = _fetch(job_id)
+    if not row or row["status"] != "done" or not row["artifact_path"]:
+        return None
+    return row["artifact_path"] if os.path.exists(row["artifact_path"]) else None
+
+def download_name(job):
+    """Friendly file name for a job's artifact, e.g. verification_xlsx_20250101_120000.xlsx."""
+    _, extension, _, _ = KINDS[job["kind"]]
+    stamp = job["created_at"].replace("-", "").replace(":", "").replace(" ", "_")
+    return f"{job['kind']}_{stamp}{extension(job['params'])}"
+
+# --- Retention ---
+
+def _expire(conn=None):
+    """Applies the retention limits. Returns the artifact paths to delete."""
+    if conn is None:
+        return db.execute_write(_expire)
+    _fail_orphans(conn)
+    retention = f"-{config.REPORT_JOB_RETENTION_HOURS * 3600:.0f} seconds"
+    doomed = [row[0] for row in conn.execute(
+        "SELECT artifact_path FROM ReportJobs WHERE status IN ('done', 'failed', 'expired') "
+        "AND finished_at < datetime('now', ?) AND artifact_path IS NOT NULL",
+        (retention,)
+    )]
+    conn.execute(
+        "DELETE FROM ReportJobs WHERE status IN ('done', 'failed', 'expired') AND finished_at < datetime('now', ?)",
+        (retention,)
+    )
+
+    # Newest artifacts first; everything past either cap is expired early
+    kept, kept_bytes = 0, 0
+    max_bytes = config.REPORT_JOB_MAX_STORE_MB * 1024 * 1024
+    for row in conn.execute(
+        "SELECT id, artifact_path, size_bytes FROM ReportJobs WHERE status = 'done' ORDER BY finished_at DESC"
+    ).fetchall():
+        kept += 1
+        kept_bytes += row[2] or 0
+        if kept > config.REPORT_JOB_MAX_ARTIFACTS or kept_bytes > max_bytes:
+            doomed.append(row[1])
+            _update(row[0], status="expired", artifact_path=None, conn=conn)
+    return doomed
+
+def cleanup(verbose=True):
+    """Expires old jobs and deletes their artifacts, plus files no job owns. Returns files removed."""
+    removed = 0
+    for path in _expire():
+        if path and os.path.exists(path):
+            os.remove(path)
+            removed += 1
+
+    if os.path.isdir(JOBS_DIR):
+        with db.connection() as conn:
+            wanted = {row[0] for row in conn.execute(
+                "SELECT id FROM ReportJobs WHERE status IN ('queued', 'running') OR (status = 'done' AND artifact_path IS NOT NULL)"
+            )}
+        for name in os.listdir(JOBS_DIR):
+            # <job id>.<ext>, or <job id>.<ext>.tmp while it is written. Recent
+            # files may belong to a job submitted after `wanted` was read.
+            path = os.path.join(JOBS_DIR, name)
+            if name.split(".")[0] not in wanted and time.time() - os.path.getmtime(path) > ORPHAN_GRACE_SECONDS:
+                os.remove(path)
+                removed += 1
+
+    if verbose:
+        print(f"Removed {removed} report artifact(s) from {JOBS_DIR}")
+    return removed
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "list":
+        for job in list_jobs():
+            progress = "" if job["progress"] is None else f" {job['progress']:.0%}"
+            print(f"{job['id']}  {job['created_at']}  {job['kind']:<22} {job['status']:<8}{progress}  {job['error'] or ''}")
+    elif command == "run" and len(sys.argv) > 2:
+        params = dict(arg.split("=", 1) for arg in sys.argv[3:])
+        job, created = submit(sys.argv[2], params, requested_by="cli")
+        print(f"{'Started' if created else 'Joined'} job {job['id']}")
+        while job["status"] in ACTIVE:
+            time.sleep(0.5)
+            job = get(job["id"])
+        if job["status"] != "done":
+            print(f"Job {job['status']}: {job['error']}")
+            sys.exit(1)
+        print(f"Done: {artifact_path(job['id'])} ({job['rows_done']} rows, {job['size_bytes']} bytes)")
+    elif command == "cleanup":
+        cleanup()
+    else:
+        print("Usage: python -m app.report_jobs [list|run <kind> [key=value ...]|cleanup]")
+        sys.exit(2)
@@ -1,15 +1,10 @@
-import pandas as pd
-from app.db import get_conn
+from app.snapshot import open_reporting_connection
 import os
+import sys
 
 REPORTS_DIR = 'reports'
 
-def export_verification_report(filename="verification_report.xlsx"):
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-    path = os.path.join(REPORTS_DIR, filename)
-    
-    conn = get_conn()
-    query = """
+REPORT_QUERY = """
     SELECT 
         c.full_name, c.cnic, c.income_range,
         v.status, v.risk_score, v.trust_score, v.verified_by, v.updated_at,
@@ -17,21 +12,117 @@ def export_verification_report(filename="verification_report.xlsx"):
     FROM Customers c
     LEFT JOIN Verifications v ON c.id = v.customer_id
     LEFT JOIN LoanEligibility l ON c.id = l.customer_id
+"""
+
+# Source table of each report column, for the columnar schema
+REPORT_COLUMNS = [
+    ("Customers", ["full_name", "cnic", "income_range"]),
+    ("Verifications", ["status", "risk_score", "trust_score", "verified_by", "updated_at"]),
+    ("LoanEligibility", ["eligibility_status", "max_limit"]),
+]
+REPORT_HEADERS = [column for _, columns in REPORT_COLUMNS for column in columns]
+
+# CNIC handling in the xlsx and columnar reports: 'partial' shows the last 4 characters,
+# 'none' the full plaintext, 'full' nothing at all
+CNIC_MASKS = ("partial", "none", "full")
+
+def _report_rows(mask, batch_size):
+    """Batches of report rows with the CNIC decrypted and masked."""
+    from app import security_utils
+    from app.services import export_service
+
+    cnic_index = 1
+    # 'full' never needs the plaintext, skip the decryption
+    columns = [(name, name, mask != "full" and i == cnic_index) for i, name in enumerate(REPORT_HEADERS)]
+    for batch in export_service.iter_batches(REPORT_QUERY, (), columns, batch_size):
+        for row in batch:
+            if mask == "partial":
+                row[cnic_index] = security_utils.mask_identifier(row[cnic_index])
+            elif mask == "full":
+                row[cnic_index] = "[REDACTED]" if row[cnic_index] else row[cnic_index]
+        yield batch
+
+def export_verification_report(filename="verification_report.xlsx", mask="partial", batch_size=2000, progress=None):
     """
-    
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    
-    # Add summary sheet
-    with pd.ExcelWriter(path, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Detailed Data', index=False)
-        
-        # Summary
-        summary = df['status'].value_counts().to_frame("Count")
-        summary.to_excel(writer, sheet_name='Summary')
-        
-    print(f"Report exported to {path}")
+    Detailed Data + Summary workbook, streamed: rows are read, decrypted and
+    appended in batches to write-only sheets, and the Summary counts are
+    kept as rows go by, so memory doesn't grow with the number of customers.
+    progress(rows) is called after each batch.
+    """
+    from openpyxl import Workbook
+
+    if mask not in CNIC_MASKS:
+        raise ValueError(f"Unknown CNIC mask: {mask}")
+    path = os.path.join(REPORTS_DIR, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    wb = Workbook(write_only=True)
+    detail = wb.create_sheet("Detailed Data")
+    summary = wb.create_sheet("Summary")
+    detail.append(REPORT_HEADERS)
+
+    status_index = REPORT_HEADERS.index("status")
+    status_counts = {}
+    rows = 0
+    for batch in _report_rows(mask, batch_size):
+        for row in batch:
+            detail.append(row)
+            status = row[status_index]
+            if status is not None:
+                status_counts[status] = status_counts.get(status, 0) + 1
+        rows += len(batch)
+        if progress:
+            progress(rows)
+
+    summary.append(["status", "Count"])
+    for status, count in sorted(status_counts.items(), key=lambda item: -item[1]):
+        summary.append([status, count])
+
+    wb.save(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    print(f"Report exported to {path} ({rows} rows)")
+    return path
+
+def _with_progress(batches, progress):
+    rows = 0
+    for batch in batches:
+        yield batch
+        rows += len(batch)
+        progress(rows)
+
+def export_verification_data(fmt="parquet", filename=None, mask="partial", batch_size=10000, progress=None):
+    """
+    The report's detailed rows as Parquet or Arrow IPC (needs pyarrow),
+    streamed from SQLite one row group at a time. The CNIC is masked as in
+    the xlsx report.
+    """
+    from app import columnar
+
+    pa = columnar.require_pyarrow()
+    if fmt not in columnar.FORMATS:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+    if mask not in CNIC_MASKS:
+        raise ValueError(f"Unknown CNIC mask: {mask}")
+    path = os.path.join(REPORTS_DIR, filename or f"verification_report{columnar.FORMATS[fmt]}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    conn = open_reporting_connection()
+    try:
+        schema = pa.schema([field for table, columns in REPORT_COLUMNS for field in columnar.table_schema(conn, table, columns)])
+    finally:
+        conn.close()
+    batches = _report_rows(mask, batch_size)
+    if progress:
+        batches = _with_progress(batches, progress)
+    count = columnar.write_batches(path, schema, batches, fmt)
+
+    print(f"Report exported to {path} ({count} rows)")
     return path
 
 if __name__ == "__main__":
-    export_verification_report()
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "xlsx"
+    mask = sys.argv[sys.argv.index("--mask") + 1] if "--mask" in sys.argv else "partial"
+    if fmt == "xlsx":
+        export_verification_report(mask=mask)
+    else:
+        export_verification_data(fmt, mask=mask)
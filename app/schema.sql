@@ -12,6 +12,9 @@ CREATE TABLE IF NOT EXISTS Customers (
     trust_score INTEGER DEFAULT 50,
     segment TEXT DEFAULT 'Standard',
     customer_code TEXT UNIQUE,
+    cnic_bidx TEXT, -- HMAC blind index of cnic (see security_utils.blind_index)
+    phone_bidx TEXT, -- HMAC blind index of phone
+    email_bidx TEXT, -- HMAC blind index of lower-cased email
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -34,6 +37,9 @@ CREATE TABLE IF NOT EXISTS Verifications (
     verified_by TEXT,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     date TIMESTAMP, -- Added for tracking verification dates
+    fraud_score INTEGER NOT NULL DEFAULT 0, -- rule-based (ai_utils.check_fraud_rules)
+    fraud_flagged INTEGER NOT NULL DEFAULT 0,
+    fraud_alerts TEXT, -- JSON list
     FOREIGN KEY(customer_id) REFERENCES Customers(id)
 );
 
@@ -96,3 +102,37 @@ CREATE TABLE IF NOT EXISTS Locations (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(customer_id) REFERENCES Customers(id)
 );
+
+-- Trigram index on normalized Customers.full_name for duplicate-candidate blocking
+CREATE TABLE IF NOT EXISTS NameTrigrams (
+    trigram TEXT NOT NULL,
+    customer_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, customer_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_nametrigrams_customer ON NameTrigrams(customer_id);
+
+-- Persisted risk-engine output, recomputed only when the input hash or engine version changes
+CREATE TABLE IF NOT EXISTS RiskProfiles (
+    customer_id INTEGER PRIMARY KEY,
+    input_hash TEXT NOT NULL, -- keyed hash of the scoring inputs
+    engine_version TEXT NOT NULL,
+    risk_score INTEGER NOT NULL,
+    trust_score INTEGER NOT NULL,
+    risk_level TEXT,
+    segment TEXT,
+    reasons TEXT, -- JSON list
+    face_match_score INTEGER,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(customer_id) REFERENCES Customers(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_riskprofiles_engine_version ON RiskProfiles(engine_version);
+
+-- Indexes backing the paginated verification listing (keyset sort + filters)
+CREATE INDEX IF NOT EXISTS idx_customers_created_at ON Customers(created_at);
+CREATE INDEX IF NOT EXISTS idx_verifications_status_updated ON Verifications(status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_verifications_customer ON Verifications(customer_id);
+CREATE INDEX IF NOT EXISTS idx_verifications_risk ON Verifications(risk_score);
+CREATE INDEX IF NOT EXISTS idx_verifications_status_risk ON Verifications(status, risk_score);
+CREATE INDEX IF NOT EXISTS idx_verifications_updated ON Verifications(updated_at);
@@ -1,5 +1,7 @@
 import os
 import base64
+import hmac
+import hashlib
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -32,6 +34,10 @@ def load_key():
 MASTER_KEY = load_key()
 aesgcm = AESGCM(MASTER_KEY)
 
+# Separate key for blind indexes, derived from the master key so that the
+# HMAC output can never be confused with (or used to attack) the AES key.
+BLIND_INDEX_KEY = hmac.new(MASTER_KEY, b"kyc-blind-index-v1", hashlib.sha256).digest()
+
 def encrypt_data(data: str) -> str:
     """
     Encrypts a string using AES-256-GCM.
@@ -72,3 +78,64 @@ def decrypt_data(token: str) -> str:
         # Log error in production
         print(f"Decryption error: {e}")
         return "[ENCRYPTED]"
+
+def _decrypt_or_keep(token):
+    # Not decrypt_data(): it swallows the error and returns "[ENCRYPTED]"
+    if not token:
+        return token
+    try:
+        payload = base64.urlsafe_b64decode(token)
+        return aesgcm.decrypt(payload[:NONCE_SIZE], payload[NONCE_SIZE:], None).decode('utf-8')
+    except Exception:
+        return token
+
+def decrypt_many(tokens, executor=None, chunk_size=64):
+    """
+    Decrypts a batch of tokens, keeping any value that can't be decoded as is.
+    With an `executor` the batch is spread over its threads (AES-GCM releases
+    the GIL); results keep the input order.
+    """
+    tokens = list(tokens)
+    if executor is None or len(tokens) <= chunk_size:
+        return [_decrypt_or_keep(t) for t in tokens]
+    chunks = [tokens[i:i + chunk_size] for i in range(0, len(tokens), chunk_size)]
+    results = []
+    for chunk in executor.map(lambda c: [_decrypt_or_keep(t) for t in c], chunks):
+        results.extend(chunk)
+    return results
+
+def mask_identifier(value, visible=4, mask_char="*"):
+    """
+    Masks all but the last `visible` digits/letters, keeping separators:
+    '42101-0233667-9' -> '*****-****667-9'.
+    """
+    if not value:
+        return value
+    keep = visible
+    out = []
+    for ch in reversed(value):
+        if ch.isalnum():
+            out.append(ch if keep > 0 else mask_char)
+            keep -= 1
+        else:
+            out.append(ch)
+    return "".join(reversed(out))
+
+def normalize_identifier(data: str) -> str:
+    """
+    Canonical form used for blind indexing: strips whitespace and dashes so
+    '42101-0233667-9' and '4210102336679' index to the same value.
+    """
+    return "".join(ch for ch in data if not ch.isspace() and ch != "-")
+
+def blind_index(data: str) -> str:
+    """
+    Computes a keyed HMAC-SHA256 of a sensitive value for equality lookups.
+    The ciphertext stays non-deterministic; this hex digest is stored next to it
+    so rows can be found with a single indexed query instead of decrypting all.
+    """
+    if not data:
+        return None
+
+    normalized = normalize_identifier(data)
+    return hmac.new(BLIND_INDEX_KEY, normalized.encode('utf-8'), hashlib.sha256).hexdigest()
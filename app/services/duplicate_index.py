@@ -0,0 +1,117 @@
+import re
+from app import security_utils
+
+# Candidate blocking for duplicate-identity checks.
+#
+# Instead of handing the risk engine every customer in the book, registration
+# asks this module for a handful of plausible duplicates:
+#   * exact matches on the CNIC / phone / email blind indexes (hashed keys)
+#   * fuzzy name matches through a trigram index on the normalized full_name
+# The risk engine then runs its usual strict + difflib checks on those rows only.
+
+QGRAM_SIZE = 3
+# Share of the query's trigrams a stored name must contain to be a candidate.
+# difflib's 0.90 name threshold allows only one or two edits, and one edit
+# touches at most QGRAM_SIZE trigrams, so 0.5 leaves a wide safety margin.
+MIN_QGRAM_OVERLAP = 0.5
+MAX_NAME_CANDIDATES = 25
+
+def normalize_name(name):
+    """Lower-cases, strips punctuation and collapses whitespace."""
+    name = re.sub(r"[^\w\s]", " ", (name or "").lower())
+    return " ".join(name.split())
+
+def name_qgrams(name, q=QGRAM_SIZE):
+    """Set of padded q-grams of the normalized name ('ali' -> '  a', ' al', 'ali', 'li ', ...)."""
+    normalized = normalize_name(name)
+    if not normalized:
+        return set()
+    padded = " " * (q - 1) + normalized + " " * (q - 1)
+    return {padded[i:i + q] for i in range(len(padded) - q + 1)}
+
+def email_key(email):
+    """Blind index of the lower-cased email."""
+    return security_utils.blind_index((email or "").strip().lower())
+
+def index_customer(cursor, customer_id, full_name):
+    """Adds (or refreshes) a customer's name trigrams. Runs inside the caller's transaction."""
+    cursor.execute("DELETE FROM NameTrigrams WHERE customer_id = ?", (customer_id,))
+    cursor.executemany(
+        "INSERT OR IGNORE INTO NameTrigrams (trigram, customer_id) VALUES (?, ?)",
+        [(gram, customer_id) for gram in name_qgrams(full_name)]
+    )
+
+def remove_customer(cursor, customer_id):
+    cursor.execute("DELETE FROM NameTrigrams WHERE customer_id = ?", (customer_id,))
+
+def backfill(cursor):
+    """Indexes customers created before the blocking index existed."""
+    rows = cursor.execute("SELECT id, email FROM Customers WHERE email_bidx IS NULL AND email IS NOT NULL").fetchall()
+    cursor.executemany(
+        "UPDATE Customers SET email_bidx = ? WHERE id = ?",
+        [(email_key(row['email']), row['id']) for row in rows]
+    )
+
+    rows = cursor.execute("""
+        SELECT id, full_name FROM Customers
+        WHERE id NOT IN (SELECT customer_id FROM NameTrigrams)
+    """).fetchall()
+    for row in rows:
+        index_customer(cursor, row['id'], row['full_name'])
+    if rows:
+        print(f"Indexed names of {len(rows)} customers for duplicate detection")
+
+def find_candidate_ids(conn, customer, exclude_id=None):
+    """Ids of customers that could be duplicates of `customer` (plaintext dict)."""
+    ids = set()
+
+    keys = [
+        ("cnic_bidx", security_utils.blind_index(customer.get('cnic', ''))),
+        ("phone_bidx", security_utils.blind_index(customer.get('phone', ''))),
+        ("email_bidx", email_key(customer.get('email', '')) if customer.get('email') else None),
+    ]
+    for column, value in keys:
+        if value:
+            ids.update(row[0] for row in conn.execute(f"SELECT id FROM Customers WHERE {column} = ?", (value,)))
+
+    grams = sorted(name_qgrams(customer.get('full_name', '')))
+    if grams:
+        min_shared = max(1, int(len(grams) * MIN_QGRAM_OVERLAP))
+        placeholders = ",".join("?" * len(grams))
+        rows = conn.execute(f"""
+            SELECT customer_id, COUNT(*) AS shared
+            FROM NameTrigrams
+            WHERE trigram IN ({placeholders})
+            GROUP BY customer_id
+            HAVING shared >= ?
+            ORDER BY shared DESC
+            LIMIT ?
+        """, (*grams, min_shared, MAX_NAME_CANDIDATES)).fetchall()
+        ids.update(row[0] for row in rows)
+
+    ids.discard(exclude_id)
+    return ids
+
+def find_candidates(conn, customer, exclude_id=None):
+    """
+    Returns blocked duplicate candidates in the shape the risk engine expects
+    for `existing_customers` (decrypted cnic / phone), ordered by id like a
+    full-table scan would be, so the engine produces the same reasons.
+    """
+    ids = find_candidate_ids(conn, customer, exclude_id=exclude_id)
+    if not ids:
+        return []
+
+    placeholders = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT id, full_name, cnic, email, phone FROM Customers WHERE id IN ({placeholders}) ORDER BY id",
+        tuple(ids)
+    ).fetchall()
+
+    candidates = []
+    for row in rows:
+        cust = dict(row)
+        cust['cnic'] = security_utils.decrypt_data(cust['cnic'])
+        cust['phone'] = security_utils.decrypt_data(cust['phone'])
+        candidates.append(cust)
+    return candidates
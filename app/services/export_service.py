@@ -0,0 +1,136 @@
+import csv
+import io
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from app import config, db, security_utils, snapshot
+from app.db_pool import configure_connection
+
+# Streaming customer exports.
+#
+# Rows are read with fetchmany in batches of EXPORT_BATCH_SIZE, the encrypted
+# columns of a batch are decrypted together (across the decrypt threads when
+# configured), and each batch is yielded as one CSV chunk, optionally through
+# a streaming gzip compressor. Memory stays at one batch however big the
+# export is.
+#
+# The export reads through its own connection rather than a pooled one: a
+# slow download must not hold a pool slot, and Starlette may resume the
+# generator on a different thread for each chunk. One WAL read transaction
+# covers the whole export, so it is a consistent snapshot. With
+# REPORTS_FROM_SNAPSHOT it reads the reporting snapshot instead (app/snapshot.py).
+
+EXPORT_STATUSES = {
+    "verified": "Verified",
+    "rejected": "Rejected",
+    "pending": "Pending",
+}
+
+# (CSV header, column, encrypted at rest?)
+CUSTOMER_COLUMNS = [
+    ("ID", "id", False),
+    ("Full Name", "full_name", False),
+    ("CNIC", "cnic", True),
+    ("Email", "email", False),
+    ("Phone", "phone", True),
+    ("Address", "address", True),
+    ("Status", "status", False),
+    ("Risk Score", "risk_score", False),
+    ("Trust Score", "trust_score", False),
+    ("Date", "date", False),
+    ("Remarks", "remarks", False),
+]
+
+CUSTOMER_EXPORT_SQL = """
+    SELECT
+        c.id, c.full_name, c.cnic, c.email, c.phone, c.address,
+        v.status, v.risk_score, v.trust_score, v.date, v.remarks
+    FROM Customers c
+    JOIN Verifications v ON c.id = v.customer_id
+    WHERE v.status = ?
+    ORDER BY v.date DESC
+"""
+
+_decrypt_pool = None
+_decrypt_pool_lock = threading.Lock()
+
+def get_decrypt_pool():
+    """Shared decrypt threads, or None when EXPORT_DECRYPT_WORKERS is 0."""
+    global _decrypt_pool
+    if config.EXPORT_DECRYPT_WORKERS <= 0:
+        return None
+    with _decrypt_pool_lock:
+        if _decrypt_pool is None:
+            _decrypt_pool = ThreadPoolExecutor(max_workers=config.EXPORT_DECRYPT_WORKERS, thread_name_prefix="decrypt")
+        return _decrypt_pool
+
+def shutdown_decrypt_pool():
+    with _decrypt_pool_lock:
+        if _decrypt_pool is not None:
+            _decrypt_pool.shutdown(wait=False)
+
+def _export_connection():
+    if snapshot.use_snapshot():
+        return snapshot.connect()
+    conn = sqlite3.connect(db.DB_PATH, check_same_thread=False)
+    return configure_connection(conn, config.DB_BUSY_TIMEOUT_MS, config.DB_CACHE_SIZE_KIB, config.DB_MMAP_SIZE)
+
+def iter_batches(sql, params=(), columns=CUSTOMER_COLUMNS, batch_size=None, progress=None):
+    """
+    Yields lists of row tuples (in `columns` order) with encrypted columns
+    decrypted. progress(rows) is called once each batch has been consumed.
+    """
+    batch_size = batch_size or config.EXPORT_BATCH_SIZE
+    encrypted = [i for i, (_, _, is_encrypted) in enumerate(columns) if is_encrypted]
+    pool = get_decrypt_pool()
+    done = 0
+
+    conn = _export_connection()
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = [[row[column] for _, column, _ in columns] for row in rows]
+            # One flat decrypt call per batch: [row0.cnic, row0.email, ..., row1.cnic, ...]
+            plain = security_utils.decrypt_many((r[i] for r in batch for i in encrypted), executor=pool)
+            for n, values in enumerate(batch):
+                for k, i in enumerate(encrypted):
+                    values[i] = plain[n * len(encrypted) + k]
+            yield batch
+            done += len(batch)
+            if progress:
+                progress(done)
+    finally:
+        conn.close()
+
+def iter_csv(batches, columns=CUSTOMER_COLUMNS):
+    """Yields UTF-8 CSV chunks: the header, then one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _, _ in columns])
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def gzip_chunks(chunks, level=6):
+    """Compresses a byte stream into a gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_customers_csv(db_status, compress=False, progress=None):
+    """Byte chunks of the customer CSV for one verification status."""
+    chunks = iter_csv(iter_batches(CUSTOMER_EXPORT_SQL, (db_status,), progress=progress))
+    return gzip_chunks(chunks) if compress else chunks
@@ -2,19 +2,47 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from reportlab.lib.colors import HexColor
+import asyncio
+import hashlib
+import json
 import os
+import re
+import threading
+import time
 from datetime import datetime
+from app import config
+from app.executors import BoundedProcessPool, ExecutorSaturated
 
-def generate_loan_decision_pdf(customer, decision, reason, admin_name, max_limit=0):
+PDF_DIR = "generated_pdfs"
+
+# Bump when the letter layout or wording changes, so cached letters are re-rendered
+TEMPLATE_VERSION = 2
+
+# Customer fields printed on the letter
+LETTER_FIELDS = ("id", "full_name", "cnic", "email", "phone")
+
+# "Verified by" on cached letters. One fixed signer, and customer fields always
+# taken from db.get_customer_by_id(), keep the admin's render and the
+# customer's download of the same decision on the same cache key.
+LETTER_SIGNER = "NeoBank Loan Department"
+
+def generate_loan_decision_pdf(customer, decision, reason, admin_name, max_limit=0, filepath=None):
     """
     Generates a professional PDF for Loan Approval or Rejection.
     Returns the absolute file path of the generated PDF.
     """
-    os.makedirs("generated_pdfs", exist_ok=True)
-    filename = f"Loan_{decision}_{customer['id']}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-    filepath = os.path.abspath(os.path.join("generated_pdfs", filename))
+    if filepath is None:
+        os.makedirs(PDF_DIR, exist_ok=True)
+        filename = f"Loan_{decision}_{customer['id']}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+        filepath = os.path.abspath(os.path.join(PDF_DIR, filename))
     
     c = canvas.Canvas(filepath, pagesize=letter)
+    draw_loan_decision(c, customer, decision, reason, admin_name, max_limit)
+    c.save()
+    return filepath
+
+def draw_loan_decision(c, customer, decision, reason, admin_name, max_limit=0):
+    """Draws one letter on the canvas's current page."""
     width, height = letter
     
     # --- Branding & Header ---
@@ -123,6 +151,291 @@ def generate_loan_decision_pdf(customer, decision, reason, admin_name, max_limit
     c.setFillColor(HexColor("#6B7280"))
     c.drawCentredString(width / 2, 40, "This is a computer-generated document. No physical signature is required.")
     c.drawCentredString(width / 2, 30, "NeoBank Ltd. | 123 Finance Avenue, Karachi, Pakistan | www.neobank.com")
-    
-    c.save()
-    return filepath
+
+# --- Cache ---
+# Letters are stored as generated_pdfs/<sha256 of everything rendered>.pdf.
+# A request for a letter that exists already is a file send, not a render;
+# any change to the inputs (or TEMPLATE_VERSION) gives a new file. A cache
+# hit touches the file's mtime, which evict() uses as the last-use time.
+
+_last_evict = 0.0
+_evict_lock = threading.Lock()
+EVICT_INTERVAL = 60  # seconds between directory scans per process
+
+def letter_customer(customer):
+    """The LETTER_FIELDS of a customer as returned by db.get_customer_by_id() (decrypted)."""
+    return {k: customer[k] for k in LETTER_FIELDS}
+
+def cache_key(customer_fields, decision, reason, max_limit=0):
+    """
+    Cache key of a letter: everything drawn on it (customer_fields from
+    letter_customer()) and the template version. The loan's row id isn't
+    drawn, so the same letter has one key whichever table it was decided in.
+    """
+    approved = decision == "Approved"
+    fields = {
+        "template": TEMPLATE_VERSION,
+        "decision": decision,
+        # draw_loan_decision prints the limit on approvals, the reason on rejections
+        "reason": None if approved else reason,
+        "max_limit": max_limit if approved else None,
+        "customer": {k: customer_fields[k] for k in LETTER_FIELDS},
+    }
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+def _cache_path(key):
+    return os.path.abspath(os.path.join(PDF_DIR, f"{key}.pdf"))
+
+def _touch(path):
+    """Marks a cached letter as used. False if it isn't there (or was just evicted)."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def render_to(path, customer, decision, reason, admin_name, max_limit=0):
+    """Renders a letter to `path` atomically. Also the entry point in the render processes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        generate_loan_decision_pdf(customer, decision, reason, admin_name, max_limit, filepath=tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+def loan_decision_pdf(customer, decision, reason, max_limit=0):
+    """
+    The loan decision letter from the cache, rendered in this thread on a
+    miss (scripts / GUI; handlers use the async or background variants).
+    `customer` comes from db.get_customer_by_id(). Returns the absolute file path.
+    """
+    fields = letter_customer(customer)
+    path = _cache_path(cache_key(fields, decision, reason, max_limit))
+    if _touch(path):
+        return path
+    render_to(path, *_letter_args(fields, decision, reason, max_limit))
+    maybe_evict()
+    return path
+
+def evict(max_bytes=None, max_age_days=None):
+    """
+    Deletes PDFs unused for PDF_CACHE_MAX_AGE_DAYS, then least recently used
+    ones until the directory is under PDF_CACHE_MAX_MB. Returns files removed.
+    """
+    max_bytes = config.PDF_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    max_age = (config.PDF_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days) * 86400
+    if not os.path.isdir(PDF_DIR):
+        return 0
+
+    files = []
+    for entry in os.scandir(PDF_DIR):
+        if entry.is_file() and entry.name.endswith(".pdf"):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort(reverse=True)  # most recently used first
+
+    now = time.time()
+    removed = 0
+    total = 0
+    for mtime, size, path in files:
+        total += size
+        if now - mtime > max_age or total > max_bytes:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+def maybe_evict():
+    """evict(), at most once per EVICT_INTERVAL in this process."""
+    global _last_evict
+    with _evict_lock:
+        if time.monotonic() - _last_evict < EVICT_INTERVAL:
+            return 0
+        _last_evict = time.monotonic()
+    return evict()
+
+# --- Render pool ---
+# ReportLab layout is CPU-bound, so API handlers render through a bounded
+# process pool (app/executors.py) instead of on the event loop or a DB
+# thread. A render in progress leaves a <key>.pdf.pending marker, so any
+# worker process can tell "still rendering" from "unknown" when polled.
+# Concurrent requests for the same letter in one process share one render.
+# Batches are split into one task per worker, so a month-end run of
+# hundreds of letters takes `workers` pool slots rather than hundreds.
+
+PENDING_MAX_AGE = 120  # seconds before a stale marker counts as a failed render
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+_inflight = {}  # cache key -> Future of the render
+_inflight_lock = threading.Lock()
+
+def get_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = BoundedProcessPool("pdf", config.PDF_POOL_WORKERS, config.PDF_POOL_MAX_PENDING)
+        return _render_pool
+
+def shutdown_render_pool():
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False)
+
+def render_many(letters):
+    """render_to() for several (path, customer, decision, reason, admin_name, max_limit) tuples in one worker."""
+    return [render_to(*args) for args in letters]
+
+def render_merged(path, letters):
+    """One printable PDF, a page per (customer, decision, reason, admin_name, max_limit) letter."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        c = canvas.Canvas(tmp, pagesize=letter)
+        for args in letters:
+            draw_loan_decision(c, *args)
+            c.showPage()
+        c.save()
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+def _render_done(jobs, future):
+    with _inflight_lock:
+        for key, _ in jobs:
+            _inflight.pop(key, None)
+    for _, path in jobs:
+        if os.path.exists(path + ".pending"):
+            os.remove(path + ".pending")
+    error = "cancelled" if future.cancelled() else future.exception()
+    if error:
+        print(f"PDF render failed for {', '.join(os.path.basename(path) for _, path in jobs)}: {error}")
+    else:
+        maybe_evict()
+
+def _submit(jobs, fn, *args):
+    """
+    Runs fn(*args), which renders the (key, path) jobs, in the pool. A single
+    job already in flight is joined instead. Raises ExecutorSaturated when full.
+    """
+    with _inflight_lock:
+        if len(jobs) == 1 and jobs[0][0] in _inflight:
+            return _inflight[jobs[0][0]]
+        os.makedirs(PDF_DIR, exist_ok=True)
+        for _, path in jobs:
+            open(path + ".pending", "w").close()
+        try:
+            future = get_render_pool().submit(fn, *args)
+        except Exception:
+            for _, path in jobs:
+                os.remove(path + ".pending")
+            raise
+        for key, _ in jobs:
+            _inflight[key] = future
+    # Outside the lock: the callback runs right here if the render already finished
+    future.add_done_callback(lambda f: _render_done(jobs, f))
+    return future
+
+def _letter_args(fields, decision, reason, max_limit=0):
+    # Only what is drawn crosses to the worker process
+    return fields, decision, reason, LETTER_SIGNER, max_limit
+
+def _submit_render(key, path, fields, decision, reason, max_limit):
+    """Starts (or joins) the render of one letter."""
+    return _submit([(key, path)], render_to, path, *_letter_args(fields, decision, reason, max_limit))
+
+async def loan_decision_pdf_async(customer, decision, reason, max_limit=0):
+    """loan_decision_pdf() with a miss rendered in the pool; the event loop stays free."""
+    fields = letter_customer(customer)
+    key = cache_key(fields, decision, reason, max_limit)
+    path = _cache_path(key)
+    if _touch(path):
+        return path
+    return await asyncio.wrap_future(_submit_render(key, path, fields, decision, reason, max_limit))
+
+def render_in_background(customer, decision, reason, max_limit=0):
+    """
+    Starts rendering the letter unless it is cached, without waiting.
+    Returns (cache key, ready?); poll letter_status(key) until it is 'ready'.
+    """
+    fields = letter_customer(customer)
+    key = cache_key(fields, decision, reason, max_limit)
+    path = _cache_path(key)
+    if _touch(path):
+        return key, True
+    _submit_render(key, path, fields, decision, reason, max_limit)
+    return key, False
+
+def render_batch_in_background(letters, merge=False):
+    """
+    Starts rendering many letters, each a tuple of loan_decision_pdf()
+    arguments, split into one task per pool worker. With merge, also one
+    printable PDF with a page per letter. Returns ([(key, ready) per letter],
+    (key, ready) of the merged PDF or None); an entry is None where the pool
+    was full.
+    """
+    results = []
+    todo = {}
+    keys, drawn = [], []
+    for customer, decision, reason, max_limit in letters:
+        fields = letter_customer(customer)
+        key = cache_key(fields, decision, reason, max_limit)
+        path = _cache_path(key)
+        ready = _touch(path)
+        results.append((key, ready))
+        keys.append(key)
+        drawn.append(_letter_args(fields, decision, reason, max_limit))
+        with _inflight_lock:
+            in_flight = key in _inflight
+        if not ready and not in_flight:
+            todo[key] = (path, drawn[-1])
+
+    workers = get_render_pool().max_workers
+    pending = list(todo.items())
+    for chunk in (pending[i::workers] for i in range(min(workers, len(pending)))):
+        jobs = [(key, path) for key, (path, _) in chunk]
+        try:
+            _submit(jobs, render_many, [(path, *args) for _, (path, args) in chunk])
+        except ExecutorSaturated:
+            failed = {key for key, _ in jobs}
+            results = [None if r and r[0] in failed else r for r in results]
+
+    merged = None
+    if merge and letters:
+        # Keyed by its letters' keys, in order
+        letter_keys = ",".join(keys)
+        key = hashlib.sha256(f"merged:{letter_keys}".encode()).hexdigest()
+        path = _cache_path(key)
+        merged = (key, True)
+        if not _touch(path):
+            try:
+                _submit([(key, path)], render_merged, path, drawn)
+                merged = (key, False)
+            except ExecutorSaturated:
+                merged = None
+    return results, merged
+
+def letter_status(key):
+    """'ready', 'pending' or None (unknown, evicted or failed) for a cache key."""
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        return None
+    path = _cache_path(key)
+    if os.path.exists(path):
+        return "ready"
+    try:
+        if time.time() - os.path.getmtime(path + ".pending") < PENDING_MAX_AGE:
+            return "pending"
+    except FileNotFoundError:
+        pass
+    return None
+
+def letter_path(key):
+    """Path of a cached letter by key (check letter_status first)."""
+    return _cache_path(key)
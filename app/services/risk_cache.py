@@ -0,0 +1,231 @@
+import hashlib
+import hmac
+import json
+import random
+
+from app import security_utils
+from app.services import duplicate_index, risk_engine
+
+# Persisted risk profiles.
+#
+# A profile is stored per customer together with a hash of everything the
+# engine looked at (customer fields, face match score, duplicate candidates)
+# and the engine version. Reads serve the stored row; a profile is only
+# recomputed when that hash or ENGINE_VERSION changes. The simulated checks
+# are seeded from the input hash, so the same inputs always give the same score.
+#
+# refresh() rescoring the book goes through risk_engine.score_batch for the
+# customers none of the per-row-only rules (duplicates, simulated checks)
+# apply to, which is nearly all of them; the rest are scored one by one.
+
+# Keyed so the stored hash can't be brute-forced back to a CNIC / phone
+INPUT_HASH_KEY = hmac.new(security_utils.MASTER_KEY, b"kyc-risk-inputs-v1", hashlib.sha256).digest()
+
+PROFILE_FIELDS = ("full_name", "cnic", "email", "phone", "address", "income_range")
+CANDIDATE_FIELDS = ("id", "full_name", "cnic", "email", "phone")
+
+REFRESH_BATCH_SIZE = 5000
+
+def input_hash(customer, existing_customers=None, face_match_score=None):
+    """Stable hash of the scoring inputs (plaintext customer dict + candidates)."""
+    payload = {
+        "customer": [customer.get(field) or "" for field in PROFILE_FIELDS],
+        "face_match_score": face_match_score,
+        "candidates": sorted(
+            [[c.get(field) or "" for field in CANDIDATE_FIELDS] for c in (existing_customers or [])],
+            key=lambda c: c[0]
+        ),
+    }
+    data = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hmac.new(INPUT_HASH_KEY, data, hashlib.sha256).hexdigest()
+
+def score(customer, existing_customers=None, face_match_score=None):
+    """Scores deterministically. Returns (profile, input_hash)."""
+    digest = input_hash(customer, existing_customers, face_match_score)
+    rng = random.Random(int(digest[:16], 16))
+    profile = risk_engine.calculate_risk_profile(
+        customer,
+        existing_customers=existing_customers,
+        face_match_score=face_match_score,
+        rng=rng
+    )
+    return profile, digest
+
+def store(conn, customer_id, profile, digest, face_match_score=None):
+    """Upserts the customer's profile. Runs inside the caller's transaction."""
+    conn.execute("""
+        INSERT INTO RiskProfiles (customer_id, input_hash, engine_version, risk_score, trust_score,
+                                  risk_level, segment, reasons, face_match_score, computed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(customer_id) DO UPDATE SET
+            input_hash = excluded.input_hash,
+            engine_version = excluded.engine_version,
+            risk_score = excluded.risk_score,
+            trust_score = excluded.trust_score,
+            risk_level = excluded.risk_level,
+            segment = excluded.segment,
+            reasons = excluded.reasons,
+            face_match_score = excluded.face_match_score,
+            computed_at = CURRENT_TIMESTAMP
+    """, (
+        customer_id, digest, risk_engine.ENGINE_VERSION, profile['risk_score'], profile['trust_score'],
+        profile['risk_level'], profile['segment'], json.dumps(profile['reasons']), face_match_score
+    ))
+
+def _row_to_profile(row):
+    return {
+        "risk_score": row['risk_score'],
+        "trust_score": row['trust_score'],
+        "risk_level": row['risk_level'],
+        "segment": row['segment'],
+        "reasons": json.loads(row['reasons'] or "[]"),
+    }
+
+def get_profile(conn, customer_id):
+    """Stored profile (any version) or None. Indexed lookup, no scoring."""
+    row = conn.execute("SELECT * FROM RiskProfiles WHERE customer_id = ?", (customer_id,)).fetchone()
+    return _row_to_profile(row) if row else None
+
+def _inputs(conn, customer_id, customer):
+    """(stored RiskProfiles row or None, candidates, face match score, input hash)."""
+    row = conn.execute("SELECT * FROM RiskProfiles WHERE customer_id = ?", (customer_id,)).fetchone()
+    face_match_score = row['face_match_score'] if row else None
+    candidates = duplicate_index.find_candidates(conn, customer, exclude_id=customer_id)
+    return row, candidates, face_match_score, input_hash(customer, candidates, face_match_score)
+
+def _is_current(row, digest):
+    return row is not None and row['input_hash'] == digest and row['engine_version'] == risk_engine.ENGINE_VERSION
+
+def check_profile(conn, customer_id, customer):
+    """
+    Read-only half of ensure_profile(), for callers that write elsewhere (the
+    writer): the stored profile if it is current, otherwise a fresh score.
+    Returns (profile, store() arguments to persist it, or None if current).
+    """
+    row, candidates, face_match_score, digest = _inputs(conn, customer_id, customer)
+    if _is_current(row, digest):
+        return _row_to_profile(row), None
+
+    profile, digest = score(customer, candidates, face_match_score)
+    return profile, (customer_id, profile, digest, face_match_score)
+
+def score_many(items):
+    """
+    score() for a list of (customer, candidates, face_match_score), with the
+    same results. Rows with duplicate candidates or where a seeded simulated
+    check fires are scored per row; the rest in one risk_engine.score_batch
+    call (per row if pandas isn't installed). Returns [(profile, input_hash)].
+    """
+    results = [None] * len(items)
+    digests = [input_hash(*item) for item in items]
+    # calculate_risk_profile's first draw is the blur check (< 0.05)
+    batched = [
+        i for i, (_, candidates, _) in enumerate(items)
+        if not candidates and random.Random(int(digests[i][:16], 16)).random() >= 0.05
+    ]
+    try:
+        import pandas as pd
+    except ImportError:
+        batched = []
+
+    if batched:
+        frame = pd.DataFrame({
+            **{field: [items[i][0].get(field) for i in batched] for field in PROFILE_FIELDS},
+            # object dtype keeps the stored ints, so reasons read "65%" not "65.0%"
+            "face_match_score": pd.Series([items[i][2] for i in batched], dtype=object),
+        })
+        scored = risk_engine.score_batch(frame, with_reasons=True)
+        for i, values in zip(batched, scored.itertuples(index=False)):
+            profile = {
+                "risk_score": int(values.risk_score),
+                "trust_score": int(values.trust_score),
+                "risk_level": values.risk_level,
+                "segment": values.segment,
+                "reasons": values.reasons,
+            }
+            # Only a row with no reasons gets the second (returning customer) draw
+            if profile["reasons"]:
+                results[i] = (profile, digests[i])
+
+    for i, item in enumerate(items):
+        if results[i] is None:
+            results[i] = score(*item)
+    return results
+
+def ensure_profile(conn, customer_id, customer):
+    """
+    Returns the customer's profile, recomputing it only if the inputs or the
+    engine version changed since it was stored. `customer` is the decrypted dict.
+    Returns (profile, recomputed).
+    """
+    profile, pending = check_profile(conn, customer_id, customer)
+    if pending:
+        store(conn, *pending)
+    return profile, pending is not None
+
+def sync_pending_verification(conn, customer_id, profile):
+    """
+    Pending verifications show the current engine score plus their stored
+    fraud-rule score; decided ones keep the reviewer's.
+    """
+    conn.execute(
+        """
+        UPDATE Verifications
+        SET risk_score = MIN(? + fraud_score, 100), trust_score = ?,
+            fraud_flagged = (fraud_score > 30 OR MIN(? + fraud_score, 100) > 70)
+        WHERE customer_id = ? AND status = 'Pending'
+        """,
+        (profile['risk_score'], profile['trust_score'], profile['risk_score'], customer_id)
+    )
+
+def refresh(conn, check_inputs=False):
+    """
+    Recomputes stale profiles. By default only customers without a profile or
+    with one from an older engine version are visited; `check_inputs` also
+    re-hashes every other customer to catch changed inputs (e.g. a new duplicate).
+    Returns the number of profiles recomputed.
+    """
+    if check_inputs:
+        ids = [row[0] for row in conn.execute("SELECT id FROM Customers")]
+    else:
+        ids = [row[0] for row in conn.execute("""
+            SELECT c.id FROM Customers c
+            LEFT JOIN RiskProfiles rp ON rp.customer_id = c.id
+            WHERE rp.customer_id IS NULL OR rp.engine_version != ?
+        """, (risk_engine.ENGINE_VERSION,))]
+
+    stale = []
+    for customer_id in ids:
+        row = conn.execute(
+            "SELECT id, full_name, cnic, email, phone, address, income_range FROM Customers WHERE id = ?",
+            (customer_id,)
+        ).fetchone()
+        if not row:
+            continue
+        customer = dict(row)
+        try:
+            for field in ("cnic", "phone", "address"):
+                customer[field] = security_utils.decrypt_data(customer[field])
+        except Exception as e:
+            print(f"Skipping risk profile for customer {customer_id}: {e}")
+            continue
+
+        stored, candidates, face_match_score, digest = _inputs(conn, customer_id, customer)
+        if not _is_current(stored, digest):
+            stale.append((customer_id, (customer, candidates, face_match_score)))
+
+    for i in range(0, len(stale), REFRESH_BATCH_SIZE):
+        chunk = stale[i:i + REFRESH_BATCH_SIZE]
+        for (customer_id, item), (profile, digest) in zip(chunk, score_many([item for _, item in chunk])):
+            store(conn, customer_id, profile, digest, item[2])
+            sync_pending_verification(conn, customer_id, profile)
+    return len(stale)
+
+if __name__ == "__main__":
+    import sys
+    from app import db
+
+    db.init_db()
+    with db.connection() as conn:
+        count = refresh(conn, check_inputs="--check-inputs" in sys.argv)
+    print(f"Recomputed {count} risk profiles (engine version {risk_engine.ENGINE_VERSION})")
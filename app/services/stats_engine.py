@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone
+
+from app import counters
+
+# Time-bucketed verification stats for /reports/stats.
+#
+# Overall counts come from the trigger-maintained Counters table; the
+# bucketed decision counts from one grouped query, a range seek on
+# Verifications(status, date) for Verified / Rejected only (Pending rows have
+# no decision date). Buckets with no rows are filled in here so charts always
+# get a continuous axis.
+#
+# Timestamps are stored by SQLite's CURRENT_TIMESTAMP, i.e. UTC.
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Label -> span. Kept in sync with the range picker on the Reports page.
+TIME_RANGES = {
+    "1 Minute": timedelta(minutes=1),
+    "15 Minutes": timedelta(minutes=15),
+    "2 Hours": timedelta(hours=2),
+    "6 Hours": timedelta(hours=6),
+    "12 Hours": timedelta(hours=12),
+    "24 Hours": timedelta(hours=24),
+    "1 Week": timedelta(days=7),
+    "1 Month": timedelta(days=30),
+    "6 Months": timedelta(days=182),
+    "1 Year": timedelta(days=365),
+}
+
+# Bucket -> (SQL expression mapping `date` to its bucket start, max span it is picked for)
+BUCKETS = {
+    "minute": ("strftime('%Y-%m-%d %H:%M:00', date)", timedelta(hours=1)),
+    "hour": ("strftime('%Y-%m-%d %H:00:00', date)", timedelta(hours=48)),
+    "day": ("strftime('%Y-%m-%d 00:00:00', date)", timedelta(days=62)),
+    "week": ("strftime('%Y-%m-%d 00:00:00', date, 'weekday 0', '-6 days')", timedelta(days=400)),
+    "month": ("strftime('%Y-%m-01 00:00:00', date)", None),
+}
+
+DECISION_STATUSES = ("Verified", "Rejected")
+
+# An explicit bucket may not expand a range into more bars than this
+# (a year of minutes would be ~525k rows of zero-fill).
+MAX_BUCKETS = 2000
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def pick_bucket(span):
+    """Finest bucket that keeps the chart to a readable number of bars."""
+    for name, (_, max_span) in BUCKETS.items():
+        if max_span is None or span <= max_span:
+            return name
+
+def _as_utc(moment):
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def resolve_range(time_range="24 Hours", start=None, end=None, bucket=None):
+    """
+    Returns (start, end, bucket) as naive UTC datetimes. `start`/`end`
+    (datetimes, naive ones taken as UTC) give a custom range and override
+    `time_range`. Raises ValueError for unknown ranges/buckets or an empty range.
+    """
+    if start is not None or end is not None:
+        start, end = _as_utc(start), _as_utc(end) or _utcnow()
+        if start is None:
+            raise ValueError("A custom range needs a start")
+    else:
+        if time_range not in TIME_RANGES:
+            raise ValueError(f"Unknown time range: {time_range}")
+        end = _utcnow()
+        start = end - TIME_RANGES[time_range]
+
+    if start >= end:
+        raise ValueError("Range start must be before its end")
+    if bucket is None:
+        bucket = pick_bucket(end - start)
+    elif bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+    if _too_many_buckets(start, end, bucket):
+        raise ValueError(f"Range too long for '{bucket}' buckets (max {MAX_BUCKETS}); pick a coarser bucket")
+    return start, end, bucket
+
+# --- Bucket arithmetic (mirrors the SQL expressions above) ---
+
+def floor_to_bucket(moment, bucket):
+    if bucket == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def next_bucket(moment, bucket):
+    if bucket == "minute":
+        return moment + timedelta(minutes=1)
+    if bucket == "hour":
+        return moment + timedelta(hours=1)
+    if bucket == "day":
+        return moment + timedelta(days=1)
+    if bucket == "week":
+        return moment + timedelta(weeks=1)
+    if moment.month == 12:
+        return moment.replace(year=moment.year + 1, month=1)
+    return moment.replace(month=moment.month + 1)
+
+def _too_many_buckets(start, end, bucket):
+    moment = floor_to_bucket(start, bucket)
+    for _ in range(MAX_BUCKETS):
+        moment = next_bucket(moment, bucket)
+        if moment >= end:
+            return False
+    return True
+
+def bucket_label(moment, bucket, span):
+    if bucket in ("minute", "hour"):
+        return moment.strftime("%H:%M")
+    if bucket == "day":
+        return moment.strftime("%a") if span <= timedelta(days=7) else moment.strftime("%d %b")
+    if bucket == "week":
+        return moment.strftime("%d %b")
+    return moment.strftime("%b %Y")
+
+# --- Query ---
+
+def _stats_sql(bucket):
+    placeholders = ", ".join("?" for _ in DECISION_STATUSES)
+    return f"""
+        SELECT status, {BUCKETS[bucket][0]} AS bucket, COUNT(*) FROM Verifications
+        WHERE status IN ({placeholders}) AND date >= ? AND date < ?
+        GROUP BY bucket, status
+    """
+
+def verification_stats(conn, time_range="24 Hours", start=None, end=None, bucket=None):
+    """
+    Overall status counts plus zero-filled per-bucket Verified / Rejected
+    counts for the range. Raises ValueError (see resolve_range).
+    """
+    start, end, bucket = resolve_range(time_range, start, end, bucket)
+    # Count the first bucket in full rather than from the middle
+    first = floor_to_bucket(start, bucket)
+    rows = conn.execute(
+        _stats_sql(bucket),
+        (*DECISION_STATUSES, first.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT))
+    ).fetchall()
+
+    overall = {status.lower(): count for status, count in counters.verification_counts(conn).items()}
+    counts = {}
+    for status, bucket_start, count in rows:
+        counts.setdefault(bucket_start, {})[status.lower()] = count
+
+    span = end - start
+    activity = []
+    moment = first
+    while moment < end:
+        bucket_counts = counts.get(moment.strftime(TIMESTAMP_FORMAT), {})
+        activity.append({
+            "name": bucket_label(moment, bucket, span),
+            "bucket": moment.strftime(TIMESTAMP_FORMAT),
+            "verified": bucket_counts.get("verified", 0),
+            "rejected": bucket_counts.get("rejected", 0),
+        })
+        moment = next_bucket(moment, bucket)
+
+    return {
+        "overall": overall,
+        "activity": activity,
+        "range": {
+            "start": start.strftime(TIMESTAMP_FORMAT),
+            "end": end.strftime(TIMESTAMP_FORMAT),
+            "bucket": bucket,
+        },
+    }
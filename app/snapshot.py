@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from app import config
+
+# Read-only reporting snapshot.
+#
+# A copy of the live database taken with SQLite's online backup API, a few
+# pages per step with a short sleep in between so the copy's I/O is spread
+# out. The copy holds one WAL read snapshot throughout, which writers don't
+# wait on, so it is consistent and never restarts. It is written to a temp
+# file and swapped in with
+# os.replace, so readers always see a complete snapshot; connections already
+# open keep reading the previous one until they close.
+#
+# With REPORTS_FROM_SNAPSHOT=1, reporting_connection() (report stats, CSV and
+# Power BI exports, the xlsx / Parquet reports) reads from the snapshot while
+# it is younger than SNAPSHOT_MAX_AGE_SECONDS, and from the live database
+# otherwise. Reports can then lag by up to SNAPSHOT_REFRESH_SECONDS.
+#
+#   python -m app.snapshot refresh   # take a snapshot now
+#   python -m app.snapshot watch     # refresh every SNAPSHOT_REFRESH_SECONDS
+#   python -m app.snapshot status
+
+# If the paced copy keeps restarting anyway (e.g. a non-WAL source), finish in one step
+MAX_RESTARTS = 3
+
+class _TooManyRestarts(Exception):
+    pass
+
+def _live_path():
+    from app import db
+    return db.DB_PATH
+
+def age(path=None):
+    """Seconds since the snapshot was taken, None if there is none."""
+    path = path or config.SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return None
+    return max(0.0, time.time() - os.path.getmtime(path))
+
+def refresh(path=None, pages=None, sleep_ms=None, verbose=True):
+    """Copies the live database to the snapshot path. Returns stats for the copy."""
+    path = path or config.SNAPSHOT_PATH
+    pages = pages or config.SNAPSHOT_PAGES_PER_STEP
+    sleep_ms = config.SNAPSHOT_STEP_SLEEP_MS if sleep_ms is None else sleep_ms
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    started = time.perf_counter()
+    stats = {"steps": 0, "restarts": 0, "pages": 0, "paced": True}
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal last_remaining
+        stats["steps"] += 1
+        stats["pages"] = total
+        # The source changed under the copy and SQLite started over
+        if last_remaining is not None and remaining > last_remaining:
+            stats["restarts"] += 1
+            if stats["restarts"] > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        # sqlite3's own `sleep` only applies when busy; pace every step here
+        if remaining and sleep_ms:
+            time.sleep(sleep_ms / 1000)
+
+    source = sqlite3.connect(_live_path(), isolation_level=None)
+    target = sqlite3.connect(tmp)
+    try:
+        # Pin one WAL read snapshot for all steps, so writes landing between
+        # steps don't make SQLite restart the copy
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            # One step copies everything under a single read lock
+            stats["paced"] = False
+            source.backup(target, pages=-1)
+        # A self-contained file: no -wal next to it, openable read-only
+        target.execute("PRAGMA journal_mode=DELETE")
+        target.commit()
+    except BaseException:
+        target.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.replace(tmp, path)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    if verbose:
+        mode = "paced" if stats["paced"] else "single step"
+        print(f"Snapshot refreshed at {path}: {stats['pages']} pages, {stats['steps']} steps ({mode}), {stats['seconds']} s")
+    return stats
+
+def connect(path=None):
+    """Read-only connection to the snapshot."""
+    path = os.path.abspath(path or config.SNAPSHOT_PATH)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+def use_snapshot():
+    """True when reporting reads should go to the snapshot right now."""
+    if not config.REPORTS_FROM_SNAPSHOT:
+        return False
+    snapshot_age = age()
+    return snapshot_age is not None and snapshot_age <= config.SNAPSHOT_MAX_AGE_SECONDS
+
+@contextmanager
+def reporting_connection():
+    """
+    Connection for reporting / export reads: the snapshot when routing is on
+    and it is fresh enough, else a pooled connection to the live database.
+    """
+    if use_snapshot():
+        conn = connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+    else:
+        from app import db
+        with db.connection() as conn:
+            yield conn
+
+def open_reporting_connection():
+    """Standalone version of reporting_connection() for scripts (caller must close it)."""
+    if use_snapshot():
+        return connect()
+    from app import db
+    return db.get_conn()
+
+# --- Background refresh ---
+
+_refresher = None
+_refresher_stop = threading.Event()
+
+def _refresh_loop(interval):
+    while not _refresher_stop.is_set():
+        snapshot_age = age()
+        # Another worker process may have refreshed it already
+        if snapshot_age is None or snapshot_age >= interval:
+            try:
+                refresh(verbose=False)
+            except Exception as e:
+                print(f"Snapshot refresh failed: {e}")
+            snapshot_age = 0
+        _refresher_stop.wait(max(1.0, interval - snapshot_age))
+
+def start_refresher():
+    """Starts the refresh thread when routing is on and SNAPSHOT_REFRESH_SECONDS > 0."""
+    global _refresher
+    if not config.REPORTS_FROM_SNAPSHOT or config.SNAPSHOT_REFRESH_SECONDS <= 0 or _refresher is not None:
+        return
+    _refresher_stop.clear()
+    _refresher = threading.Thread(target=_refresh_loop, args=(config.SNAPSHOT_REFRESH_SECONDS,), name="snapshot-refresh", daemon=True)
+    _refresher.start()
+
+def stop_refresher():
+    global _refresher
+    _refresher_stop.set()
+    _refresher = None
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "refresh"
+
+    if command == "refresh":
+        refresh()
+    elif command == "watch":
+        while True:
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Snapshot refresh failed: {e}")
+            time.sleep(max(1, config.SNAPSHOT_REFRESH_SECONDS))
+    elif command == "status":
+        snapshot_age = age()
+        print(f"Snapshot: {config.SNAPSHOT_PATH}")
+        print("  not taken yet" if snapshot_age is None else f"  age {snapshot_age:.0f} s (max {config.SNAPSHOT_MAX_AGE_SECONDS} s)")
+        print(f"  reporting reads from: {'snapshot' if use_snapshot() else 'live database'}")
+    else:
+        print("Usage: python -m app.snapshot [refresh|watch|status]")
+        sys.exit(2)
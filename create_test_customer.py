@@ -29,8 +29,8 @@ def create_test_customer():
         # Insert Customer
         cursor.execute("""
             INSERT INTO Customers 
-            (full_name, cnic, email, phone, address, password_hash, customer_code, trust_score, segment)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (full_name, cnic, email, phone, address, password_hash, customer_code, trust_score, segment, cnic_bidx, phone_bidx)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             "Test Customer",
             enc_cnic,
@@ -40,7 +40,9 @@ def create_test_customer():
             password_hash,
             customer_code,
             75,
-            "Standard"
+            "Standard",
+            security_utils.blind_index(cnic),
+            security_utils.blind_index("03001234567")
         ))
         
         customer_id = cursor.lastrowid
@@ -1,28 +1,249 @@
-import pandas as pd
+import csv
+import json
 import os
-from app.db import get_conn
+import sys
+from app import cdc, columnar
+from app.db import get_conn, init_db
+from app.snapshot import open_reporting_connection
+
+# Incremental Power BI export.
+#
+# Each table gets a folder of partitions under powerbi_data/:
+#   snapshot_<seq>.<ext>        the whole table as of ChangeLog seq <seq>
+#   changes_<from>_<to>.<ext>   rows inserted / updated / deleted in that seq range
+# in CSV, or (with --format parquet|arrow, needs pyarrow) Parquet / Arrow IPC,
+# which are far smaller and faster for Power BI to load.
+# Every row carries _seq and _op ('U' upsert, 'D' delete tombstone with only
+# the id set). The current table is: sort by _seq, keep the last row per id,
+# drop the 'D' rows (see load_current). The last shipped seq per table is
+# kept in _state.json, so a run only reads what changed since the previous
+# one. Shipped ChangeLog entries are pruned, so use one export folder.
+# Rows are read from the reporting snapshot when REPORTS_FROM_SNAPSHOT is on
+# (its ChangeLog is consistent with its rows); pruning goes to the live database.
+#
+# Once a table has more than COMPACT_AFTER partitions, they are merged back
+# into a single snapshot.
+#
+#   python export_powerbi.py            # incremental
+#   python export_powerbi.py --compact  # and compact every table
+#   python export_powerbi.py --full     # start over with fresh snapshots
+#   python export_powerbi.py --format parquet
 
 EXPORT_DIR = "powerbi_data"
+STATE_FILE = "_state.json"
+EXTENSIONS = {"csv": ".csv", **columnar.FORMATS}
+COMPACT_AFTER = 24
+BATCH_SIZE = 1000
+
+def _load_state(export_dir):
+    path = os.path.join(export_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_state(export_dir, state):
+    path = os.path.join(export_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def _partitions(table_dir):
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(table_dir)
+        if name.endswith(tuple(EXTENSIONS.values())) and name.startswith(("snapshot_", "changes_"))
+    )
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _write_partition(path, header, rows, schema=None, fmt="csv"):
+    """Writes rows to path atomically. Returns the row count."""
+    if fmt != "csv":
+        return columnar.write_batches(path, schema, _chunks(rows, BATCH_SIZE), fmt)
+    count = 0
+    with open(path + ".tmp", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    os.replace(path + ".tmp", path)
+    return count
+
+def _fetch_all(cursor):
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+# --- Export ---
+
+def _partition_schema(conn, table, fmt):
+    if fmt == "csv":
+        return None
+    pa = columnar.require_pyarrow()
+    return pa.schema([pa.field("_seq", pa.int64()), pa.field("_op", pa.string()), *columnar.table_schema(conn, table)])
+
+def _snapshot(conn, table, table_dir, upto, fmt):
+    cursor = conn.execute(f"SELECT * FROM {table}")
+    columns = [d[0] for d in cursor.description]
+    rows = ((upto, "U", *row) for row in _fetch_all(cursor))
+    path = os.path.join(table_dir, f"snapshot_{upto:012d}{EXTENSIONS[fmt]}")
+    count = _write_partition(path, ["_seq", "_op", *columns], rows, _partition_schema(conn, table, fmt), fmt)
+    # Anything older is superseded by this snapshot
+    for name in _partitions(table_dir):
+        if os.path.join(table_dir, name) != path:
+            os.remove(os.path.join(table_dir, name))
+    return count
+
+def _changes(conn, table, table_dir, after, upto, fmt):
+    cursor = cdc.changed_rows(conn, table, after, upto)
+    columns = [d[0] for d in cursor.description][3:]  # after _seq, _op, _row_id
+    id_index = columns.index("id")
+
+    def rows():
+        for row in _fetch_all(cursor):
+            seq, op, row_id, values = row[0], row[1], row[2], list(row[3:])
+            if op == "D":
+                values[id_index] = row_id
+            yield (seq, op, *values)
+
+    path = os.path.join(table_dir, f"changes_{after + 1:012d}_{upto:012d}{EXTENSIONS[fmt]}")
+    return _write_partition(path, ["_seq", "_op", *columns], rows(), _partition_schema(conn, table, fmt), fmt)
+
+def export_table(conn, table, export_dir, shipped=None, fmt="csv"):
+    """
+    Ships one table's changes since `shipped` (None = full snapshot) as a new
+    partition. Returns (new high-water mark, rows written). The mark never
+    goes below `shipped`: a reporting snapshot older than the previous run
+    has nothing new to ship.
+    """
+    table_dir = os.path.join(export_dir, table)
+    os.makedirs(table_dir, exist_ok=True)
+
+    # One read transaction: the rows we read are exactly the state as of `upto`
+    conn.execute("BEGIN")
+    try:
+        upto = cdc.current_seq(conn)
+        if shipped is None:
+            return upto, _snapshot(conn, table, table_dir, upto, fmt)
+        if upto <= shipped or not cdc.has_changes(conn, table, shipped, upto):
+            return max(shipped, upto), 0
+        return upto, _changes(conn, table, table_dir, shipped, upto, fmt)
+    finally:
+        conn.rollback()
+
+# --- Compaction ---
+
+def _read_partitions(table_dir):
+    for name in _partitions(table_dir):
+        with open(os.path.join(table_dir, name), newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+def compact_table(table, export_dir, shipped, fmt="csv"):
+    """Merges a table's partitions into one snapshot as of `shipped`. Returns the row count."""
+    table_dir = os.path.join(export_dir, table)
+    path = os.path.join(table_dir, f"snapshot_{shipped:012d}{EXTENSIONS[fmt]}")
+    old = [os.path.join(table_dir, name) for name in _partitions(table_dir)]
+
+    if fmt != "csv":
+        current = columnar.latest_rows([columnar.read_table(name) for name in old])
+        count = columnar.write_table(path, current, fmt)
+        for name in old:
+            if name != path:
+                os.remove(name)
+        return count
+
+    latest = {}
+    columns = []
+    for row in sorted(_read_partitions(table_dir), key=lambda r: int(r["_seq"])):
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+        latest[row["id"]] = row
+
+    rows = ([row.get(c, "") for c in columns] for row in latest.values() if row["_op"] != "D")
+    count = _write_partition(path, columns, rows)
+    for name in old:
+        if name != path:
+            os.remove(name)
+    return count
+
+def export_tables(export_dir=EXPORT_DIR, fmt="csv", full=False, compact=False):
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt != "csv":
+        columnar.require_pyarrow()
+    os.makedirs(export_dir, exist_ok=True)
+    init_db()
+    state = _load_state(export_dir)
+    # Switching formats starts over, partitions of one table never mix formats
+    if full or state.get("_format", "csv") != fmt:
+        state = {}
+    state["_format"] = fmt
+    conn = open_reporting_connection()
+    live = get_conn()
+
+    print(f"Exporting data to '{export_dir}/' as {fmt}...")
+
+    try:
+        for table in cdc.TABLES:
+            shipped = state.get(table)
+            try:
+                upto, count = export_table(conn, table, export_dir, shipped, fmt)
+            except Exception as e:
+                print(f"⚠ Could not export {table}: {e}")
+                continue
+
+            state[table] = upto
+            _save_state(export_dir, state)
+            with live:
+                cdc.prune(live, table, upto)
+
+            kind = "snapshot" if shipped is None else "changes"
+            print(f"✔ {table}: {count} row(s) ({kind}, up to seq {upto})")
+
+            if compact or len(_partitions(os.path.join(export_dir, table))) > COMPACT_AFTER:
+                rows = compact_table(table, export_dir, upto, fmt)
+                print(f"  compacted {table} into one snapshot ({rows} rows)")
+    finally:
+        conn.close()
+        live.close()
+
+    print("\nDone! Refresh Power BI to load the new partitions.")
+
+def export_to_csv(export_dir=EXPORT_DIR, full=False, compact=False):
+    export_tables(export_dir, "csv", full, compact)
+
+# --- Reading (e.g. from a Power BI Python script) ---
+
+def load_current(table, export_dir=EXPORT_DIR):
+    """The table's current rows as a DataFrame, rebuilt from its partitions."""
+    import pandas as pd
 
-def export_to_csv():
-    os.makedirs(EXPORT_DIR, exist_ok=True)
-    conn = get_conn()
-    
-    tables = ["Customers", "Verifications", "LoanEligibility", "Transactions", "FinancialHealth"]
-    
-    print(f"Exporting data to '{EXPORT_DIR}/'...")
-    
-    for table in tables:
-        try:
-            df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-            path = os.path.join(EXPORT_DIR, f"{table}.csv")
-            df.to_csv(path, index=False)
-            print(f"✔ Exported {table}.csv ({len(df)} rows)")
-        except Exception as e:
-            print(f"⚠ Could not export {table}: {e}")
-            
-    conn.close()
-    print("\nDone! Open Power BI and import these CSV files.")
+    table_dir = os.path.join(export_dir, table)
+    names = _partitions(table_dir)
+    if names and not names[0].endswith(".csv"):
+        current = columnar.latest_rows([columnar.read_table(os.path.join(table_dir, name)) for name in names])
+        return current.drop_columns(["_seq", "_op"]).to_pandas()
+    frames = [pd.read_csv(os.path.join(table_dir, name)) for name in names]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True).sort_values("_seq", kind="stable")
+    df = df.drop_duplicates("id", keep="last")
+    return df[df["_op"] != "D"].drop(columns=["_seq", "_op"]).reset_index(drop=True)
 
 if __name__ == "__main__":
-    export_to_csv()
+    fmt = sys.argv[sys.argv.index("--format") + 1] if "--format" in sys.argv else "csv"
+    export_tables(fmt=fmt, full="--full" in sys.argv, compact="--compact" in sys.argv)
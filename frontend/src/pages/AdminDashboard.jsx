@@ -44,7 +44,7 @@ const AdminDashboard = () => {
 
             // Fetch Chart Data
             const reportsRes = await axios.get('/api/admin/reports/stats?time_range=1 Week', config);
-            setChartData(reportsRes.data.daily_activity);
+            setChartData(reportsRes.data.activity);
             setRiskData([
                 { name: 'Verified', value: reportsRes.data.overall.verified, color: '#10B981' },
                 { name: 'Rejected', value: reportsRes.data.overall.rejected, color: '#EF4444' },
@@ -27,10 +27,13 @@ const FraudDetection = () => {
     const fetchFraudAlerts = async () => {
         try {
             const token = localStorage.getItem('token');
-            const res = await axios.get('/api/admin/pending', { headers: { Authorization: `Bearer ${token}` } });
+            // High risk (> 70) pending applications, filtered server-side
+            const res = await axios.get('/api/admin/all-verifications', {
+                headers: { Authorization: `Bearer ${token}` },
+                params: { status: 'Pending', fraud_flagged: true, sort: 'risk_high', limit: 50 }
+            });
 
-            // Filter for high risk (> 70)
-            const highRiskUsers = res.data.filter(user => user.risk_score > 70).map(user => ({
+            const highRiskUsers = res.data.map(user => ({
                 id: user.id,
                 type: 'High Risk Application',
                 user: user.full_name,
@@ -75,9 +75,22 @@ const LoanManagement = () => {
             
             alert(res.data.message);
             
-            // Download PDF
+            // Download PDF (rendered in the background; 202 until it is ready).
+            // The letter needs the admin token, so fetch it and open the blob.
             if (res.data.pdf_url) {
-                window.open(res.data.pdf_url, '_blank');
+                for (let attempt = 0; attempt < 30; attempt++) {
+                    const pdf = await axios.get(res.data.pdf_url, {
+                        headers: { Authorization: `Bearer ${token}` },
+                        responseType: 'blob',
+                        validateStatus: null
+                    });
+                    if (pdf.status === 200) {
+                        window.open(URL.createObjectURL(pdf.data), '_blank');
+                        break;
+                    }
+                    if (pdf.status !== 202) break;
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                }
             }
             
             setExpandedRowId(null);
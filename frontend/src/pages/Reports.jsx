@@ -27,7 +27,7 @@ const Reports = () => {
             });
 
             // Set bar chart data from API
-            setBarData(res.data.daily_activity);
+            setBarData(res.data.activity);
 
             // Set pie chart data from API
             setPieData([
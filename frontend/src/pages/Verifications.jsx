@@ -17,19 +17,23 @@ const Verifications = () => {
     const [decision, setDecision] = useState('');
     const [remarks, setRemarks] = useState('');
     const [submitting, setSubmitting] = useState(false);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchVerifications();
     }, []);
 
-    const fetchVerifications = async () => {
+    const fetchVerifications = async (cursor = null) => {
         try {
             const token = localStorage.getItem('token');
             const res = await axios.get('/api/admin/all-verifications', { 
-                headers: { Authorization: `Bearer ${token}` } 
+                headers: { Authorization: `Bearer ${token}` },
+                params: { limit: 100, ...(cursor ? { cursor } : {}) }
             });
 
-            setVerifications(res.data);
+            setVerifications(prev => cursor ? [...prev, ...res.data] : res.data);
+            setNextCursor(res.headers['x-next-cursor'] || null);
             setLoading(false);
         } catch (err) {
             console.error(err);
@@ -37,6 +41,13 @@ const Verifications = () => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        await fetchVerifications(nextCursor);
+        setLoadingMore(false);
+    };
+
     const filteredData = verifications.filter(v => {
         if (viewMode === 'active') {
             if (v.status === 'Rejected') return false;
@@ -393,6 +404,18 @@ const Verifications = () => {
                         </table>
                     </div>
                 )}
+
+                {nextCursor && (
+                    <div className="flex justify-center">
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="px-4 py-2 text-sm font-medium border border-slate-300 dark:border-slate-600 rounded-lg hover:bg-slate-50 dark:hover:bg-slate-700 dark:text-white disabled:opacity-50"
+                        >
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    </div>
+                )}
             </div>
             {/* Review Modal */}
             {showReviewModal && selectedVerification && (
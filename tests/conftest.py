@@ -0,0 +1,26 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# The app keeps its database (data/kyc.sqlite3), key file (secret.key) and
+# output folders relative to the working directory, and loads the key at
+# import time. Run the whole session in a scratch directory so tests never
+# touch a developer's data.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_workdir = tempfile.mkdtemp(prefix="kyc-tests-")
+os.chdir(_workdir)
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_db():
+    from app import db, migrations
+    db.SCHEMA_PATH = os.path.join(ROOT, db.SCHEMA_PATH)
+    migrations.migrate(verbose=False)
+    yield db.DB_PATH
+    db.close_writer()
+    db.get_pool().close_all()
+    os.chdir(ROOT)
+    shutil.rmtree(_workdir, ignore_errors=True)
@@ -0,0 +1,51 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db
+from app.api.auth import create_access_token
+from app.main import app
+
+@pytest.fixture(scope="module")
+def client():
+    # No lifespan: shutdown would close the shared DB pool and writer
+    return TestClient(app)
+
+def _auth(role, user_id=1):
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'someone', 'role': role, 'id': user_id})}"}
+
+def _add_customer():
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-1"
+    customer_id, _ = db.insert_customer("Write Test", cnic, "wt@example.com", "03001234567", "1 Write Way, Karachi", "50k-100k", "x")
+    db.create_verification_record(customer_id, 20, 80, "auto")
+    return customer_id
+
+def _one(sql, *params):
+    with db.connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+def test_verify_commits_decision_and_eligibility(client):
+    customer_id = _add_customer()
+    response = client.post(f"/api/admin/verify/{customer_id}", headers=_auth("admin"),
+                           json={"status": "Verified", "remarks": "ok", "risk_score": 0, "trust_score": 0})
+    assert response.status_code == 200
+    assert _one("SELECT status FROM Verifications WHERE customer_id = ?", customer_id)[0] == "Verified"
+    assert _one("SELECT COUNT(*) FROM LoanEligibility WHERE customer_id = ?", customer_id)[0] == 1
+    assert _one("SELECT COUNT(*) FROM RiskProfiles WHERE customer_id = ?", customer_id)[0] == 1
+
+def test_delete_removes_customer_rows(client):
+    customer_id = _add_customer()
+    assert client.delete(f"/api/admin/verifications/{customer_id}", headers=_auth("admin")).status_code == 200
+    assert _one("SELECT COUNT(*) FROM Customers WHERE id = ?", customer_id)[0] == 0
+    assert _one("SELECT COUNT(*) FROM Verifications WHERE customer_id = ?", customer_id)[0] == 0
+    assert _one("SELECT COUNT(*) FROM NameTrigrams WHERE customer_id = ?", customer_id)[0] == 0
+
+def test_reading_notifications_marks_them_read(client):
+    customer_id = _add_customer()
+    with db.connection() as conn:
+        conn.execute("INSERT INTO Notifications (customer_id, title, message) VALUES (?, 'Hi', 'there')", (customer_id,))
+    response = client.get("/api/dashboard/notifications", headers=_auth("customer", customer_id))
+    assert response.status_code == 200
+    assert [n["title"] for n in response.json()] == ["Hi"]
+    assert _one("SELECT COUNT(*) FROM Notifications WHERE customer_id = ? AND is_read = 0", customer_id)[0] == 0
@@ -0,0 +1,43 @@
+import uuid
+
+from app import db, security_utils
+
+def _new_customer(cnic, phone="0300-1234567"):
+    customer_id, _ = db.insert_customer("Blind Index Test", cnic, f"{uuid.uuid4().hex[:8]}@example.com", phone,
+                                        "7 Index Lane, Islamabad", "0-50k", "x")
+    return customer_id
+
+def _cnic():
+    return f"61101-{uuid.uuid4().int % 10**7:07d}-5"
+
+def test_normalization_ignores_dashes_and_whitespace():
+    assert security_utils.blind_index("42101-0233667-9") == security_utils.blind_index(" 4210102336679 ")
+    assert security_utils.blind_index("42101-0233667-9") != security_utils.blind_index("42101-0233667-8")
+    assert security_utils.blind_index("") is None
+
+def test_lookup_by_cnic_in_any_format():
+    cnic = _cnic()
+    customer_id = _new_customer(cnic)
+    assert db.get_customer_by_cnic(cnic, columns="id")["id"] == customer_id
+    assert db.get_customer_by_cnic(cnic.replace("-", ""), columns="id")["id"] == customer_id
+    assert db.get_customer_by_cnic(_cnic(), columns="id") is None
+
+def test_stored_row_holds_ciphertext_and_index_only():
+    cnic = _cnic()
+    customer_id = _new_customer(cnic)
+    with db.connection() as conn:
+        row = conn.execute("SELECT cnic, cnic_bidx, phone_bidx FROM Customers WHERE id = ?", (customer_id,)).fetchone()
+    assert cnic not in row["cnic"]
+    assert row["cnic_bidx"] == security_utils.blind_index(cnic)
+    assert row["phone_bidx"] == security_utils.blind_index("03001234567")
+
+def test_backfill_fills_missing_indexes():
+    cnic = _cnic()
+    customer_id = _new_customer(cnic)
+    with db.connection() as conn:
+        conn.execute("UPDATE Customers SET cnic_bidx = NULL, phone_bidx = NULL WHERE id = ?", (customer_id,))
+        db.backfill_blind_indexes(conn)
+        row = conn.execute("SELECT cnic_bidx, phone_bidx FROM Customers WHERE id = ?", (customer_id,)).fetchone()
+        conn.commit()
+    assert row["cnic_bidx"] == security_utils.blind_index(cnic)
+    assert row["phone_bidx"] == security_utils.blind_index("0300-1234567")
@@ -0,0 +1,86 @@
+import csv
+import os
+import sqlite3
+
+import pytest
+
+import export_powerbi
+from app import cdc, migrations
+
+@pytest.fixture
+def live(tmp_path):
+    path = str(tmp_path / "cdc.sqlite3")
+    migrations.migrate(db_path=path, verbose=False)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+def _add_customer(conn, name):
+    return conn.execute("INSERT INTO Customers (full_name, cnic) VALUES (?, ?)", (name, f"cnic-{name}")).lastrowid
+
+def _copy(conn, path):
+    """A point-in-time copy, like the reporting snapshot."""
+    copy = sqlite3.connect(path, isolation_level=None)
+    conn.backup(copy)
+    copy.row_factory = sqlite3.Row
+    return copy
+
+def test_stale_snapshot_does_not_move_the_mark_back(live, tmp_path):
+    export_dir = str(tmp_path / "export")
+    _add_customer(live, "a")
+    stale = _copy(live, str(tmp_path / "stale.sqlite3"))
+    _add_customer(live, "b")
+
+    shipped, _ = export_powerbi.export_table(live, "Customers", export_dir)
+    try:
+        assert export_powerbi.export_table(stale, "Customers", export_dir, shipped) == (shipped, 0)
+    finally:
+        stale.close()
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def test_changes_after_the_mark_collapse_to_the_latest_state(live, tmp_path):
+    export_dir = str(tmp_path / "export")
+    kept = _add_customer(live, "kept")
+    gone = _add_customer(live, "gone")
+    shipped, count = export_powerbi.export_table(live, "Customers", export_dir)
+    assert (shipped, count) == (cdc.current_seq(live), 2)
+
+    live.execute("UPDATE Customers SET full_name = 'renamed' WHERE id = ?", (kept,))
+    live.execute("UPDATE Customers SET full_name = 'renamed again' WHERE id = ?", (kept,))
+    live.execute("DELETE FROM Customers WHERE id = ?", (gone,))
+    new = _add_customer(live, "new")
+
+    upto, count = export_powerbi.export_table(live, "Customers", export_dir, shipped)
+    assert upto == cdc.current_seq(live) > shipped
+    assert count == 3
+
+    path = os.path.join(export_dir, "Customers", f"changes_{shipped + 1:012d}_{upto:012d}.csv")
+    rows = {int(row["id"]): row for row in _read(path)}
+    assert rows[kept]["_op"] == "U" and rows[kept]["full_name"] == "renamed again"
+    # Tombstone: only the id is set
+    assert rows[gone]["_op"] == "D" and rows[gone]["full_name"] == ""
+    assert rows[new]["_op"] == "U"
+
+def test_nothing_new_ships_nothing(live, tmp_path):
+    export_dir = str(tmp_path / "export")
+    _add_customer(live, "only")
+    shipped, _ = export_powerbi.export_table(live, "Customers", export_dir)
+    # A change to another table advances the sequence but not this table
+    live.execute("INSERT INTO Transactions (customer_id, amount, type) VALUES (1, 10, 'Credit')")
+    upto, count = export_powerbi.export_table(live, "Customers", export_dir, shipped)
+    assert count == 0 and upto == cdc.current_seq(live) > shipped
+    assert len(export_powerbi._partitions(os.path.join(export_dir, "Customers"))) == 1
+
+def test_prune_drops_shipped_entries_only(live):
+    _add_customer(live, "first")
+    mark = cdc.current_seq(live)
+    _add_customer(live, "second")
+    assert cdc.prune(live, "Customers", mark) >= 1
+    assert not cdc.has_changes(live, "Customers", 0, mark)
+    assert cdc.has_changes(live, "Customers", mark, cdc.current_seq(live))
+    # Pruning never rewinds the sequence
+    assert cdc.current_seq(live) > mark
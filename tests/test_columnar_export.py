@@ -0,0 +1,34 @@
+import uuid
+
+import pytest
+
+from app import db, report_jobs, reports, security_utils
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+@pytest.fixture(scope="module")
+def cnic():
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-3"
+    db.insert_customer("Columnar Test", cnic, f"{uuid.uuid4().hex[:8]}@example.com", "03001234567",
+                       "1 Arrow Street, Lahore", "50k-100k", "x")
+    return cnic
+
+def _cnics(path):
+    table = pq.read_table(path)
+    return dict(zip(table.column("full_name").to_pylist(), table.column("cnic").to_pylist()))
+
+def test_parquet_cnic_is_masked_by_default(cnic):
+    path = reports.export_verification_data("parquet", f"masked-{uuid.uuid4().hex}.parquet")
+    masked = _cnics(path)["Columnar Test"]
+    assert masked == security_utils.mask_identifier(cnic) and masked.endswith(cnic[-5:])
+
+def test_parquet_mask_full_redacts_and_none_decrypts(cnic):
+    path = reports.export_verification_data("parquet", f"full-{uuid.uuid4().hex}.parquet", mask="full")
+    assert _cnics(path)["Columnar Test"] == "[REDACTED]"
+    path = reports.export_verification_data("parquet", f"plain-{uuid.uuid4().hex}.parquet", mask="none")
+    assert _cnics(path)["Columnar Test"] == cnic
+
+def test_columnar_job_params_validate_the_mask():
+    assert report_jobs._columnar_params({}) == {"mask": "partial"}
+    with pytest.raises(ValueError, match="mask must be one of"):
+        report_jobs._columnar_params({"mask": "some"})
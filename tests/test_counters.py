@@ -0,0 +1,70 @@
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from app import counters, migrations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / "counters.sqlite3")
+    migrations.migrate(db_path=path, verbose=False)
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+def _random_writes(conn, rng, steps):
+    statuses = ["Pending", "Verified", "Rejected", None]
+    loan_statuses = ["Pending", "Auto-Approved", "Approved", "Rejected"]
+    for _ in range(steps):
+        ids = [row[0] for row in conn.execute("SELECT id FROM Customers")]
+        action = rng.random()
+        if action < 0.3 or not ids:
+            cursor = conn.execute("INSERT INTO Customers (full_name, cnic) VALUES ('Counter Test', ?)", (f"c{rng.random()}",))
+            customer_id = cursor.lastrowid
+            conn.execute("INSERT INTO Verifications (customer_id, status, risk_score) VALUES (?, ?, ?)",
+                         (customer_id, rng.choice(statuses), rng.randint(0, 100)))
+            conn.execute("INSERT INTO LoanEligibility (customer_id, eligibility_status) VALUES (?, ?)",
+                         (customer_id, rng.choice(loan_statuses)))
+            conn.execute("INSERT INTO Notifications (customer_id, title, is_read) VALUES (?, 'n', ?)",
+                         (customer_id, rng.randint(0, 1)))
+        elif action < 0.5:
+            conn.execute("UPDATE Verifications SET status = ? WHERE customer_id = ?", (rng.choice(statuses), rng.choice(ids)))
+        elif action < 0.65:
+            conn.execute("UPDATE Verifications SET risk_score = ? WHERE customer_id = ?", (rng.randint(0, 100), rng.choice(ids)))
+        elif action < 0.75:
+            conn.execute("UPDATE LoanEligibility SET eligibility_status = ? WHERE customer_id = ?",
+                         (rng.choice(loan_statuses), rng.choice(ids)))
+        elif action < 0.85:
+            conn.execute("UPDATE Notifications SET is_read = 1 - is_read WHERE customer_id = ?", (rng.choice(ids),))
+        else:
+            customer_id = rng.choice(ids)
+            for table in ("Notifications", "LoanEligibility", "Verifications"):
+                conn.execute(f"DELETE FROM {table} WHERE customer_id = ?", (customer_id,))
+            conn.execute("DELETE FROM Customers WHERE id = ?", (customer_id,))
+
+def test_triggers_match_a_recount_after_random_writes(conn):
+    rng = random.Random(16)
+    for _ in range(20):
+        _random_writes(conn, rng, 25)
+        assert counters.drift(conn) == []
+    assert counters.get(conn, "customers.total")["customers.total"] == conn.execute("SELECT COUNT(*) FROM Customers").fetchone()[0]
+
+def test_drift_is_reported_and_repaired(conn):
+    conn.execute("INSERT INTO Customers (full_name, cnic) VALUES ('Counter Test', 'drift')")
+    conn.execute("UPDATE Counters SET value = value + 5 WHERE name = 'customers.total'")
+    assert counters.drift(conn) == [("customers.total", 6, 1)]
+    counters.repair(conn)
+    assert counters.drift(conn) == []
+
+def test_check_command_passes_on_the_app_database():
+    # The session database (in the working directory) has had every other test's writes
+    result = subprocess.run([sys.executable, "-m", "app.counters", "check"], capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=ROOT), timeout=60)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "All counters match" in result.stdout
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import db_executor
+from app.executors import ExecutorSaturated
+
+def test_db_executor_rejects_past_its_queue():
+    executor = db_executor.DBExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        blocked = [executor.submit(release.wait, 5), executor.submit(release.wait, 5)]
+        with pytest.raises(ExecutorSaturated):
+            executor.submit(lambda: None)
+        release.set()
+        assert all(future.result(timeout=5) for future in blocked)
+        assert executor.metrics()["rejected"] == 1
+    finally:
+        release.set()
+        executor.shutdown()
+
+def test_offload_runs_the_function_on_the_executor_threads():
+    executor = db_executor.DBExecutor(workers=2, max_queue=0)
+
+    @db_executor.offload(lambda: executor)
+    def where(value):
+        return threading.current_thread().name, value
+
+    try:
+        name, value = asyncio.run(where(value=7))
+        assert name.startswith("db") and value == 7
+        assert where.__name__ == "where"
+    finally:
+        executor.shutdown()
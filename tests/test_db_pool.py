@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from app.db_pool import ConnectionPool, PoolTimeout
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(os.path.join(tmp_path, "pool.sqlite3"), size=2, timeout=0.2,
+                          busy_timeout_ms=1234, cache_size_kib=2048)
+    yield pool
+    pool.close_all()
+
+def test_connections_get_wal_and_the_configured_pragmas(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.row_factory is sqlite3.Row
+
+def test_connections_are_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.metrics()["created"] == 1
+
+def test_exhausted_pool_times_out(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.metrics()["timeouts"] == 1
+    for conn in held:
+        pool.release(conn)
+
+def test_waiter_gets_a_released_connection(pool):
+    held = [pool.acquire(), pool.acquire()]
+    threading.Timer(0.05, pool.release, (held[0],)).start()
+    assert pool.acquire(timeout=2) is held[0]
+    for conn in held:
+        pool.release(conn)
+
+def test_block_commits_on_success_and_rolls_back_on_error(pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("boom")
+    with pool.connection() as conn:
+        assert [row[0] for row in conn.execute("SELECT x FROM t")] == [1]
+
+def test_closed_pool_refuses_checkouts(pool):
+    pool.close_all()
+    with pytest.raises(sqlite3.ProgrammingError):
+        pool.acquire()
@@ -0,0 +1,54 @@
+import difflib
+import random
+import string
+import uuid
+
+from app import db
+from app.services import duplicate_index
+
+def _unique_name():
+    # Letters only: digits would normalize differently from the typo'd copy
+    return "Qadir " + "".join(random.Random(uuid.uuid4().int).choices(string.ascii_lowercase, k=10))
+
+def _insert(name):
+    customer_id, _ = db.insert_customer(name, f"35202-{uuid.uuid4().int % 10**7:07d}-1",
+                                        f"{uuid.uuid4().hex[:8]}@example.com", "03111234567",
+                                        "9 Candidate Road, Multan", "0-50k", "x")
+    return customer_id
+
+def _typo(name, rng):
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+def test_overlap_threshold_keeps_every_difflib_match():
+    """Any pair the engine's 0.90 name ratio flags shares enough trigrams to be a candidate."""
+    rng = random.Random(7)
+    checked = 0
+    for _ in range(3000):
+        name = " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(2, 3)))
+        other = _typo(_typo(name, rng), rng) if rng.random() < 0.5 else _typo(name, rng)
+        if difflib.SequenceMatcher(None, name, other).ratio() <= 0.90:
+            continue
+        grams, other_grams = duplicate_index.name_qgrams(name), duplicate_index.name_qgrams(other)
+        assert len(grams & other_grams) >= max(1, int(len(grams) * duplicate_index.MIN_QGRAM_OVERLAP))
+        checked += 1
+    assert checked > 500
+
+def test_one_edit_name_is_a_candidate_and_unrelated_is_not():
+    name = _unique_name()
+    customer_id = _insert(name)
+    with db.connection() as conn:
+        typo = name[:-1] + ("a" if name[-1] != "a" else "b")
+        assert customer_id in duplicate_index.find_candidate_ids(conn, {"full_name": typo})
+        assert customer_id not in duplicate_index.find_candidate_ids(conn, {"full_name": _unique_name()})
+        assert customer_id not in duplicate_index.find_candidate_ids(conn, {"full_name": name}, exclude_id=customer_id)
+
+def test_exact_key_matches_are_candidates():
+    name = _unique_name()
+    customer_id = _insert(name)
+    with db.connection() as conn:
+        row = db.get_customer_by_id(customer_id)
+        assert customer_id in duplicate_index.find_candidate_ids(conn, {"cnic": row["cnic"], "full_name": "Someone Else"})
+        assert customer_id in duplicate_index.find_candidate_ids(conn, {"email": row["email"].upper()})
+        candidates = duplicate_index.find_candidates(conn, {"cnic": row["cnic"]})
+    assert [c["cnic"] for c in candidates if c["id"] == customer_id] == [row["cnic"]]
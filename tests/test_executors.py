@@ -0,0 +1,21 @@
+import time
+
+import pytest
+
+from app.executors import BoundedProcessPool, ExecutorSaturated
+
+def test_bounded_process_pool_rejects_past_its_slots():
+    pool = BoundedProcessPool("test", max_workers=1, max_pending=1)
+    try:
+        running = [pool.submit(time.sleep, 0.5), pool.submit(time.sleep, 0.5)]
+        with pytest.raises(ExecutorSaturated):
+            pool.submit(time.sleep, 0)
+        assert pool.metrics()["rejected"] == 1
+
+        for future in running:
+            future.result(timeout=30)
+        # Slots are released as tasks finish
+        assert pool.run(abs, -3) == 3
+        assert pool.metrics()["in_flight"] == 0
+    finally:
+        pool.shutdown()
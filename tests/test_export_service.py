@@ -0,0 +1,26 @@
+import csv
+import io
+import uuid
+
+from app import db
+from app.services import export_service
+
+def _add_customer(status):
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-1"
+    email = f"{uuid.uuid4().hex[:8]}@example.com"
+    customer_id, _ = db.insert_customer("Export Test", cnic, email, "03001234567", "12 Test Street, Karachi", "Mid", "x")
+    with db.connection() as conn:
+        conn.execute("INSERT INTO Verifications (customer_id, status) VALUES (?, ?)", (customer_id, status))
+    return customer_id, cnic, email
+
+def test_customer_csv_has_plaintext_fields():
+    customer_id, cnic, email = _add_customer("Verified")
+
+    body = b"".join(export_service.stream_customers_csv("Verified")).decode("utf-8")
+    rows = {row["ID"]: row for row in csv.DictReader(io.StringIO(body))}
+    row = rows[str(customer_id)]
+
+    assert row["CNIC"] == cnic
+    assert row["Email"] == email
+    assert row["Phone"] == "03001234567"
+    assert row["Address"] == "12 Test Street, Karachi"
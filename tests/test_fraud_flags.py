@@ -0,0 +1,28 @@
+import uuid
+
+from app import ai_utils, db
+
+def _add_pending(email, phone, engine_risk):
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-1"
+    customer_id, _ = db.insert_customer("Fraud Test", cnic, email, phone, "1 Test Road", "Mid", "x")
+    risk, fraud_score, alerts, _ = ai_utils.assess_fraud({"email": email, "phone": phone, "income_range": "Mid"}, engine_risk)
+    db.create_verification_record(customer_id, risk, 80, "auto", fraud_score=fraud_score, fraud_alerts=alerts)
+    return customer_id
+
+def _flagged_ids(flag):
+    rows = db.get_verifications_page(statuses=["Pending"], fraud_flagged=flag, limit=1000)
+    return {row["id"] for row in rows}
+
+def test_rule_hits_are_flagged_without_high_engine_risk():
+    disposable = _add_pending(f"{uuid.uuid4().hex[:8]}@mailinator.com", "03001234567", 10)
+    clean = _add_pending(f"{uuid.uuid4().hex[:8]}@example.com", "03001234567", 10)
+
+    assert disposable in _flagged_ids(True)
+    assert clean in _flagged_ids(False)
+
+def test_decision_reflags_on_reviewed_score():
+    customer_id = _add_pending(f"{uuid.uuid4().hex[:8]}@mailinator.com", "03001234567", 10)
+
+    db.update_verification_status(customer_id, "Verified", 20, 80, "ok", "Admin")
+    rows = db.get_verifications_page(statuses=["Verified"], fraud_flagged=False, limit=1000)
+    assert customer_id in {row["id"] for row in rows}
@@ -0,0 +1,44 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import db
+from app.api.auth import create_access_token
+from app.main import app
+
+def _add_loan():
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-1"
+    customer_id, _ = db.insert_customer("Decision Test", cnic, "dt@example.com", "03001234567", "1 Loan Road", "Mid", "x")
+    with db.connection() as conn:
+        conn.execute("INSERT INTO Verifications (customer_id, status) VALUES (?, 'Pending')", (customer_id,))
+        loan_id = conn.execute(
+            "INSERT INTO LoanEligibility (customer_id, eligibility_status, max_limit) VALUES (?, 'Review', 5000)", (customer_id,)
+        ).lastrowid
+    return customer_id, loan_id
+
+def _notifications(customer_id):
+    with db.connection() as conn:
+        return [tuple(row) for row in conn.execute("SELECT title, message FROM Notifications WHERE customer_id = ?", (customer_id,))]
+
+def test_single_and_bulk_decisions_notify_the_same_way():
+    single_customer, single_loan = _add_loan()
+    bulk_customer, bulk_loan = _add_loan()
+
+    assert db.record_loan_decision(single_loan, "Rejected", "low income")['id'] == single_loan
+    db.record_loan_decisions([(bulk_loan, "Rejected", "low income")])
+
+    assert _notifications(single_customer) == _notifications(bulk_customer)
+    assert _notifications(single_customer) == [("Loan Rejected", "Your loan application was not approved: low income")]
+
+def test_single_decision_on_missing_loan():
+    assert db.record_loan_decision(10**9, "Approved", "ok") is None
+
+def test_rejection_without_reason_is_refused():
+    customer_id, loan_id = _add_loan()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'someone', 'role': 'admin', 'id': 1})}"}
+    response = TestClient(app).post("/api/admin/loan-decision", json={"loan_id": loan_id, "decision": "Rejected"}, headers=headers)
+
+    assert response.status_code == 400
+    assert _notifications(customer_id) == []
+    with db.connection() as conn:
+        assert conn.execute("SELECT eligibility_status FROM LoanEligibility WHERE id = ?", (loan_id,)).fetchone()[0] == "Review"
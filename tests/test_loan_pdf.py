@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db
+from app.api.auth import create_access_token
+from app.main import app
+from app.services import pdf_service
+
+@pytest.fixture(scope="module")
+def client():
+    # No lifespan: shutdown would close the shared DB pool and writer
+    return TestClient(app)
+
+@pytest.fixture(scope="module")
+def customer():
+    customer_id, _ = db.insert_customer("Letter Test", "42101-7654321-1", "lt@example.com", "03001112223", "1 Letter Lane", "Mid", "x")
+    return db.get_customer_by_id(customer_id)
+
+@pytest.fixture(scope="module")
+def letter_url(customer):
+    pdf_service.loan_decision_pdf(customer, "Approved", "ok", 5000)
+    key = pdf_service.cache_key(pdf_service.letter_customer(customer), "Approved", "ok", 5000)
+    return f"/api/admin/loan-pdf/{key}"
+
+def _auth(role):
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'someone', 'role': role, 'id': 1})}"}
+
+def test_loan_pdf_requires_a_token(client, letter_url):
+    assert client.get(letter_url).status_code == 401
+
+def test_loan_pdf_rejects_customers(client, letter_url):
+    assert client.get(letter_url, headers=_auth("customer")).status_code == 403
+
+def test_loan_pdf_served_to_admins(client, letter_url):
+    response = client.get(letter_url, headers=_auth("admin"))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+
+def test_letter_key_ignores_how_the_customer_was_loaded(customer):
+    # The admin and the customer each load the row; the cached letter is shared
+    again = db.get_customer_by_id(customer["id"])
+    assert pdf_service.loan_decision_pdf(customer, "Approved", "ok", 5000) == \
+        pdf_service.loan_decision_pdf(again, "Approved", "ok", 5000)
+
+def test_admin_and_customer_keys_match(customer):
+    # Admin decision: default approval reason. Customer download: rejection_reason or 'N/A'.
+    fields = pdf_service.letter_customer(customer)
+    assert pdf_service.cache_key(fields, "Approved", "Approved by Admin", 5000) == \
+        pdf_service.cache_key(pdf_service.letter_customer(db.get_customer_by_id(customer["id"])), "Approved", "N/A", 5000)
+    assert pdf_service.cache_key(fields, "Rejected", "low income", 5000) == pdf_service.cache_key(fields, "Rejected", "low income", 0)
+    assert pdf_service.cache_key(fields, "Rejected", "low income") != pdf_service.cache_key(fields, "Rejected", "N/A")
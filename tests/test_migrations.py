@@ -0,0 +1,93 @@
+import sqlite3
+
+from app import migrations, security_utils
+
+# app/schema.sql as it was before versioned migrations (the tables the
+# migrations touch), with a customer registered the old way
+LEGACY_SCHEMA = """
+CREATE TABLE Customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    full_name TEXT NOT NULL,
+    cnic TEXT UNIQUE NOT NULL,
+    email TEXT,
+    phone TEXT,
+    address TEXT,
+    income_range TEXT,
+    password_hash TEXT,
+    trust_score INTEGER DEFAULT 50,
+    segment TEXT DEFAULT 'Standard',
+    customer_code TEXT UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Verifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    status TEXT DEFAULT 'Pending',
+    risk_score INTEGER DEFAULT 0,
+    trust_score INTEGER DEFAULT 0,
+    remarks TEXT,
+    verified_by TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    date TIMESTAMP
+);
+CREATE TABLE Admins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    full_name TEXT,
+    email TEXT,
+    role TEXT DEFAULT 'Admin',
+    totp_secret TEXT,
+    settings TEXT DEFAULT '{}'
+);
+"""
+
+CNIC = "42101-7654321-0"
+
+def _legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO Customers (full_name, cnic, email, phone, address, income_range, customer_code) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ("Legacy Customer", security_utils.encrypt_data(CNIC), "legacy@example.com",
+         security_utils.encrypt_data("03001112223"), security_utils.encrypt_data("1 Old Town Road, Karachi"), "0-50k", "LEG001")
+    )
+    conn.execute("INSERT INTO Verifications (customer_id, status, risk_score) VALUES (1, 'Pending', 10)")
+    conn.commit()
+    conn.close()
+
+def test_all_migrations_apply_to_a_legacy_database(tmp_path):
+    path = str(tmp_path / "legacy.sqlite3")
+    _legacy_db(path)
+
+    expected = [m.version for m in migrations.discover()]
+    assert expected[:10] == list(range(1, 11))
+    assert migrations.migrate(db_path=path, verbose=False) == len(expected)
+    assert [(v, done) for v, _, done in migrations.status(path)] == [(v, True) for v in expected]
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        customer = conn.execute("SELECT * FROM Customers WHERE id = 1").fetchone()
+        assert customer["cnic_bidx"] == security_utils.blind_index(CNIC)
+        assert customer["phone_bidx"] == security_utils.blind_index("03001112223")
+        assert customer["email_bidx"] is not None
+        assert conn.execute("SELECT COUNT(*) FROM NameTrigrams WHERE customer_id = 1").fetchone()[0] > 0
+
+        verification = conn.execute("SELECT * FROM Verifications WHERE customer_id = 1").fetchone()
+        assert verification["fraud_score"] is not None and verification["fraud_flagged"] in (0, 1)
+
+        counts = dict(conn.execute("SELECT name, value FROM Counters").fetchall())
+        assert counts["customers.total"] == 1
+        assert counts["verifications.status.Pending"] == 1
+
+        assert conn.execute("SELECT 1 FROM Admins WHERE username = 'Asharib'").fetchone()
+        for table in ("ChangeLog", "ReportJobs", "RiskProfiles"):
+            assert conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone(), table
+    finally:
+        conn.close()
+
+def test_migrate_is_a_no_op_once_current(tmp_path):
+    path = str(tmp_path / "fresh.sqlite3")
+    assert migrations.migrate(db_path=path, verbose=False) > 0
+    assert migrations.migrate(db_path=path, verbose=False) == 0
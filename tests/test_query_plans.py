@@ -0,0 +1,17 @@
+import pytest
+
+from app import db, query_plans
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = db.get_conn()
+    yield conn
+    conn.close()
+
+@pytest.mark.parametrize("sql, params, allowed", [
+    pytest.param(sql, params, allowed[0] if allowed else (), id=name)
+    for name, sql, params, *allowed in query_plans.HOT_QUERIES
+])
+def test_hot_query_uses_an_index(conn, sql, params, allowed):
+    steps = [step for step in query_plans.bad_steps(conn, sql, params) if step not in allowed]
+    assert not steps
@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db
+from app.main import app
+
+@pytest.fixture(scope="module")
+def client():
+    # No lifespan: shutdown would close the shared DB pool and writer
+    return TestClient(app)
+
+def _form(cnic):
+    return dict(full_name="Reg Test", cnic=cnic, email=f"{uuid.uuid4().hex[:8]}@example.com", phone="03001234567",
+                address="12 Registration Road, Karachi", income_range="50k-100k", password="pw123456")
+
+def test_registration_writes_customer_and_records_together(client):
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-1"
+    response = client.post("/api/kyc/register", data=_form(cnic))
+    assert response.status_code == 200
+    customer_id = response.json()["customer_id"]
+
+    with db.connection() as conn:
+        for table in ("Verifications", "LoanEligibility", "FinancialHealth", "RiskProfiles", "NameTrigrams"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table} WHERE customer_id = ?", (customer_id,)).fetchone()[0] >= 1, table
+    assert db.get_customer_by_cnic(cnic, columns="id")["id"] == customer_id
+
+def test_duplicate_cnic_is_rejected(client):
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-1"
+    assert client.post("/api/kyc/register", data=_form(cnic)).status_code == 200
+    response = client.post("/api/kyc/register", data=_form(cnic))
+    assert response.status_code == 400
+    assert "already exists" in response.json()["detail"]
+
+def test_failed_post_registration_step_rolls_back_the_whole_group(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("financials unavailable")
+    monkeypatch.setattr(db, "generate_mock_financials", fail)
+
+    cnic = f"42101-{uuid.uuid4().int % 10**7:07d}-1"
+    response = client.post("/api/kyc/register", data=_form(cnic))
+    assert response.status_code == 200
+    customer_id = response.json()["customer_id"]
+
+    # The customer commits; the records written before the failure do not
+    assert db.get_customer_by_cnic(cnic, columns="id")["id"] == customer_id
+    with db.connection() as conn:
+        for table in ("Verifications", "LoanEligibility", "FinancialHealth", "RiskProfiles"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table} WHERE customer_id = ?", (customer_id,)).fetchone()[0] == 0, table
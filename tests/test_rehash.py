@@ -0,0 +1,48 @@
+import uuid
+
+import pytest
+from argon2 import PasswordHasher
+from fastapi.testclient import TestClient
+
+from app import auth, db
+from app.main import app
+
+# Cheaper than any calibrated parameters, so the stored hash is always outdated
+OLD_HASHER = PasswordHasher(time_cost=1, memory_cost=1024, parallelism=1)
+
+@pytest.fixture(scope="module")
+def client():
+    # No lifespan: shutdown would close the shared DB pool and writer
+    return TestClient(app)
+
+def _admin(password):
+    username = f"rehash-{uuid.uuid4().hex[:8]}"
+    db.insert_admin(username, OLD_HASHER.hash(password), "Rehash Test")
+    return username
+
+def _stored_hash(username):
+    return db.get_admin_by_username(username)["password_hash"]
+
+def test_login_upgrades_an_outdated_hash(client):
+    username = _admin("s3cret-pass")
+    assert auth.needs_rehash(_stored_hash(username))
+
+    response = client.post("/api/auth/token", data={"username": username, "password": "s3cret-pass"})
+    assert response.status_code == 200
+
+    # TestClient runs background tasks before returning
+    new_hash = _stored_hash(username)
+    assert not auth.needs_rehash(new_hash)
+    assert auth.check_password(new_hash, "s3cret-pass")
+
+def test_failed_login_leaves_the_hash_alone(client):
+    username = _admin("s3cret-pass")
+    old_hash = _stored_hash(username)
+    client.post("/api/auth/token", data={"username": username, "password": "wrong"})
+    assert _stored_hash(username) == old_hash
+
+def test_replace_only_swaps_the_verified_hash():
+    username = _admin("s3cret-pass")
+    admin = db.get_admin_by_username(username)
+    db.replace_password_hash("Admins", admin["id"], "some-other-hash", auth.hash_password("x"))
+    assert _stored_hash(username) == admin["password_hash"]
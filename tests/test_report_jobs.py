@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+from app import report_jobs
+
+@pytest.fixture
+def slow_kind(monkeypatch):
+    """A report kind that runs until the test releases it."""
+    release = threading.Event()
+
+    def run(params, path, progress):
+        release.wait(5)
+        with open(path, "w") as f:
+            f.write("done")
+
+    monkeypatch.setitem(report_jobs.KINDS, "slow_test", (lambda raw: dict(raw), lambda p: ".txt", lambda conn, p: 1, run))
+    yield release
+    release.set()
+
+def test_shutdown_fails_jobs_still_running_after_the_grace(slow_kind):
+    job, _ = report_jobs.submit("slow_test", {"n": 1})
+    report_jobs.shutdown_pool(timeout=0.2)
+
+    job = report_jobs.get(job["id"])
+    assert job["status"] == "failed"
+    assert "shut down" in job["error"]
+
+def test_shutdown_waits_for_jobs_that_finish_in_time(slow_kind):
+    job, _ = report_jobs.submit("slow_test", {"n": 2})
+    threading.Timer(0.1, slow_kind.set).start()
+    report_jobs.shutdown_pool(timeout=5)
+
+    assert report_jobs.get(job["id"])["status"] == "done"
@@ -0,0 +1,59 @@
+import uuid
+
+import pytest
+
+from app import db
+from app.services import risk_cache, risk_engine
+
+@pytest.fixture
+def customer():
+    cnic = f"37405-{uuid.uuid4().int % 10**7:07d}-2"
+    customer_id, _ = db.insert_customer("Cache Test " + uuid.uuid4().hex[:6], cnic, f"{uuid.uuid4().hex[:8]}@example.com",
+                                        "03211234567", "3 Profile Street, Quetta", "50k-100k", "x")
+    return customer_id, db.get_customer_by_id(customer_id)
+
+def _ensure(customer_id, customer):
+    with db.connection() as conn:
+        return risk_cache.ensure_profile(conn, customer_id, customer)
+
+def test_stored_profile_is_reused_while_inputs_are_unchanged(customer):
+    customer_id, data = customer
+    profile, recomputed = _ensure(customer_id, data)
+    assert recomputed
+    assert _ensure(customer_id, data) == (profile, False)
+
+def test_engine_version_bump_recomputes(customer, monkeypatch):
+    customer_id, data = customer
+    _ensure(customer_id, data)
+    monkeypatch.setattr(risk_engine, "ENGINE_VERSION", risk_engine.ENGINE_VERSION + "-test")
+    assert _ensure(customer_id, data)[1]
+    with db.connection() as conn:
+        row = conn.execute("SELECT engine_version FROM RiskProfiles WHERE customer_id = ?", (customer_id,)).fetchone()
+    assert row[0] == risk_engine.ENGINE_VERSION
+    assert not _ensure(customer_id, data)[1]
+
+def test_changed_input_recomputes(customer):
+    customer_id, data = customer
+    _ensure(customer_id, data)
+    profile, recomputed = _ensure(customer_id, dict(data, email="someone@tempmail.com"))
+    assert recomputed
+    assert "Disposable email domain detected" in profile["reasons"]
+
+def test_refresh_rescores_only_stale_profiles(customer, monkeypatch):
+    customer_id, data = customer
+    _ensure(customer_id, data)
+    with db.connection() as conn:
+        risk_cache.refresh(conn)
+        assert risk_cache.refresh(conn) == 0
+        monkeypatch.setattr(risk_engine, "ENGINE_VERSION", risk_engine.ENGINE_VERSION + "-test")
+        assert risk_cache.refresh(conn) >= 1
+        row = conn.execute("SELECT engine_version FROM RiskProfiles WHERE customer_id = ?", (customer_id,)).fetchone()
+    assert row[0] == risk_engine.ENGINE_VERSION
+
+def test_check_profile_does_not_write(customer):
+    customer_id, data = customer
+    with db.connection() as conn:
+        conn.execute("DELETE FROM RiskProfiles WHERE customer_id = ?", (customer_id,))
+        profile, pending = risk_cache.check_profile(conn, customer_id, data)
+        assert pending[0] == customer_id and pending[1] == profile
+        assert risk_cache.get_profile(conn, customer_id) is None
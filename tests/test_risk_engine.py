@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from app.services import risk_cache, risk_engine
+
+pd = pytest.importorskip("pandas")
+
+class _NoSimulatedChecks:
+    """rng for calculate_risk_profile that never fires the blur / returning checks."""
+    def random(self):
+        return 0.99
+
+def _random_customer(rng):
+    return {
+        "full_name": rng.choice(["Ali Khan", "Sara Ahmed", "Bilal Shah", "Ayesha Noor"]),
+        "email": rng.choice(["a@gmail.com", "b@tempmail.com", "C@Yahoo.com", "d@10minutemail.com", ""]),
+        "phone": rng.choice(["03001234567", "0300123", "", "+923001234567"]),
+        "cnic": f"{rng.randint(10000, 99999)}-{rng.randint(0, 9999999):07d}-{rng.randint(0, 9)}",
+        "address": rng.choice(["House 1", "12 Registration Road, Karachi", "", "Flat 4B, Block 7, Gulshan-e-Iqbal"]),
+        "income_range": rng.choice(["0-50k", "50k-100k", "100k+", "High"]),
+    }
+
+def _random_face(rng):
+    return rng.choice([None, rng.randint(20, 99)])
+
+def test_score_batch_matches_the_per_row_engine():
+    rng = random.Random(1234)
+    customers = [_random_customer(rng) for _ in range(2000)]
+    faces = [_random_face(rng) for _ in customers]
+
+    frame = pd.DataFrame(customers)
+    frame["face_match_score"] = pd.Series(faces, dtype=object)
+    batch = risk_engine.score_batch(frame, with_reasons=True)
+
+    for customer, face, values in zip(customers, faces, batch.itertuples(index=False)):
+        expected = risk_engine.calculate_risk_profile(customer, face_match_score=face, rng=_NoSimulatedChecks())
+        assert (values.risk_score, values.trust_score, values.risk_level, values.segment, values.reasons) == (
+            expected["risk_score"], expected["trust_score"], expected["risk_level"], expected["segment"], expected["reasons"]
+        )
+
+def test_score_many_matches_score():
+    rng = random.Random(99)
+    items = []
+    for n in range(1000):
+        customer = _random_customer(rng)
+        candidates = [dict(_random_customer(rng), id=n + 10**6)] if rng.random() < 0.1 else []
+        items.append((customer, candidates, _random_face(rng)))
+
+    assert risk_cache.score_many(items) == [risk_cache.score(*item) for item in items]
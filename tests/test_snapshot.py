@@ -0,0 +1,68 @@
+import os
+import sqlite3
+
+import pytest
+
+from app import config, db, snapshot
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "snapshot.sqlite3")
+    monkeypatch.setattr(config, "SNAPSHOT_PATH", path)
+    return path
+
+def _customer_count(conn):
+    return conn.execute("SELECT COUNT(*) FROM Customers").fetchone()[0]
+
+def _add_customer():
+    with db.connection() as conn:
+        conn.execute("INSERT INTO Customers (full_name, cnic) VALUES ('Snapshot Test', ?)", (os.urandom(8).hex(),))
+
+def test_refresh_copies_the_live_database(snapshot_path):
+    _add_customer()
+    stats = snapshot.refresh(pages=4, sleep_ms=0, verbose=False)
+    assert stats["pages"] > 0 and stats["paced"]
+    assert not os.path.exists(snapshot_path + "-wal")
+
+    conn = snapshot.connect()
+    try:
+        with db.connection() as live:
+            assert _customer_count(conn) == _customer_count(live)
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM Customers")
+    finally:
+        conn.close()
+
+def test_open_connections_keep_the_previous_snapshot(snapshot_path):
+    snapshot.refresh(verbose=False)
+    old = snapshot.connect()
+    try:
+        before = _customer_count(old)
+        _add_customer()
+        snapshot.refresh(verbose=False)
+        assert _customer_count(old) == before
+        new = snapshot.connect()
+        try:
+            assert _customer_count(new) == before + 1
+        finally:
+            new.close()
+    finally:
+        old.close()
+
+def test_routing_follows_the_flag_and_the_age(snapshot_path, monkeypatch):
+    monkeypatch.setattr(config, "REPORTS_FROM_SNAPSHOT", True)
+    monkeypatch.setattr(config, "SNAPSHOT_MAX_AGE_SECONDS", 60)
+    assert not snapshot.use_snapshot()  # none taken yet
+
+    snapshot.refresh(verbose=False)
+    assert snapshot.use_snapshot()
+    with snapshot.reporting_connection() as conn:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+
+    old = os.path.getmtime(snapshot_path) - 120
+    os.utime(snapshot_path, (old, old))
+    assert not snapshot.use_snapshot()
+
+    monkeypatch.setattr(config, "REPORTS_FROM_SNAPSHOT", False)
+    snapshot.refresh(verbose=False)
+    assert not snapshot.use_snapshot()
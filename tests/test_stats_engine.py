@@ -0,0 +1,65 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import stats_engine
+
+END = datetime(2026, 3, 1, 12, 0)
+
+def test_explicit_bucket_over_the_cap_is_refused():
+    with pytest.raises(ValueError, match="coarser bucket"):
+        stats_engine.resolve_range(start=END - timedelta(days=365), end=END, bucket="minute")
+
+def test_explicit_bucket_up_to_the_cap_is_accepted():
+    start = END - timedelta(minutes=stats_engine.MAX_BUCKETS)
+    assert stats_engine.resolve_range(start=start, end=END, bucket="minute") == (start, END, "minute")
+
+@pytest.fixture
+def conn(tmp_path):
+    from app import migrations
+    path = str(tmp_path / "stats.sqlite3")
+    migrations.migrate(db_path=path, verbose=False)
+    conn = sqlite3.connect(path)
+    rows = [
+        ("Verified", "2026-03-01 09:05:00"),
+        ("Verified", "2026-03-01 09:55:00"),
+        ("Rejected", "2026-03-01 11:30:00"),
+        ("Pending", None),
+        ("Verified", "2026-02-27 10:00:00"),  # before the range
+    ]
+    conn.executemany("INSERT INTO Verifications (customer_id, status, date) VALUES (1, ?, ?)", rows)
+    conn.commit()
+    yield conn
+    conn.close()
+
+def test_span_picks_the_bucket():
+    assert stats_engine.resolve_range("1 Minute")[2] == "minute"
+    assert stats_engine.resolve_range("24 Hours")[2] == "hour"
+    assert stats_engine.resolve_range("1 Month")[2] == "day"
+    assert stats_engine.resolve_range("1 Year")[2] == "week"
+    assert stats_engine.resolve_range(start=END - timedelta(days=1000), end=END)[2] == "month"
+
+def test_bucket_floors():
+    moment = datetime(2026, 3, 5, 14, 37, 12)  # a Thursday
+    assert stats_engine.floor_to_bucket(moment, "hour") == datetime(2026, 3, 5, 14)
+    assert stats_engine.floor_to_bucket(moment, "week") == datetime(2026, 3, 2)
+    assert stats_engine.floor_to_bucket(moment, "month") == datetime(2026, 3, 1)
+    assert stats_engine.next_bucket(datetime(2026, 12, 1), "month") == datetime(2027, 1, 1)
+
+def test_hourly_counts_are_zero_filled(conn):
+    stats = stats_engine.verification_stats(conn, start=datetime(2026, 3, 1, 8, 30), end=datetime(2026, 3, 1, 12, 0))
+    assert stats["range"]["bucket"] == "hour"
+    assert [(b["bucket"], b["verified"], b["rejected"]) for b in stats["activity"]] == [
+        ("2026-03-01 08:00:00", 0, 0),
+        ("2026-03-01 09:00:00", 2, 0),
+        ("2026-03-01 10:00:00", 0, 0),
+        ("2026-03-01 11:00:00", 0, 1),
+    ]
+    assert stats["overall"] == {"verified": 3, "rejected": 1, "pending": 1}
+
+def test_daily_buckets_cover_the_range(conn):
+    stats = stats_engine.verification_stats(conn, start=datetime(2026, 2, 26), end=datetime(2026, 3, 2), bucket="day")
+    assert [(b["bucket"][:10], b["verified"]) for b in stats["activity"]] == [
+        ("2026-02-26", 0), ("2026-02-27", 1), ("2026-02-28", 0), ("2026-03-01", 2),
+    ]
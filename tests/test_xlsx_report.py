@@ -0,0 +1,37 @@
+import uuid
+
+import pytest
+
+from app import db, report_jobs, reports, security_utils
+
+openpyxl = pytest.importorskip("openpyxl")
+
+@pytest.fixture(scope="module")
+def cnic():
+    cnic = f"42201-{uuid.uuid4().int % 10**7:07d}-4"
+    db.insert_customer("Xlsx Mask Test", cnic, f"{uuid.uuid4().hex[:8]}@example.com", "03001234567",
+                       "5 Workbook Avenue, Lahore", "50k-100k", "x")
+    return cnic
+
+def _cnic_cell(path):
+    sheet = openpyxl.load_workbook(path, read_only=True)["Detailed Data"]
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows)
+    name, cnic = header.index("full_name"), header.index("cnic")
+    return [row[cnic] for row in rows if row[name] == "Xlsx Mask Test"][0]
+
+@pytest.mark.parametrize("mask", reports.CNIC_MASKS)
+def test_cnic_column_follows_the_mask(cnic, mask):
+    path = reports.export_verification_report(f"mask-{mask}-{uuid.uuid4().hex}.xlsx", mask=mask)
+    expected = {"partial": security_utils.mask_identifier(cnic), "none": cnic, "full": "[REDACTED]"}[mask]
+    assert _cnic_cell(path) == expected
+
+def test_partial_mask_keeps_only_the_last_four():
+    assert security_utils.mask_identifier("42101-0233667-9") == "*****-****667-9"
+
+def test_unknown_mask_is_refused():
+    with pytest.raises(ValueError):
+        reports.export_verification_report("never.xlsx", mask="some")
+    with pytest.raises(ValueError, match="mask must be one of"):
+        report_jobs._xlsx_params({"mask": "some"})
+    assert report_jobs._xlsx_params({}) == {"mask": "partial"}